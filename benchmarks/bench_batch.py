@@ -0,0 +1,91 @@
+"""Compare single-item requests with batches against a running server.
+
+An agent step records a few thoughts, starts and ends battles and moves.
+The same items are sent once as one request per item (``POST
+/players/{id}/thoughts``, ``POST`` and ``PUT /players/{id}/battles``)
+and once through ``POST /players/batch``, and the time per item is
+compared.
+
+Start the server first, then run from the repository root::
+
+    python -m benchmarks.bench_batch --players 5 --items 2000 --batch-size 100
+"""
+import time
+import argparse
+
+import requests
+
+def create_players(session, url: str, count: int):
+    player_ids = []
+    for i in range(count):
+        response = session.post(f"{url}/players/", json={"name": f"Bench {i}", "location": {"location_tuple": ["Route 1"]}})
+        player_ids.append(response.json()["data"]["player_id"])
+    return player_ids
+
+def make_items(player_ids, count: int):
+    # Mostly thoughts, with a battle and a move every ten items
+    items = []
+    for i in range(count):
+        player_id = player_ids[i % len(player_ids)]
+        if i % 10 == 8:
+            items.append({"type": "battle_start", "player_id": player_id, "opponent_id": "iris", "opponent_name": "Iris"})
+        elif i % 10 == 9:
+            items.append({"type": "location", "player_id": player_id, "location": {"location_tuple": ["Route", str(i)]}})
+        else:
+            items.append({"type": "thought", "player_id": player_id, "content": f"Thinking about move {i}", "category": "battle"})
+    return items
+
+def run_single(session, url: str, items):
+    names = {}
+    start = time.perf_counter()
+    for item in items:
+        player_id = item["player_id"]
+        if item["type"] == "thought":
+            session.post(f"{url}/players/{player_id}/thoughts", json={"content": item["content"], "category": item["category"]})
+        elif item["type"] == "battle_start":
+            battle_id = session.post(f"{url}/players/{player_id}/battles", json={"opponent_id": item["opponent_id"], "opponent_name": item["opponent_name"]}).json()["data"]["battle_id"]
+            session.put(f"{url}/players/{player_id}/battles/{battle_id}", params={"result": "win"})
+        else:
+            name = names.setdefault(player_id, session.get(f"{url}/players/{player_id}").json()["data"]["name"])
+            session.put(f"{url}/players/{player_id}", json={"name": name, "location": item["location"]})
+    return time.perf_counter() - start
+
+def run_batches(session, url: str, items, batch_size: int):
+    counts = {}
+    start = time.perf_counter()
+    for i in range(0, len(items), batch_size):
+        batch = []
+        for item in items[i:i + batch_size]:
+            batch.append(item)
+            if item["type"] == "battle_start":
+                # Battles are numbered per player, so the next one can be ended in the same batch
+                battle_count = counts[item["player_id"]] = counts.get(item["player_id"], 0) + 1
+                batch.append({"type": "battle_end", "player_id": item["player_id"], "battle_id": f"battle_{battle_count}", "result": "win"})
+        results = session.post(f"{url}/players/batch", json={"items": batch}).json()["data"]
+        if results["failed"]:
+            raise RuntimeError(f"{results['failed']} batch items failed: {results['results']}")
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000/api")
+    parser.add_argument("--players", type=int, default=5)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    with requests.Session() as session:
+        # Separate players for each run, so both start from empty histories
+        single_items = make_items(create_players(session, args.url, args.players), args.items)
+        batch_items = make_items(create_players(session, args.url, args.players), args.items)
+
+        single = run_single(session, args.url, single_items)
+        batched = run_batches(session, args.url, batch_items, args.batch_size)
+
+    print(f"{'mode':<10} {'seconds':>9} {'us/item':>9}")
+    print(f"{'single':<10} {single:>9.2f} {single / args.items * 1e6:>9.0f}")
+    print(f"{'batch':<10} {batched:>9.2f} {batched / args.items * 1e6:>9.0f}")
+    print(f"speedup: {single / batched:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Compare save size and save/load time of the on-disk save formats.
+
+Builds a synthetic tracker state with long thought and battle histories
+and writes it as:
+
+- ``legacy``: the original single-file ``json.dump(..., indent=2)`` save
+- ``json``: the segmented save layout with JSON segments
+- ``compact``: the segmented save layout with the compact binary codec
+
+The legacy format does not round-trip: ``default=str`` turns the badge
+set into its ``repr``, which is one of the reasons it was replaced.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_save_format --players 20 --thoughts 2000 --battles 300
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import tempfile
+
+from server.models.player import Player, Thought, Battle, MatchupRecord, MapLocation
+from server.models.pokemon import Pokemon
+from server.models.save import SaveFileCreate
+from server.utils import save_manager
+from server.utils.save_index import SaveIndex
+from server.utils.save_manager import SaveManager
+from server.utils.player_repository import team_snapshot_id
+
+SPECIES = ["Oshawott", "Tepig", "Snivy", "Pidove", "Patrat", "Lillipup", "Purrloin", "Riolu"]
+MOVES = ["Tackle", "Water Gun", "Ember", "Vine Whip", "Quick Attack", "Bite", "Growl", "Leer"]
+
+def make_pokemon(index: int) -> Pokemon:
+    name = SPECIES[index % len(SPECIES)]
+    return Pokemon(
+        id=index + 1,
+        name=name,
+        level=5 + index,
+        types=["Normal"],
+        abilities=[{"name": "Run Away", "is_hidden": False}],
+        nature="Hardy",
+        base_stats={"hp": 45, "attack": 49, "defense": 49, "special_attack": 65, "special_defense": 65, "speed": 45},
+        current_hp=45,
+        max_hp=45
+    )
+
+def make_player(index: int, thoughts: int, battles: int, turns: int) -> Player:
+    start = datetime.datetime(2025, 3, 20, 12, 0, 0)
+    team = [make_pokemon(i) for i in range(6)]
+    player = Player(
+        id=f"player_{index + 1}",
+        name=f"Trainer {index + 1}",
+        team=team,
+        location=MapLocation(location_tuple=["Aspertia City", "Trainer School"], description="A school for beginning trainers"),
+        items=["Potion", "Pokeball"],
+        badges={"Basic Badge"}
+    )
+    snapshot_id = team_snapshot_id(team)
+    player.team_snapshots[snapshot_id] = team
+
+    for i in range(thoughts):
+        player.thought_history.append(Thought(
+            id=f"thought_{i + 1}",
+            content=f"Considering whether to challenge opponent {i % 40} with {SPECIES[i % len(SPECIES)]} leading the team",
+            category=["general", "battle", "exploration"][i % 3],
+            timestamp=start + datetime.timedelta(seconds=i * 7)
+        ))
+
+    for i in range(battles):
+        opponent_id = f"npc_{i % 40}"
+        player.battle_history.append(Battle(
+            id=f"battle_{i + 1}",
+            opponent_id=opponent_id,
+            opponent_name=f"Opponent {i % 40}",
+            player_team_id=snapshot_id,
+            start_time=start + datetime.timedelta(minutes=i * 10),
+            end_time=start + datetime.timedelta(minutes=i * 10 + 6),
+            result=["win", "loss", "draw"][i % 3],
+            turns=[{
+                "turn": t + 1,
+                "actor": SPECIES[t % len(SPECIES)],
+                "move": MOVES[t % len(MOVES)],
+                "target": SPECIES[(t + 3) % len(SPECIES)],
+                "damage": (t * 7) % 40,
+                "hp_after": max(0, 45 - (t * 7) % 40)
+            } for t in range(turns)]
+        ))
+        record = player.matchup_records.setdefault(opponent_id, MatchupRecord(opponent_id=opponent_id, opponent_name=f"Opponent {i % 40}"))
+        record.wins += 1
+        record.last_battle = start + datetime.timedelta(minutes=i * 10 + 6)
+
+    return player
+
+def directory_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+def timed(fn, repeat: int):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def bench_legacy(players, repeat: int):
+    path = SaveManager.get_save_path("bench_legacy")
+
+    def save():
+        data = {
+            "id": "bench_legacy",
+            "name": "legacy",
+            "game_version": "Black2White2",
+            "created_at": datetime.datetime.now(),
+            "last_updated": datetime.datetime.now(),
+            "players": [player.dict() for player in players]
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, default=str, indent=2)
+
+    def load():
+        return SaveManager.load_save("bench_legacy")
+
+    save_time, _ = timed(save, repeat)
+    load_time, loaded = timed(load, repeat)
+    return save_time, load_time, directory_size(path), loaded
+
+def bench_segmented(players, fmt: str, repeat: int):
+    save_time = None
+    for _ in range(repeat):
+        # Each create is a full write, like the first save of a session
+        elapsed, save_file = timed(lambda: SaveManager.create_save(SaveFileCreate(name=fmt, format=fmt), players), 1)
+        save_time = elapsed if save_time is None else min(save_time, elapsed)
+        save_id = save_file.id
+        time.sleep(1.01)  # save ids have one-second resolution
+
+    load_time, loaded = timed(lambda: SaveManager.load_save(save_id), repeat)
+    return save_time, load_time, directory_size(SaveManager.get_save_dir(save_id)), loaded
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--thoughts", type=int, default=2000)
+    parser.add_argument("--battles", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Keep benchmark saves out of the real save directory
+    tmp_dir = tempfile.mkdtemp(prefix="pst_bench_")
+    save_manager.SAVE_DIR = tmp_dir
+    save_manager.save_index = SaveIndex(tmp_dir, SaveManager._read_metadata, SaveManager._source_path)
+
+    try:
+        print(f"Building {args.players} players with {args.thoughts} thoughts and {args.battles} battles of {args.turns} turns each...")
+        players = [make_player(i, args.thoughts, args.battles, args.turns) for i in range(args.players)]
+        expected = [player.dict() for player in players]
+
+        results = {"legacy": bench_legacy(players, args.repeat)}
+        for fmt in ("json", "compact"):
+            results[fmt] = bench_segmented(players, fmt, args.repeat)
+
+        legacy_size = results["legacy"][2]
+        print(f"{'format':<10}{'size (KiB)':>14}{'vs legacy':>12}{'save (s)':>12}{'load (s)':>12}  round-trip")
+        for fmt, (save_time, load_time, size, loaded) in results.items():
+            ok = [player.dict() for player in loaded] == expected
+            print(f"{fmt:<10}{size / 1024:>14.1f}{size / legacy_size:>11.1%}{save_time:>12.3f}{load_time:>12.3f}  {'ok' if ok else 'MISMATCH'}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Compare the player storage backends under a mixed agent workload.
+
+Each backend starts from the same synthetic players (see
+``bench_save_format``) and then runs the same random sequence of
+operations, weighted like a group of agents playing: mostly new
+thoughts, some battles started and ended, and reads of the team,
+matchups, single battles and the full thought history.
+
+- ``memory``: ``InMemoryPlayerRepository``
+- ``sqlite``: ``SqlitePlayerRepository`` on a temporary database file
+
+Run from the repository root::
+
+    python -m benchmarks.bench_storage --players 10 --thoughts 500 --ops 20000
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import datetime
+import tempfile
+
+from server.models.player import Thought, Battle, MatchupRecord
+from server.utils.player_repository import create_repository, team_snapshot_id
+from server.utils.matchup_stats import record_result
+from benchmarks.bench_save_format import make_player
+
+# Operation mix of the workload, as relative weights
+WORKLOAD = {
+    "add_thought": 50,
+    "start_battle": 8,
+    "end_battle": 8,
+    "get_team": 12,
+    "get_battle": 10,
+    "get_matchups": 8,
+    "get_thoughts": 4
+}
+
+def make_operations(players, count: int, seed: int):
+    rng = random.Random(seed)
+    names = list(WORKLOAD)
+    weights = [WORKLOAD[name] for name in names]
+    return [(rng.choices(names, weights)[0], rng.randrange(len(players)), rng.random()) for _ in range(count)]
+
+def run_workload(repository, player_ids, operations):
+    timings = {name: [0, 0.0] for name in WORKLOAD}
+    open_battles = {player_id: [] for player_id in player_ids}
+    now = datetime.datetime(2025, 3, 21, 12, 0, 0)
+
+    start = time.perf_counter()
+    for i, (op, index, roll) in enumerate(operations):
+        player_id = player_ids[index]
+        now += datetime.timedelta(seconds=1)
+        op_start = time.perf_counter()
+
+        if op == "add_thought":
+            count = repository.count_thoughts(player_id)
+            repository.add_thought(player_id, Thought(id=f"thought_{count + 1}", content=f"Thinking about move {i}", category="battle", timestamp=now), now)
+        elif op == "start_battle":
+            count = repository.count_battles(player_id)
+            battle_id = f"battle_{count + 1}"
+            team = repository.get_team(player_id)
+            snapshot_id = team_snapshot_id(team)
+            if repository.get_team_snapshot(player_id, snapshot_id) is None:
+                repository.put_team_snapshot(player_id, snapshot_id, team, now)
+            repository.add_battle(player_id, Battle(
+                id=battle_id,
+                opponent_id=f"npc_{i % 40}",
+                opponent_name=f"Opponent {i % 40}",
+                player_team_id=snapshot_id,
+                start_time=now
+            ), now)
+            open_battles[player_id].append(battle_id)
+        elif op == "end_battle" and open_battles[player_id]:
+            battle_id = open_battles[player_id].pop(0)
+            _, battle = repository.get_battle(player_id, battle_id)
+            matchup = repository.get_matchup(player_id, battle.opponent_id)
+            matchup = matchup.copy(deep=True) if matchup else MatchupRecord(opponent_id=battle.opponent_id, opponent_name=battle.opponent_name)
+            record_result(matchup, "win", now)
+            repository.end_battle(player_id, battle_id, "win", now)
+            repository.put_matchup(player_id, matchup, now)
+        elif op == "get_team":
+            repository.get_team(player_id)
+        elif op == "get_battle":
+            count = repository.count_battles(player_id)
+            if count:
+                repository.get_battle(player_id, f"battle_{int(roll * count) + 1}")
+        elif op == "get_matchups":
+            repository.get_matchups(player_id)
+        elif op == "get_thoughts":
+            repository.page_thoughts(player_id, 10, descending=True)
+
+        timing = timings[op]
+        timing[0] += 1
+        timing[1] += time.perf_counter() - op_start
+
+    return time.perf_counter() - start, timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--thoughts", type=int, default=500)
+    parser.add_argument("--battles", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="pst_bench_")
+    try:
+        print(f"Building {args.players} players with {args.thoughts} thoughts and {args.battles} battles of {args.turns} turns each...")
+        operations = make_operations(range(args.players), args.ops, args.seed)
+
+        results = {}
+        for backend in ("memory", "sqlite"):
+            repository = create_repository(backend, os.path.join(tmp_dir, "tracker.db"))
+            players = [make_player(i, args.thoughts, args.battles, args.turns) for i in range(args.players)]
+            load_start = time.perf_counter()
+            repository.replace_all(players)
+            load_time = time.perf_counter() - load_start
+
+            elapsed, timings = run_workload(repository, [player.id for player in players], operations)
+            results[backend] = (load_time, elapsed, timings)
+            if backend == "sqlite":
+                repository.close()
+
+        print(f"{'backend':<10}{'load (s)':>10}{'ops/s':>12}" + "".join(f"{name + ' (us)':>18}" for name in WORKLOAD))
+        for backend, (load_time, elapsed, timings) in results.items():
+            per_op = "".join(f"{(total / count * 1e6 if count else 0):>18.1f}" for count, total in timings.values())
+            print(f"{backend:<10}{load_time:>10.3f}{args.ops / elapsed:>12.0f}{per_op}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
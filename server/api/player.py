@@ -1,48 +1,366 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+from pydantic import TypeAdapter, ValidationError
+import os
+import hashlib
 import datetime
 
-from server.models.player import Player, PlayerCreate, PlayerUpdate, ThoughtCreate, BattleCreate
+from server.models.player import (
+    Player, PlayerCreate, PlayerUpdate, ThoughtCreate, BattleCreate, MapLocation, Thought, Battle, MatchupRecord,
+    BatchItem, BatchRequest, BatchThought, BatchBattleStart, BatchBattleEnd
+)
 from server.models.pokemon import Pokemon, PokemonCreate
+from server.models.turn import TurnEvent
 from server.models.api import APIResponse
+from server.utils.mutation_log import mutation_log
+from server.utils.change_tracker import change_tracker, TRACKER_PATH
+from server.utils.change_journal import change_journal
+from server.utils.change_stream import change_stream, Topics
+from server.utils.change_tracker import PLAYER_COLLECTIONS
+from server.utils.lazy_player import dump_player, snapshot_player, dump_snapshot, restore_player, prune_pins, hold_pins, release_pins
+from server.utils.player_repository import repository, new_player_id, team_snapshot_id
+from server.utils.battle_archive import battle_archive
+from server.utils.thought_spill import spill_paths
+from server.utils.time_index import TimeKey, encode_cursor, decode_cursor
+from server.utils.matchup_stats import record_result, matchup_stats, all_matchup_stats, stats_period
+from server.utils.species_analytics import species_analytics, species_summary
+from server.utils.thought_search import thought_search, parse_query
+from server.utils.battle_stream import battle_stream, first_turn_index
+from server.utils.projection import PLAYER_SUMMARY, parse_fields, collections, project_player
+from server.utils.autosave import autosave
+from server.utils.save_jobs import save_jobs
 
-router = APIRouter(prefix="/players", tags=["players"])
+async def autosave_backpressure(request: Request) -> None:
+    # Hold changes while autosave is too far behind
+    if request.method != "GET":
+        await autosave.wait_for_capacity()
 
-# In-memory storage (would be replaced with a database in production)
-players = {}
+router = APIRouter(prefix="/players", tags=["players"], dependencies=[Depends(autosave_backpressure)])
+
+# Most items accepted in one batch of changes
+MAX_BATCH_ITEMS = int(os.environ.get("PST_MAX_BATCH_ITEMS", "1000"))
 
 # Helper functions
-def get_player(player_id: str) -> Player:
-    if player_id not in players:
+def get_player_name(player_id: str) -> str:
+    name = repository.get_player_name(player_id)
+    if name is None:
+        raise HTTPException(status_code=404, detail=f"Player with ID {player_id} not found")
+    return name
+
+def get_player(player_id: str, collections: Optional[Iterable[str]] = None) -> Player:
+    player = repository.get_player(player_id, collections)
+    if player is None:
         raise HTTPException(status_code=404, detail=f"Player with ID {player_id} not found")
-    return players[player_id]
+    return player
 
 def get_all_players() -> List[Player]:
-    return list(players.values())
+    return repository.all_players()
+
+def _projection(fields: Optional[str], exclude: Optional[str], default: Iterable[str]) -> List[str]:
+    try:
+        return parse_fields(fields, exclude, default)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Conditional requests
+#
+# ETags are change tracker versions: a player's tag moves with every change
+# to it and a collection's with every change to that collection, so they are
+# checked without reading the player. Routes that shape the body by query
+# (fields, exclude, paging) add a hash of the normalized query after a "+",
+# so different bodies never share a tag; If-Match ignores that part.
+def _etag(
+    player_id: Optional[str] = None,
+    parts: Iterable[str] = (),
+    period: Optional[int] = None,
+    variant: Optional[Iterable[Any]] = None
+) -> str:
+    if player_id is None:
+        version = change_tracker.clock
+    elif parts:
+        version = max(change_tracker.version(player_id, part) for part in parts)
+    else:
+        version = change_tracker.player_version(player_id)
+    tag = f"{change_tracker.session[:16]}-{version}"
+    if period is not None:
+        tag += f"-{period}"
+    if variant is not None:
+        tag += "+" + hashlib.sha1(",".join(map(str, variant)).encode()).hexdigest()[:12]
+    return f'"{tag}"'
+
+def _etag_matches(header: str, etags: Iterable[str], weak: bool, any_variant: bool = False) -> bool:
+    tags = [tag.strip() for tag in header.split(",")]
+    if weak:
+        tags = [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+    if any_variant:
+        tags = [tag.split("+")[0] + '"' if "+" in tag else tag for tag in tags]
+    return "*" in tags or any(etag in tags for etag in etags)
+
+def _check_not_modified(request: Request, response: Response, etag: str) -> None:
+    # Tag a read, or answer 304 when the client already has this version
+    header = request.headers.get("if-none-match")
+    if header is not None and _etag_matches(header, [etag], weak=True):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+def _check_precondition(request: Request, *etags: str) -> None:
+    # Refuse a write unless If-Match (when given) names a current version
+    header = request.headers.get("if-match")
+    # A tag read with any fields or exclude names the same version
+    if header is not None and not _etag_matches(header, etags, weak=False, any_variant=True):
+        raise HTTPException(status_code=412, detail="The resource has changed since it was read", headers={"ETag": etags[0]})
+
+def replace_all_players(new_players: List[Player], prepared_checkpoint: Optional[str] = None) -> None:
+    repository.replace_all(new_players)
+    change_tracker.reset()
+    change_journal.reset()
+    change_stream.reset()
+    species_analytics.reset()
+    thought_search.reset()
+    battle_stream.close_all()
+    autosave.notify()
+    if repository.durable:
+        # Durable backends keep no checkpoint
+        if prepared_checkpoint is not None:
+            os.remove(prepared_checkpoint)
+        return
+    
+    # A wholesale replacement is not expressible as a small mutation,
+    # so start a fresh checkpoint from the new state (callers off the
+    # event loop can prepare it with mutation_log.prepare_checkpoint)
+    if prepared_checkpoint is None:
+        mutation_log.checkpoint([dump_player(player) for player in new_players])
+    else:
+        mutation_log.commit_checkpoint(prepared_checkpoint)
+    prune_pins(new_players, keep=[battle_archive.path, *spill_paths(new_players)])
+
+def _expand_teams(player_id: str, battles: List[Battle]) -> List[Battle]:
+    # Fill in the team of battles that refer to a team snapshot
+    snapshots = repository.get_team_snapshots(player_id)
+    return [
+        battle.copy(update={"player_team": snapshots.get(battle.player_team_id, [])}) if battle.player_team_id else battle
+        for battle in battles
+    ]
+
+def _page_options(cursor: Optional[str], since: Optional[datetime.datetime], until: Optional[datetime.datetime], order: str) -> Dict[str, Any]:
+    # Repository paging options from the query parameters of a history page
+    if order not in ["asc", "desc"]:
+        raise HTTPException(status_code=400, detail=f"Invalid order: {order}. Must be 'asc' or 'desc'")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Histories are stamped with naive local times
+    since, until = [t.astimezone().replace(tzinfo=None) if t is not None and t.tzinfo else t for t in (since, until)]
+    return {"after": after, "since": since, "until": until, "descending": order == "desc"}
+
+def _pagination(total: int, limit: int, next_key: Optional[TimeKey]) -> Dict[str, Any]:
+    return {"total": total, "limit": limit, "next_cursor": encode_cursor(next_key) if next_key else None}
+
+def _build_pokemon(pokemon: PokemonCreate, pokemon_id: int) -> Pokemon:
+    return Pokemon(
+        id=pokemon_id,
+        name=pokemon.name,
+        level=pokemon.level,
+        types=pokemon.types,
+        abilities=pokemon.abilities,
+        nature=pokemon.nature,
+        held_item=pokemon.held_item,
+        base_stats=pokemon.base_stats,
+        current_hp=pokemon.base_stats["hp"],
+        max_hp=pokemon.base_stats["hp"],
+        gender=pokemon.gender,
+        is_shiny=pokemon.is_shiny,
+        form=pokemon.form
+    )
+
+# Mutation appliers
+#
+# Every change to the repository goes through one of these functions, both when
+# it is made by a request and when it is replayed from the mutation log on
+# startup. Payloads must therefore be JSON-serializable and self-contained.
+def _apply_create_player(player_id: str, payload: Dict[str, Any], timestamp: datetime.datetime) -> None:
+    repository.create_player(Player(**payload))
+    change_tracker.mark_all(player_id)
+    species_analytics.forget(player_id)
+    thought_search.forget(player_id)
+
+def _apply_update_player(player_id: str, payload: Dict[str, Any], timestamp: datetime.datetime) -> None:
+    repository.update_player(player_id, {
+        "name": payload["name"],
+        "location": MapLocation(**payload["location"])
+    }, timestamp)
+    change_tracker.mark(player_id, "profile")
+
+def _apply_delete_player(player_id: str, payload: Dict[str, Any], timestamp: datetime.datetime) -> None:
+    repository.delete_player(player_id)
+    change_tracker.forget(player_id)
+    species_analytics.forget(player_id)
+    thought_search.forget(player_id)
+    battle_stream.close_player(player_id)
+
+def _apply_add_pokemon(player_id: str, payload: Dict[str, Any], timestamp: datetime.datetime) -> None:
+    repository.add_pokemon(player_id, Pokemon(**payload["pokemon"]), timestamp)
+    change_tracker.mark(player_id, "team")
+    change_tracker.mark(player_id, "profile")
+
+def _apply_remove_pokemon(player_id: str, payload: Dict[str, Any], timestamp: datetime.datetime) -> None:
+    repository.remove_pokemon(player_id, payload["index"], timestamp)
+    change_tracker.mark(player_id, "team")
+    change_tracker.mark(player_id, "profile")
+
+def _apply_add_thought(player_id: str, payload: Dict[str, Any], timestamp: datetime.datetime) -> None:
+    thought = Thought(**payload["thought"])
+    repository.add_thought(player_id, thought, timestamp)
+    thought_search.thought_added(player_id, thought)
+    change_tracker.mark(player_id, "thoughts")
+    change_tracker.mark(player_id, "profile")
+
+def _apply_start_battle(player_id: str, payload: Dict[str, Any], timestamp: datetime.datetime) -> None:
+    snapshot = payload.get("team_snapshot")
+    if snapshot is not None:
+        repository.put_team_snapshot(player_id, snapshot["id"], [Pokemon(**pokemon) for pokemon in snapshot["team"]], timestamp)
+        change_tracker.mark(player_id, "snapshots")
+    battle = Battle(**payload["battle"])
+    repository.add_battle(player_id, battle, timestamp)
+    species_analytics.battle_started(player_id, battle)
+    change_tracker.mark(player_id, "battles")
+    change_tracker.mark(player_id, "profile")
+
+def _apply_end_battle(player_id: str, payload: Dict[str, Any], timestamp: datetime.datetime) -> None:
+    index = repository.end_battle(player_id, payload["battle_id"], payload["result"], timestamp)
+    repository.put_matchup(player_id, MatchupRecord(**payload["matchup"]), timestamp)
+    species_analytics.battle_ended(player_id, payload["battle_id"], payload["result"])
+    battle_stream.battle_ended(player_id, payload["battle_id"])
+    change_tracker.mark(player_id, "battles", index)
+    change_tracker.mark(player_id, "matchups")
+    change_tracker.mark(player_id, "profile")
+
+def _apply_add_turns(player_id: str, payload: Dict[str, Any], timestamp: datetime.datetime) -> None:
+    index = repository.add_turns(player_id, payload["battle_id"], [TurnEvent(**turn) for turn in payload["turns"]], timestamp)
+    species_analytics.turns_added(player_id, payload["battle_id"], len(payload["turns"]))
+    battle_stream.turns_added(player_id, payload["battle_id"], payload["turns"])
+    change_tracker.mark(player_id, "battles", index)
+    change_tracker.mark(player_id, "profile")
+
+MUTATION_APPLIERS = {
+    "create_player": _apply_create_player,
+    "update_player": _apply_update_player,
+    "delete_player": _apply_delete_player,
+    "add_pokemon": _apply_add_pokemon,
+    "remove_pokemon": _apply_remove_pokemon,
+    "add_thought": _apply_add_thought,
+    "start_battle": _apply_start_battle,
+    "end_battle": _apply_end_battle,
+    "add_turns": _apply_add_turns,
+}
+
+def apply_mutation(op: str, player_id: str, payload: Dict[str, Any]) -> None:
+    """Apply a mutation to the repository and append it to the log.
+    
+    Durable repositories commit each change themselves, so only the
+    in-memory one is logged.
+    """
+    timestamp = datetime.datetime.now()
+    MUTATION_APPLIERS[op](player_id, payload, timestamp)
+    autosave.notify()
+    _log_mutations([(op, player_id, payload)], timestamp)
+
+def _log_mutations(mutations: List[Tuple[str, str, Dict[str, Any]]], timestamp: datetime.datetime) -> None:
+    # Append applied mutations to the change journal, and to the log with a single write
+    change_journal.record(mutations, timestamp)
+    change_stream.changes_recorded(mutations)
+    if repository.durable or not mutations:
+        return
+    mutation_log.append_many(mutations, timestamp)
+    
+    if mutation_log.needs_checkpoint():
+        _start_checkpoint()
+
+def _start_checkpoint() -> None:
+    # Snapshot the players as of the last logged mutation; the snapshot is
+    # serialized and written off the event loop while new mutations go to
+    # a fresh log, which is only dropped once the checkpoint is durable
+    seq = mutation_log.begin_checkpoint()
+    if seq is None:
+        return
+    current_players = repository.all_players()
+    snapshot = [snapshot_player(p) for p in current_players]
+    # Keep the files the snapshot reads from until it is written
+    pins = [battle_archive.path, *spill_paths(current_players)]
+    hold_pins(pins)
+    save_jobs.background(_write_checkpoint(snapshot, seq, pins))
+
+def _prepare_checkpoint(snapshot: List[Dict[str, Any]]) -> str:
+    return mutation_log.prepare_checkpoint([dump_snapshot(data) for data in snapshot])
+
+async def _write_checkpoint(snapshot: List[Dict[str, Any]], seq: int, pins: List[str]) -> None:
+    try:
+        tmp_path = await save_jobs.run_io(_prepare_checkpoint, snapshot)
+        if mutation_log.commit_checkpoint(tmp_path, seq):
+            # The checkpoint refers to the lazy segments of the snapshot
+            segments = [segment["path"] for data in snapshot for segment in data.get("lazy_segments", {}).values()]
+            current_players = repository.all_players()
+            prune_pins(current_players, keep=[battle_archive.path, *spill_paths(current_players), *segments])
+    except Exception as e:
+        print(f"Error writing checkpoint: {e}")
+        mutation_log.abort_checkpoint(seq)
+    finally:
+        release_pins(pins)
+
+def _replay_mutation(record: Dict[str, Any]) -> None:
+    timestamp = datetime.datetime.fromisoformat(record["timestamp"])
+    MUTATION_APPLIERS[record["op"]](record["player_id"], record["payload"], timestamp)
+
+def restore_from_log() -> int:
+    """Rebuild the in-memory players from the latest checkpoint and log"""
+    change_tracker.reset()
+    change_journal.reset()
+    change_stream.reset()
+    species_analytics.reset()
+    thought_search.reset()
+    if repository.durable:
+        replayed = 0
+    else:
+        repository.replace_all([restore_player(data) for data in mutation_log.load_checkpoint()])
+        replayed = mutation_log.replay_records(_replay_mutation)
+    
+    # After a clean shutdown the players are back as they were, so carry on
+    # the tracker session: saves written before the restart stay incremental
+    change_tracker.restore(TRACKER_PATH, _tracker_stamp())
+    return replayed
 
-def replace_all_players(new_players: List[Player]) -> None:
-    global players
-    players = {player.id: player for player in new_players}
+def save_tracker() -> None:
+    """Keep the change tracker for the next run, on a clean shutdown"""
+    change_tracker.save(TRACKER_PATH, _tracker_stamp())
+
+def _tracker_stamp() -> List[Any]:
+    # The players a saved tracker describes: the same backend, and for the
+    # in-memory one the same position in the mutation log
+    return [type(repository).__name__, mutation_log.seq]
 
 # Player endpoints
 @router.post("/", response_model=APIResponse)
 async def create_player(player: PlayerCreate):
-    player_id = f"player_{len(players) + 1}"
+    player_id = new_player_id()
+    now = datetime.datetime.now()
     
     # Create new player
-    new_player = Player(
-        id=player_id,
-        name=player.name,
-        team=player.team,
-        location=player.location,
-        thought_history=[],
-        battle_history=[],
-        matchup_records={},
-        created_at=datetime.datetime.now(),
-        last_updated=datetime.datetime.now()
-    )
-    
-    players[player_id] = new_player
+    apply_mutation("create_player", player_id, {
+        "id": player_id,
+        "name": player.name,
+        "team": [_build_pokemon(p, i + 1).dict() for i, p in enumerate(player.team)],
+        "location": player.location.dict(),
+        "thought_history": [],
+        "battle_history": [],
+        "matchup_records": {},
+        "items": player.items,
+        "badges": player.badges,
+        "created_at": now,
+        "last_updated": now
+    })
     
     return {
         "success": True,
@@ -51,57 +369,184 @@ async def create_player(player: PlayerCreate):
     }
 
 @router.get("/", response_model=APIResponse)
-async def list_players(page: int = Query(1, ge=1), per_page: int = Query(10, ge=1, le=100)):
-    player_list = list(players.values())
-    total = len(player_list)
+async def list_players(
+    request: Request,
+    response: Response,
+    page: int = Query(1, ge=1),
+    per_page: int = Query(10, ge=1, le=100),
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None
+):
+    # Summaries by default: histories are only read when asked for
+    selected = _projection(fields, exclude, PLAYER_SUMMARY)
+    _check_not_modified(request, response, _etag(variant=[page, per_page, *selected]))
+    total = repository.count_players()
     total_pages = (total + per_page - 1) // per_page if total > 0 else 1
     
     start_idx = (page - 1) * per_page
-    end_idx = min(start_idx + per_page, total)
-    
-    paginated_players = player_list[start_idx:end_idx]
+    paginated_players = repository.list_players(start_idx, per_page, collections(selected))
     
     return {
         "success": True,
         "message": f"Retrieved {len(paginated_players)} players",
-        "data": paginated_players,
+        "data": [project_player(player, selected, repository) for player in paginated_players],
         "total": total,
         "page": page,
         "per_page": per_page,
         "total_pages": total_pages
     }
 
+# Change feed endpoints (before "/{player_id}", which would match "changes")
+def _changes(
+    player_id: Optional[str],
+    cursor: Optional[str],
+    limit: int,
+    fields: Optional[str],
+    exclude: Optional[str]
+) -> Dict[str, Any]:
+    selected = _projection(fields, exclude, Player.model_fields)
+    if cursor:
+        found = change_journal.changes_since(cursor, player_id, limit)
+        if found is not None:
+            changes, next_cursor, more = found
+            return {"changes": changes, "snapshot": None, "cursor": next_cursor, "more": more}
+    
+    # Without a cursor the journal still covers, the client starts over from the current state
+    return {
+        "changes": [],
+        "snapshot": _snapshot([player_id] if player_id is not None else None, selected),
+        "cursor": change_journal.cursor,
+        "more": False
+    }
+
+def _snapshot(player_ids: Optional[List[str]], selected: List[str]) -> List[Dict[str, Any]]:
+    if player_ids is None:
+        players = repository.list_players(0, repository.count_players(), collections(selected))
+    else:
+        players = [repository.get_player(player_id, collections(selected)) for player_id in player_ids]
+    return [project_player(player, selected, repository) for player in players if player is not None]
+
+@router.get("/changes", response_model=APIResponse)
+async def get_changes(
+    cursor: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None
+):
+    data = _changes(None, cursor, limit, fields, exclude)
+    return {
+        "success": True,
+        "message": f"Retrieved {len(data['changes'])} changes" if data["snapshot"] is None else f"Retrieved a snapshot of {len(data['snapshot'])} players",
+        "data": data
+    }
+
+def _stream_changes(
+    request: Request,
+    player_ids: Optional[List[str]],
+    cursor: Optional[str],
+    parts: Optional[str],
+    fields: Optional[str],
+    exclude: Optional[str]
+) -> StreamingResponse:
+    selected = _projection(fields, exclude, PLAYER_SUMMARY)
+    if parts is not None:
+        parts = [part.strip() for part in parts.split(",") if part.strip()]
+        unknown = [part for part in parts if part not in PLAYER_COLLECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown collections: {', '.join(unknown)}")
+    
+    # A reconnecting EventSource resumes after the last event it received
+    cursor = request.headers.get("last-event-id") or cursor
+    return StreamingResponse(
+        change_stream.events(Topics(player_ids, parts), lambda: _snapshot(player_ids, selected), cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/changes/stream")
+async def stream_changes(
+    request: Request,
+    cursor: Optional[str] = None,
+    player_id: Optional[str] = None,
+    collections: Optional[str] = None,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None
+):
+    player_ids = [name.strip() for name in player_id.split(",") if name.strip()] if player_id else None
+    return _stream_changes(request, player_ids, cursor, collections, fields, exclude)
+
+@router.get("/{player_id}/changes", response_model=APIResponse)
+async def get_player_changes(
+    player_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None
+):
+    player_name = get_player_name(player_id)
+    data = _changes(player_id, cursor, limit, fields, exclude)
+    return {
+        "success": True,
+        "message": f"Retrieved {len(data['changes'])} changes for player {player_name}" if data["snapshot"] is None else f"Retrieved a snapshot of player {player_name}",
+        "data": data
+    }
+
+@router.get("/{player_id}/changes/stream")
+async def stream_player_changes(
+    player_id: str,
+    request: Request,
+    cursor: Optional[str] = None,
+    collections: Optional[str] = None,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None
+):
+    get_player_name(player_id)
+    return _stream_changes(request, [player_id], cursor, collections, fields, exclude)
+
 @router.get("/{player_id}", response_model=APIResponse)
-async def get_player_by_id(player_id: str):
-    player = get_player(player_id)
+async def get_player_by_id(player_id: str, request: Request, response: Response, fields: Optional[str] = None, exclude: Optional[str] = None):
+    selected = _projection(fields, exclude, Player.model_fields)
+    get_player_name(player_id)
+    _check_not_modified(request, response, _etag(player_id, variant=selected))
+    player = get_player(player_id, collections(selected))
     return {
         "success": True,
         "message": f"Retrieved player {player.name}",
-        "data": player
+        "data": project_player(player, selected, repository)
     }
 
 @router.put("/{player_id}", response_model=APIResponse)
-async def update_player(player_id: str, player_update: PlayerUpdate):
-    player = get_player(player_id)
+async def update_player(
+    player_id: str,
+    player_update: PlayerUpdate,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None
+):
+    selected = _projection(fields, exclude, Player.model_fields)
+    get_player_name(player_id)
+    _check_precondition(request, _etag(player_id))
     
     # Update player fields
-    player.name = player_update.name
-    player.location = player_update.location
-    player.last_updated = datetime.datetime.now()
+    apply_mutation("update_player", player_id, {
+        "name": player_update.name,
+        "location": player_update.location.dict()
+    })
     
+    player = get_player(player_id, collections(selected))
+    response.headers["ETag"] = _etag(player_id, variant=selected)
     return {
         "success": True,
         "message": f"Player {player.name} updated successfully",
-        "data": player
+        "data": project_player(player, selected, repository)
     }
 
 @router.delete("/{player_id}", response_model=APIResponse)
-async def delete_player(player_id: str):
-    if player_id not in players:
-        raise HTTPException(status_code=404, detail=f"Player with ID {player_id} not found")
-    
-    player_name = players[player_id].name
-    del players[player_id]
+async def delete_player(player_id: str, request: Request):
+    player_name = get_player_name(player_id)
+    _check_precondition(request, _etag(player_id))
+    apply_mutation("delete_player", player_id, {})
     
     return {
         "success": True,
@@ -110,107 +555,175 @@ async def delete_player(player_id: str):
 
 # Team management endpoints
 @router.get("/{player_id}/team", response_model=APIResponse)
-async def get_player_team(player_id: str):
-    player = get_player(player_id)
+async def get_player_team(player_id: str, request: Request, response: Response):
+    player_name = get_player_name(player_id)
+    _check_not_modified(request, response, _etag(player_id, ["team"]))
     return {
         "success": True,
-        "message": f"Retrieved team for player {player.name}",
-        "data": {"team": player.team}
+        "message": f"Retrieved team for player {player_name}",
+        "data": {"team": repository.get_team(player_id)}
     }
 
 @router.post("/{player_id}/team", response_model=APIResponse)
-async def add_pokemon_to_team(player_id: str, pokemon: PokemonCreate):
-    player = get_player(player_id)
+async def add_pokemon_to_team(player_id: str, pokemon: PokemonCreate, request: Request, response: Response):
+    player_name = get_player_name(player_id)
+    _check_precondition(request, _etag(player_id, ["team"]), _etag(player_id))
+    team = repository.get_team(player_id)
     
-    if len(player.team) >= 6:
+    if len(team) >= 6:
         raise HTTPException(status_code=400, detail="Team already has maximum 6 Pokemon")
     
     # Create new Pokemon
-    new_pokemon = Pokemon(
-        id=len(player.team) + 1,
-        name=pokemon.name,
-        level=pokemon.level,
-        types=pokemon.types,
-        abilities=pokemon.abilities,
-        nature=pokemon.nature,
-        held_item=pokemon.held_item,
-        base_stats=pokemon.base_stats,
-        current_hp=pokemon.base_stats.hp,
-        max_hp=pokemon.base_stats.hp
-    )
-    
-    player.team.append(new_pokemon)
-    player.last_updated = datetime.datetime.now()
+    new_pokemon = _build_pokemon(pokemon, len(team) + 1)
+    apply_mutation("add_pokemon", player_id, {"pokemon": new_pokemon.dict()})
+    response.headers["ETag"] = _etag(player_id, ["team"])
     
     return {
         "success": True,
-        "message": f"Added {pokemon.name} to {player.name}'s team",
+        "message": f"Added {pokemon.name} to {player_name}'s team",
         "data": new_pokemon
     }
 
 @router.delete("/{player_id}/team/{pokemon_index}", response_model=APIResponse)
-async def remove_team_pokemon(player_id: str, pokemon_index: int):
-    player = get_player(player_id)
+async def remove_team_pokemon(player_id: str, pokemon_index: int, request: Request, response: Response):
+    player_name = get_player_name(player_id)
+    _check_precondition(request, _etag(player_id, ["team"]), _etag(player_id))
+    team = repository.get_team(player_id)
     
-    if pokemon_index < 0 or pokemon_index >= len(player.team):
+    if pokemon_index < 0 or pokemon_index >= len(team):
         raise HTTPException(status_code=404, detail=f"Pokemon at index {pokemon_index} not found")
     
-    removed_pokemon = player.team.pop(pokemon_index)
-    player.last_updated = datetime.datetime.now()
+    removed_pokemon = team[pokemon_index]
+    apply_mutation("remove_pokemon", player_id, {"index": pokemon_index})
+    response.headers["ETag"] = _etag(player_id, ["team"])
     
     return {
         "success": True,
-        "message": f"Removed {removed_pokemon.name} from {player.name}'s team"
+        "message": f"Removed {removed_pokemon.name} from {player_name}'s team"
     }
 
 # Thought history endpoints
+def _search_thoughts(player_ids: List[str], q: str, limit: int, recency: float) -> Dict[str, Any]:
+    phrases = parse_query(q)
+    if not phrases:
+        raise HTTPException(status_code=400, detail="Search query has no words")
+    
+    hits, total = thought_search.search(player_ids, phrases, limit, recency)
+    
+    # Read only the thoughts of the hits, a player at a time
+    positions: Dict[str, List[int]] = {}
+    for _, player_id, position in hits:
+        positions.setdefault(player_id, []).append(position)
+    thoughts = {
+        (player_id, position): thought
+        for player_id, player_positions in positions.items()
+        for position, thought in zip(player_positions, repository.get_thoughts_at(player_id, player_positions))
+    }
+    results = [
+        {"player_id": player_id, "score": round(score, 4), "thought": thoughts[(player_id, position)]}
+        for score, player_id, position in hits
+    ]
+    return {"query": q, "total": total, "results": results}
+
+@router.get("/thoughts/search", response_model=APIResponse)
+async def search_all_thoughts(q: str, limit: int = Query(20, ge=1, le=100), recency: float = Query(1.0, ge=0)):
+    data = _search_thoughts(repository.player_ids(), q, limit, recency)
+    return {
+        "success": True,
+        "message": f"Found {data['total']} thoughts matching {q!r}",
+        "data": data
+    }
+
+@router.get("/{player_id}/thoughts/search", response_model=APIResponse)
+async def search_player_thoughts(player_id: str, q: str, limit: int = Query(20, ge=1, le=100), recency: float = Query(1.0, ge=0)):
+    player_name = get_player_name(player_id)
+    data = _search_thoughts([player_id], q, limit, recency)
+    return {
+        "success": True,
+        "message": f"Found {data['total']} thoughts matching {q!r} for player {player_name}",
+        "data": data
+    }
+
 @router.get("/{player_id}/thoughts", response_model=APIResponse)
-async def get_player_thoughts(player_id: str):
-    player = get_player(player_id)
+async def get_player_thoughts(
+    player_id: str,
+    request: Request,
+    response: Response,
+    category: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    order: str = "asc"
+):
+    player_name = get_player_name(player_id)
+    options = _page_options(cursor, since, until, order)
+    _check_not_modified(request, response, _etag(player_id, ["thoughts"]))
+    thoughts, total, next_key = repository.page_thoughts(player_id, limit, category or None, **options)
     return {
         "success": True,
-        "message": f"Retrieved thoughts for player {player.name}",
-        "data": {"thoughts": player.thought_history}
+        "message": f"Retrieved {len(thoughts)} thoughts for player {player_name}",
+        "data": {"thoughts": thoughts, "pagination": _pagination(total, limit, next_key)}
     }
 
-@router.post("/{player_id}/thoughts", response_model=APIResponse)
-async def add_player_thought(player_id: str, thought: ThoughtCreate):
-    player = get_player(player_id)
-    
-    # Create new thought
-    thought_id = f"thought_{len(player.thought_history) + 1}"
-    new_thought = {
-        "id": thought_id,
+def _new_thought(player_id: str, thought: ThoughtCreate) -> Dict[str, Any]:
+    return {
+        "id": f"thought_{repository.count_thoughts(player_id) + 1}",
         "content": thought.content,
         "category": thought.category,
-        "timestamp": datetime.datetime.now()
+        "timestamp": datetime.datetime.now(),
+        "context": thought.context
     }
+
+@router.post("/{player_id}/thoughts", response_model=APIResponse)
+async def add_player_thought(player_id: str, thought: ThoughtCreate, request: Request, response: Response):
+    player_name = get_player_name(player_id)
+    _check_precondition(request, _etag(player_id, ["thoughts"]), _etag(player_id))
     
-    player.thought_history.append(new_thought)
-    player.last_updated = datetime.datetime.now()
+    # Create new thought
+    new_thought = _new_thought(player_id, thought)
+    apply_mutation("add_thought", player_id, {"thought": new_thought})
+    response.headers["ETag"] = _etag(player_id, ["thoughts"])
     
     return {
         "success": True,
-        "message": f"Added thought for player {player.name}",
+        "message": f"Added thought for player {player_name}",
         "data": new_thought
     }
 
 # Battle history endpoints
 @router.get("/{player_id}/battles", response_model=APIResponse)
-async def get_player_battles(player_id: str):
-    player = get_player(player_id)
+async def get_player_battles(
+    player_id: str,
+    request: Request,
+    response: Response,
+    opponent_id: Optional[str] = None,
+    expand_teams: bool = False,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    order: str = "asc"
+):
+    player_name = get_player_name(player_id)
+    options = _page_options(cursor, since, until, order)
+    _check_not_modified(request, response, _etag(player_id, ["battles"]))
+    battles, total, next_key = repository.page_battles(player_id, limit, opponent_id or None, **options)
+    if expand_teams:
+        battles = _expand_teams(player_id, battles)
     return {
         "success": True,
-        "message": f"Retrieved battles for player {player.name}",
-        "data": {"battles": player.battle_history}
+        "message": f"Retrieved {len(battles)} battles for player {player_name}",
+        "data": {"battles": battles, "pagination": _pagination(total, limit, next_key)}
     }
 
-@router.post("/{player_id}/battles", response_model=APIResponse)
-async def start_battle(player_id: str, battle: BattleCreate):
-    player = get_player(player_id)
+def _start_battle_payload(player_id: str, battle: BattleCreate) -> Dict[str, Any]:
+    # Battles refer to a snapshot of the team, stored once per distinct team
+    team = repository.get_team(player_id)
+    snapshot_id = team_snapshot_id(team)
     
     # Create new battle
-    battle_id = f"battle_{len(player.battle_history) + 1}"
+    battle_id = f"battle_{repository.count_battles(player_id) + 1}"
     new_battle = {
         "id": battle_id,
         "opponent_id": battle.opponent_id,
@@ -218,28 +731,44 @@ async def start_battle(player_id: str, battle: BattleCreate):
         "start_time": datetime.datetime.now(),
         "end_time": None,
         "result": None,
-        "player_team": player.team,
+        "player_team": [],
+        "player_team_id": snapshot_id,
         "opponent_team": [],
         "turns": []
     }
     
-    player.battle_history.append(new_battle)
-    player.last_updated = datetime.datetime.now()
+    payload = {"battle": new_battle}
+    if repository.get_team_snapshot(player_id, snapshot_id) is None:
+        payload["team_snapshot"] = {"id": snapshot_id, "team": [pokemon.dict() for pokemon in team]}
+    return payload
+
+@router.post("/{player_id}/battles", response_model=APIResponse)
+async def start_battle(player_id: str, battle: BattleCreate, request: Request, response: Response):
+    get_player_name(player_id)
+    _check_precondition(request, _etag(player_id, ["battles"]), _etag(player_id))
+    
+    payload = _start_battle_payload(player_id, battle)
+    apply_mutation("start_battle", player_id, payload)
+    response.headers["ETag"] = _etag(player_id, ["battles"])
     
     return {
         "success": True,
         "message": f"Started battle against {battle.opponent_name}",
-        "data": {"battle_id": battle_id}
+        "data": {"battle_id": payload["battle"]["id"]}
     }
 
 @router.get("/{player_id}/battles/{battle_id}", response_model=APIResponse)
-async def get_battle_details(player_id: str, battle_id: str):
-    player = get_player(player_id)
+async def get_battle_details(player_id: str, battle_id: str, request: Request, response: Response, expand_teams: bool = False):
+    get_player_name(player_id)
+    _check_not_modified(request, response, _etag(player_id, ["battles"]))
     
     # Find battle
-    battle = next((b for b in player.battle_history if b["id"] == battle_id), None)
-    if not battle:
+    found = repository.get_battle(player_id, battle_id)
+    if not found:
         raise HTTPException(status_code=404, detail=f"Battle with ID {battle_id} not found")
+    _, battle = found
+    if expand_teams:
+        battle = _expand_teams(player_id, [battle])[0]
     
     return {
         "success": True,
@@ -247,57 +776,305 @@ async def get_battle_details(player_id: str, battle_id: str):
         "data": battle
     }
 
-@router.put("/{player_id}/battles/{battle_id}", response_model=APIResponse)
-async def end_battle(player_id: str, battle_id: str, result: str):
-    player = get_player(player_id)
-    
+def _end_battle_payload(player_id: str, battle_id: str, result: str) -> Dict[str, Any]:
     # Find battle
-    battle = next((b for b in player.battle_history if b["id"] == battle_id), None)
-    if not battle:
+    found = repository.get_battle(player_id, battle_id)
+    if not found:
         raise HTTPException(status_code=404, detail=f"Battle with ID {battle_id} not found")
+    _, battle = found
+    
+    # Ending a battle twice would count it twice in the matchup stats
+    if battle.result is not None:
+        raise HTTPException(status_code=409, detail=f"Battle {battle_id} already ended with result '{battle.result}'")
     
     # Validate result
     if result not in ["win", "loss", "draw"]:
         raise HTTPException(status_code=400, detail=f"Invalid result: {result}. Must be 'win', 'loss', or 'draw'")
     
-    # Update battle
-    battle["result"] = result
-    battle["end_time"] = datetime.datetime.now()
-    
     # Update matchup records
-    opponent_id = battle["opponent_id"]
-    if opponent_id not in player.matchup_records:
-        player.matchup_records[opponent_id] = {
-            "opponent_id": opponent_id,
-            "opponent_name": battle["opponent_name"],
-            "wins": 0,
-            "losses": 0,
-            "draws": 0,
-            "last_battle": datetime.datetime.now()
-        }
-    
-    if result == "win":
-        player.matchup_records[opponent_id]["wins"] += 1
-    elif result == "loss":
-        player.matchup_records[opponent_id]["losses"] += 1
+    opponent_id = battle.opponent_id
+    record = repository.get_matchup(player_id, opponent_id)
+    if record is not None:
+        matchup = record.copy(deep=True)
     else:
-        player.matchup_records[opponent_id]["draws"] += 1
+        matchup = MatchupRecord(opponent_id=opponent_id, opponent_name=battle.opponent_name)
+    record_result(matchup, result, datetime.datetime.now())
+    return {"battle_id": battle_id, "result": result, "matchup": matchup.dict()}
+
+@router.put("/{player_id}/battles/{battle_id}", response_model=APIResponse)
+async def end_battle(player_id: str, battle_id: str, result: str, request: Request, response: Response):
+    get_player_name(player_id)
+    _check_precondition(request, _etag(player_id, ["battles"]), _etag(player_id))
     
-    player.matchup_records[opponent_id]["last_battle"] = datetime.datetime.now()
-    player.last_updated = datetime.datetime.now()
+    # Update battle
+    apply_mutation("end_battle", player_id, _end_battle_payload(player_id, battle_id, result))
+    response.headers["ETag"] = _etag(player_id, ["battles"])
     
+    _, battle = repository.get_battle(player_id, battle_id)
     return {
         "success": True,
         "message": f"Battle ended with result: {result}",
         "data": battle
     }
 
+# Turn endpoints
+def _append_turns(player_id: str, battle_id: str, turns: List[TurnEvent], request: Request, response: Response) -> Dict[str, Any]:
+    get_player_name(player_id)
+    _check_precondition(request, _etag(player_id, ["battles"]), _etag(player_id))
+    
+    # Find battle
+    found = repository.get_battle(player_id, battle_id)
+    if not found:
+        raise HTTPException(status_code=404, detail=f"Battle with ID {battle_id} not found")
+    _, battle = found
+    
+    if battle.result is not None:
+        raise HTTPException(status_code=400, detail=f"Battle {battle_id} has already ended")
+    if not turns:
+        raise HTTPException(status_code=400, detail="No turns given")
+    
+    # Turns are stored in turn order, so a turn may not come before the last one
+    last_turn = battle.turns.last_turn
+    for turn in turns:
+        if last_turn is not None and turn.turn < last_turn:
+            raise HTTPException(status_code=400, detail=f"Turn {turn.turn} comes before turn {last_turn}")
+        last_turn = turn.turn
+    
+    total = len(battle.turns) + len(turns)
+    apply_mutation("add_turns", player_id, {
+        "battle_id": battle_id,
+        "turns": [turn.dict(exclude_none=True) for turn in turns]
+    })
+    response.headers["ETag"] = _etag(player_id, ["battles"])
+    
+    return {"battle_id": battle_id, "added": len(turns), "total": total}
+
+@router.get("/{player_id}/battles/{battle_id}/turns", response_model=APIResponse)
+async def get_battle_turns(
+    player_id: str,
+    battle_id: str,
+    request: Request,
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    get_player_name(player_id)
+    _check_not_modified(request, response, _etag(player_id, ["battles"]))
+    
+    # Find battle
+    found = repository.get_battle(player_id, battle_id)
+    if not found:
+        raise HTTPException(status_code=404, detail=f"Battle with ID {battle_id} not found")
+    _, battle = found
+    
+    end = len(battle.turns) if limit is None else offset + limit
+    return {
+        "success": True,
+        "message": f"Retrieved turns for battle {battle_id}",
+        "data": {"turns": battle.turns[offset:end], "total": len(battle.turns)}
+    }
+
+@router.post("/{player_id}/battles/{battle_id}/turns", response_model=APIResponse)
+async def add_battle_turn(player_id: str, battle_id: str, turn: TurnEvent, request: Request, response: Response):
+    return {
+        "success": True,
+        "message": f"Added turn {turn.turn} to battle {battle_id}",
+        "data": _append_turns(player_id, battle_id, [turn], request, response)
+    }
+
+@router.post("/{player_id}/battles/{battle_id}/turns/batch", response_model=APIResponse)
+async def add_battle_turns(player_id: str, battle_id: str, turns: List[TurnEvent], request: Request, response: Response):
+    return {
+        "success": True,
+        "message": f"Added {len(turns)} turns to battle {battle_id}",
+        "data": _append_turns(player_id, battle_id, turns, request, response)
+    }
+
+# Battle stream endpoints
+@router.get("/{player_id}/battles/{battle_id}/stream")
+async def stream_battle(player_id: str, battle_id: str, request: Request, from_turn: int = Query(0, ge=0)):
+    get_player_name(player_id)
+    
+    # Find battle
+    found = repository.get_battle(player_id, battle_id)
+    if not found:
+        raise HTTPException(status_code=404, detail=f"Battle with ID {battle_id} not found")
+    _, battle = found
+    
+    # A reconnecting EventSource resumes after the last event it received
+    start = first_turn_index(battle.turns, from_turn) if from_turn else 0
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        try:
+            start = int(last_event_id) + 1
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid Last-Event-ID: {last_event_id}")
+    
+    return StreamingResponse(
+        battle_stream.events(player_id, battle_id, start),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Team snapshot endpoints
+@router.get("/{player_id}/teams", response_model=APIResponse)
+async def get_team_snapshots(player_id: str, request: Request, response: Response):
+    player_name = get_player_name(player_id)
+    _check_not_modified(request, response, _etag(player_id, ["snapshots"]))
+    return {
+        "success": True,
+        "message": f"Retrieved team snapshots for player {player_name}",
+        "data": {"teams": repository.get_team_snapshots(player_id)}
+    }
+
+@router.get("/{player_id}/teams/{snapshot_id}", response_model=APIResponse)
+async def get_team_snapshot(player_id: str, snapshot_id: str, request: Request, response: Response):
+    get_player_name(player_id)
+    _check_not_modified(request, response, _etag(player_id, ["snapshots"]))
+    
+    team = repository.get_team_snapshot(player_id, snapshot_id)
+    if team is None:
+        raise HTTPException(status_code=404, detail=f"Team snapshot with ID {snapshot_id} not found")
+    
+    return {
+        "success": True,
+        "message": f"Retrieved team snapshot {snapshot_id}",
+        "data": {"id": snapshot_id, "team": team}
+    }
+
 # Matchup records endpoints
 @router.get("/{player_id}/matchups", response_model=APIResponse)
-async def get_player_matchups(player_id: str):
-    player = get_player(player_id)
+async def get_player_matchups(player_id: str, request: Request, response: Response):
+    player_name = get_player_name(player_id)
+    # The rolling statistics also move with the clock
+    _check_not_modified(request, response, _etag(player_id, ["matchups"], stats_period()))
+    matchups = repository.get_matchups(player_id)
+    return {
+        "success": True,
+        "message": f"Retrieved matchup records for player {player_name}",
+        "data": {"matchups": matchups, "stats": all_matchup_stats(matchups)}
+    }
+
+@router.get("/{player_id}/matchups/{opponent_id}", response_model=APIResponse)
+async def get_player_matchup(player_id: str, opponent_id: str, request: Request, response: Response):
+    get_player_name(player_id)
+    _check_not_modified(request, response, _etag(player_id, ["matchups"], stats_period()))
+    
+    record = repository.get_matchup(player_id, opponent_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Matchup record with opponent {opponent_id} not found")
+    
+    return {
+        "success": True,
+        "message": f"Retrieved matchup record with opponent {opponent_id}",
+        "data": {"matchup": record, "stats": matchup_stats(record)}
+    }
+
+# Analytics endpoints
+def _species_summaries(stats: Dict[str, List[int]]) -> Dict[str, Dict[str, Any]]:
+    # Most used species first
+    return {species: species_summary(counters) for species, counters in sorted(stats.items(), key=lambda item: -item[1][0])}
+
+@router.get("/{player_id}/analytics", response_model=APIResponse)
+async def get_player_analytics(player_id: str):
+    player_name = get_player_name(player_id)
+    return {
+        "success": True,
+        "message": f"Retrieved analytics for player {player_name}",
+        "data": {"species": _species_summaries(species_analytics.get(player_id))}
+    }
+
+@router.get("/{player_id}/analytics/{species}", response_model=APIResponse)
+async def get_species_analytics(player_id: str, species: str):
+    get_player_name(player_id)
+    
+    counters = species_analytics.get(player_id).get(species)
+    if counters is None:
+        raise HTTPException(status_code=404, detail=f"No battles recorded for species {species}")
+    
+    return {
+        "success": True,
+        "message": f"Retrieved analytics for species {species}",
+        "data": {"species": species, **species_summary(counters)}
+    }
+
+@router.post("/{player_id}/analytics/rebuild", response_model=APIResponse)
+async def rebuild_player_analytics(player_id: str):
+    player_name = get_player_name(player_id)
+    stats = species_analytics.rebuild(player_id)
     return {
         "success": True,
-        "message": f"Retrieved matchup records for player {player.name}",
-        "data": {"matchups": player.matchup_records}
+        "message": f"Rebuilt analytics for player {player_name}",
+        "data": {"species": _species_summaries(stats)}
     }
+
+# Batch endpoints
+BATCH_ITEM = TypeAdapter(BatchItem)
+
+def _batch_mutation(item: BatchItem) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+    # The mutation of one batch item and the data to report for it
+    player_name = get_player_name(item.player_id)
+    if isinstance(item, BatchThought):
+        thought = _new_thought(item.player_id, item)
+        return "add_thought", {"thought": thought}, {"thought_id": thought["id"]}
+    if isinstance(item, BatchBattleStart):
+        payload = _start_battle_payload(item.player_id, item)
+        return "start_battle", payload, {"battle_id": payload["battle"]["id"]}
+    if isinstance(item, BatchBattleEnd):
+        return "end_battle", _end_battle_payload(item.player_id, item.battle_id, item.result), {"battle_id": item.battle_id, "result": item.result}
+    return "update_player", {"name": player_name, "location": item.location.dict()}, {}
+
+def apply_batch(items: List[Dict[str, Any]], player_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Validate and apply the items of a batch in order, and log them together.
+    
+    Each item is checked against the changes of the items before it, so a
+    battle started in a batch can be ended later in the same batch. An
+    item that fails is reported with its status and error and the rest
+    are still applied. Items without a ``player_id`` are for ``player_id``.
+    """
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch has {len(items)} items, at most {MAX_BATCH_ITEMS} are allowed")
+    
+    timestamp = datetime.datetime.now()
+    applied = []
+    results = []
+    try:
+        for index, data in enumerate(items):
+            try:
+                if player_id is not None:
+                    data = {"player_id": player_id, **data}
+                    if data["player_id"] != player_id:
+                        raise HTTPException(status_code=400, detail=f"Item is for player {data['player_id']}, not {player_id}")
+                item = BATCH_ITEM.validate_python(data)
+                op, payload, result = _batch_mutation(item)
+            except ValidationError as e:
+                results.append({"index": index, "success": False, "status": 422, "error": e.errors(include_url=False, include_context=False)})
+                continue
+            except HTTPException as e:
+                results.append({"index": index, "success": False, "status": e.status_code, "error": e.detail})
+                continue
+            
+            MUTATION_APPLIERS[op](item.player_id, payload, timestamp)
+            autosave.notify()
+            applied.append((op, item.player_id, payload))
+            results.append({"index": index, "success": True, "data": result})
+    finally:
+        _log_mutations(applied, timestamp)
+    return results
+
+def _batch_response(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    applied = sum(result["success"] for result in results)
+    return {
+        "success": True,
+        "message": f"Applied {applied} of {len(results)} items",
+        "data": {"applied": applied, "failed": len(results) - applied, "results": results}
+    }
+
+@router.post("/batch", response_model=APIResponse)
+async def apply_players_batch(batch: BatchRequest):
+    return _batch_response(apply_batch(batch.items))
+
+@router.post("/{player_id}/batch", response_model=APIResponse)
+async def apply_player_batch(player_id: str, batch: BatchRequest):
+    get_player_name(player_id)
+    return _batch_response(apply_batch(batch.items, player_id))
@@ -1,18 +1,129 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any
 import datetime
+import shutil
 
-from server.utils.save_manager import SaveManager
-from server.models.save import SaveFileCreate, SaveFileResponse, SaveFileList
+from server.utils.save_manager import SaveManager, is_valid_id
+from server.utils.save_codec import CODECS
+from server.utils.save_jobs import save_jobs
+from server.utils.backup_store import backup_store
+from server.utils.autosave import autosave
+from server.utils.mutation_log import mutation_log
+from server.utils.change_tracker import change_tracker
+from server.utils.player_repository import repository
+from server.utils.lazy_player import dump_player, new_pin_dir, hold_pins, release_pins
+from server.utils.save_stream import SaveImporter, StreamFormatError, snapshot_save, iter_export, encode_lines
+from server.models.save import SaveFileCreate, SaveFileResponse, SaveFileList, SaveJobCreate, BackupInfo, AutosaveConfig
 from server.models.api import APIResponse
 from server.api.player import get_all_players, replace_all_players
 
 router = APIRouter(prefix="/saves", tags=["saves"])
 
+# Bytes of an import stream handed to the save I/O pool at a time
+IMPORT_CHUNK_BYTES = 1024 * 1024
+
+# Save operations, shared by the endpoints and background jobs. Disk I/O
+# and encoding run in the save I/O pool; only the snapshot of the players
+# (and swapping in loaded ones) happens on the event loop.
+def _validate_format(save_format: str) -> None:
+    if save_format not in CODECS:
+        raise HTTPException(status_code=400, detail=f"Invalid format: {save_format}. Must be one of {', '.join(CODECS)}")
+
+def _validate_id(value: Optional[str], kind: str = "save") -> None:
+    # IDs become file names: refuse anything that could leave the save directories
+    if value is not None and not is_valid_id(value):
+        raise HTTPException(status_code=400, detail=f"Invalid {kind} ID: {value!r}")
+
+async def _create_save(save_data: SaveFileCreate) -> SaveFileResponse:
+    save_state = SaveManager.new_save_state(save_data)
+    async with save_jobs.lock(save_state["header"]["id"]):
+        save_plan = SaveManager.plan_save(save_state, get_all_players())
+        return await save_jobs.run_io(SaveManager.write_save, save_plan)
+
+async def _update_save(save_id: str) -> SaveFileResponse:
+    async with save_jobs.lock(save_id):
+        save_state = await save_jobs.run_io(SaveManager.read_save_state, save_id)
+        if save_state is None:
+            raise HTTPException(status_code=404, detail=f"Save file with ID {save_id} not found")
+        
+        # Update player data and last_updated timestamp
+        save_state["header"]["last_updated"] = datetime.datetime.now()
+        save_plan = SaveManager.plan_save(save_state, get_all_players())
+        return await save_jobs.run_io(SaveManager.write_save, save_plan)
+
+def _read_players(save_id: str, pin_dir: Optional[str]):
+    if pin_dir:
+        players = SaveManager.load_save_lazy(save_id, pin_dir)
+    else:
+        players = SaveManager.load_save(save_id)
+    if not players:
+        return None
+    if repository.durable:
+        return players, None
+    
+    # Encode the new checkpoint here too, so loading a big save does not
+    # serialize every player on the event loop
+    return players, mutation_log.prepare_checkpoint([dump_player(player) for player in players])
+
+async def _load_save(save_id: str, lazy: bool = False) -> Dict[str, Any]:
+    # A lazy load pins the save's history segments until the players that
+    # read from them are checkpointed
+    pin_dir = new_pin_dir() if lazy else None
+    if pin_dir:
+        hold_pins([pin_dir])
+    
+    try:
+        async with save_jobs.lock(save_id):
+            loaded = await save_jobs.run_io(_read_players, save_id, pin_dir)
+            
+            if loaded is None:
+                raise HTTPException(status_code=404, detail=f"Save file with ID {save_id} not found or could not be loaded")
+            
+            # Replace all current players with loaded players
+            players, checkpoint = loaded
+            replace_all_players(players, checkpoint)
+            
+            # Nothing changed in the new tracker session yet, so the save
+            # holds exactly these players and later updates of it can append
+            await save_jobs.run_io(SaveManager.adopt_save, save_id, change_tracker.session)
+    finally:
+        if pin_dir:
+            release_pins([pin_dir])
+    
+    return {"player_count": len(players), "lazy": lazy}
+
+async def autosave_players(save_id: Optional[str]) -> str:
+    """Write the autosave, creating its save on the first write"""
+    if save_id is None:
+        save_file = await _create_save(SaveFileCreate(name="Autosave"))
+    else:
+        save_file = await _update_save(save_id)
+    return save_file.id
+
+def _release_export(pin_dir: str) -> None:
+    release_pins([pin_dir])
+    shutil.rmtree(pin_dir, ignore_errors=True)
+
+def _snapshot_save(save_id: str, pin_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        return snapshot_save(save_id, pin_dir)
+    except Exception as e:
+        print(f"Error exporting save {save_id}: {e}")
+        return None
+
+async def _create_backup(save_id: str) -> Dict[str, Any]:
+    async with save_jobs.lock(save_id):
+        backup_id = await save_jobs.run_io(SaveManager.create_backup, save_id)
+    
+    if not backup_id:
+        raise HTTPException(status_code=404, detail=f"Save file with ID {save_id} not found or could not be backed up")
+    return {"backup_id": backup_id}
+
 @router.get("/", response_model=APIResponse)
 async def get_saves():
     """Get all save files"""
-    saves = SaveManager.get_all_saves()
+    saves = await save_jobs.run_io(SaveManager.get_all_saves)
     return {
         "success": True,
         "message": "Save files retrieved successfully",
@@ -24,11 +135,10 @@ async def get_saves():
 @router.post("/", response_model=APIResponse)
 async def create_save(save_data: SaveFileCreate):
     """Create a new save file"""
-    # Get all current players
-    players = get_all_players()
+    _validate_format(save_data.format)
     
-    # Create save file
-    save_file = SaveManager.create_save(save_data, players)
+    # Create save file from all current players
+    save_file = await _create_save(save_data)
     
     return {
         "success": True,
@@ -36,10 +146,205 @@ async def create_save(save_data: SaveFileCreate):
         "data": save_file
     }
 
+@router.post("/import", response_model=APIResponse)
+async def import_save(request: Request, name: Optional[str] = None, format: Optional[str] = None):
+    """Create a save from an NDJSON export stream"""
+    if format is not None:
+        _validate_format(format)
+    
+    # Lines are parsed and written in the save I/O pool a chunk at a time,
+    # so only one chunk of the upload is in memory
+    importer = SaveImporter(name, format)
+    try:
+        lines = []
+        pending = b""
+        size = 0
+        async for chunk in request.stream():
+            parts = (pending + chunk).split(b"\n")
+            pending = parts.pop()
+            lines.extend(parts)
+            size += len(chunk)
+            if size >= IMPORT_CHUNK_BYTES:
+                await save_jobs.run_io(importer.add_lines, lines)
+                lines = []
+                size = 0
+        
+        lines.append(pending)
+        await save_jobs.run_io(importer.add_lines, lines)
+        save_file = await save_jobs.run_io(importer.finish)
+    except StreamFormatError as e:
+        await save_jobs.run_io(importer.abort)
+        raise HTTPException(status_code=400, detail=f"Invalid import stream: {e}")
+    except BaseException:
+        await save_jobs.run_io(importer.abort)
+        raise
+    
+    return {
+        "success": True,
+        "message": f"Save file '{save_file.name}' imported successfully",
+        "data": save_file
+    }
+
+# Job endpoints
+@router.post("/jobs/", response_model=APIResponse, status_code=202)
+async def submit_save_job(job_data: SaveJobCreate):
+    """Start a save, update, load or backup in the background"""
+    if job_data.action == "create":
+        if not job_data.name:
+            raise HTTPException(status_code=400, detail="A name is required to create a save")
+        _validate_format(job_data.format)
+        save_data = SaveFileCreate(name=job_data.name, game_version=job_data.game_version, format=job_data.format)
+        operation = lambda: _create_save(save_data)
+    elif job_data.action in ("update", "load", "backup"):
+        if not job_data.save_id:
+            raise HTTPException(status_code=400, detail=f"A save_id is required to {job_data.action} a save")
+        _validate_id(job_data.save_id)
+        operations = {"update": _update_save, "load": lambda save_id: _load_save(save_id, job_data.lazy), "backup": _create_backup}
+        operation = lambda: operations[job_data.action](job_data.save_id)
+    else:
+        raise HTTPException(status_code=400, detail=f"Invalid action: {job_data.action}. Must be one of create, update, load, backup")
+    
+    job = save_jobs.submit(job_data.action, job_data.save_id, operation)
+    
+    if not job:
+        raise HTTPException(status_code=429, detail="Too many save jobs in progress, try again later")
+    
+    return {
+        "success": True,
+        "message": f"Save job {job.id} submitted",
+        "data": job
+    }
+
+@router.get("/jobs/", response_model=APIResponse)
+async def get_save_jobs():
+    """Get all recent save jobs"""
+    return {
+        "success": True,
+        "message": "Save jobs retrieved successfully",
+        "data": {
+            "jobs": save_jobs.list()
+        }
+    }
+
+@router.get("/jobs/{job_id}", response_model=APIResponse)
+async def get_save_job(job_id: str):
+    """Get the status of a save job"""
+    job = save_jobs.get(job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Save job with ID {job_id} not found")
+    
+    return {
+        "success": True,
+        "message": f"Save job {job_id} is {job.status}",
+        "data": job
+    }
+
+# Autosave endpoints
+@router.get("/autosave", response_model=APIResponse)
+async def get_autosave():
+    """Get the autosave settings and status"""
+    return {
+        "success": True,
+        "message": "Autosave status retrieved successfully",
+        "data": autosave.status()
+    }
+
+@router.put("/autosave", response_model=APIResponse)
+async def configure_autosave(config: AutosaveConfig):
+    """Set the autosave interval and target save"""
+    if config.interval < 0:
+        raise HTTPException(status_code=400, detail="Interval must not be negative")
+    
+    _validate_id(config.save_id)
+    if config.save_id and not await save_jobs.run_io(SaveManager._source_path, config.save_id):
+        raise HTTPException(status_code=404, detail=f"Save file with ID {config.save_id} not found")
+    
+    autosave.configure(config.interval, config.save_id)
+    
+    return {
+        "success": True,
+        "message": f"Autosave every {config.interval}s" if autosave.enabled else "Autosave disabled",
+        "data": autosave.status()
+    }
+
+# Backup endpoints
+@router.get("/backups/", response_model=APIResponse)
+async def get_backups(save_id: Optional[str] = None):
+    """Get all backups, optionally only those of one save"""
+    _validate_id(save_id)
+    backups = await save_jobs.run_io(backup_store.list, save_id)
+    return {
+        "success": True,
+        "message": "Backups retrieved successfully",
+        "data": {
+            "backups": [BackupInfo(**backup) for backup in backups]
+        }
+    }
+
+@router.post("/backups/gc", response_model=APIResponse)
+async def collect_backup_garbage():
+    """Delete backup chunks that no backup refers to"""
+    result = await save_jobs.run_io(backup_store.collect_garbage)
+    return {
+        "success": True,
+        "message": f"Removed {result['removed_chunks']} unreferenced chunks",
+        "data": result
+    }
+
+@router.get("/backups/{backup_id}/verify", response_model=APIResponse)
+async def verify_backup(backup_id: str):
+    """Check that all chunks of a backup are present and intact"""
+    _validate_id(backup_id, "backup")
+    result = await save_jobs.run_io(backup_store.verify, backup_id)
+    
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Backup with ID {backup_id} not found")
+    
+    return {
+        "success": result["ok"],
+        "message": f"Backup {backup_id} is {'intact' if result['ok'] else 'damaged'}",
+        "data": result
+    }
+
+@router.post("/backups/{backup_id}/restore", response_model=APIResponse)
+async def restore_backup(backup_id: str, save_id: Optional[str] = Query(None, description="Save to replace; defaults to a new save named after the backup")):
+    """Restore a backup as a save"""
+    _validate_id(backup_id, "backup")
+    _validate_id(save_id)
+    target_id = save_id or backup_id
+    async with save_jobs.lock(target_id):
+        save_file = await save_jobs.run_io(SaveManager.restore_backup, backup_id, save_id)
+    
+    if not save_file:
+        raise HTTPException(status_code=404, detail=f"Backup with ID {backup_id} not found or could not be restored")
+    
+    return {
+        "success": True,
+        "message": f"Backup {backup_id} restored to save {save_file.id}",
+        "data": save_file
+    }
+
+@router.delete("/backups/{backup_id}", response_model=APIResponse)
+async def delete_backup(backup_id: str):
+    """Delete a backup (its chunks are freed by garbage collection)"""
+    _validate_id(backup_id, "backup")
+    success = await save_jobs.run_io(backup_store.delete, backup_id)
+    
+    if not success:
+        raise HTTPException(status_code=404, detail=f"Backup with ID {backup_id} not found")
+    
+    return {
+        "success": True,
+        "message": f"Backup with ID {backup_id} deleted successfully"
+    }
+
 @router.get("/{save_id}", response_model=APIResponse)
 async def get_save(save_id: str):
     """Get a specific save file"""
-    save_file = SaveManager.get_save(save_id)
+    _validate_id(save_id)
+    async with save_jobs.lock(save_id):
+        save_file = await save_jobs.run_io(SaveManager.get_save, save_id)
     
     if not save_file:
         raise HTTPException(status_code=404, detail=f"Save file with ID {save_id} not found")
@@ -53,7 +358,9 @@ async def get_save(save_id: str):
 @router.delete("/{save_id}", response_model=APIResponse)
 async def delete_save(save_id: str):
     """Delete a save file"""
-    success = SaveManager.delete_save(save_id)
+    _validate_id(save_id)
+    async with save_jobs.lock(save_id):
+        success = await save_jobs.run_io(SaveManager.delete_save, save_id)
     
     if not success:
         raise HTTPException(status_code=404, detail=f"Save file with ID {save_id} not found")
@@ -64,48 +371,60 @@ async def delete_save(save_id: str):
     }
 
 @router.post("/{save_id}/load", response_model=APIResponse)
-async def load_save(save_id: str):
+async def load_save(save_id: str, lazy: bool = Query(False, description="Read each player's histories only when first accessed")):
     """Load a save file"""
-    players = SaveManager.load_save(save_id)
-    
-    if not players:
-        raise HTTPException(status_code=404, detail=f"Save file with ID {save_id} not found or could not be loaded")
-    
-    # Replace all current players with loaded players
-    replace_all_players(players)
+    _validate_id(save_id)
+    await _load_save(save_id, lazy)
     
     return {
         "success": True,
         "message": f"Save file with ID {save_id} loaded successfully"
     }
 
+@router.get("/{save_id}/export")
+async def export_save(save_id: str):
+    """Stream a save as NDJSON, one record per line"""
+    _validate_id(save_id)
+    # Pin the save's files so the stream is consistent even if the save
+    # is updated or deleted while it is being read
+    pin_dir = new_pin_dir()
+    hold_pins([pin_dir])
+    async with save_jobs.lock(save_id):
+        snapshot = await save_jobs.run_io(_snapshot_save, save_id, pin_dir)
+    
+    if not snapshot:
+        _release_export(pin_dir)
+        raise HTTPException(status_code=404, detail=f"Save file with ID {save_id} not found or could not be exported")
+    
+    def stream():
+        try:
+            yield from encode_lines(iter_export(snapshot))
+        finally:
+            _release_export(pin_dir)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{save_id}.ndjson"'}
+    )
+
 @router.post("/{save_id}/backup", response_model=APIResponse)
 async def create_backup(save_id: str):
     """Create a backup of a save file"""
-    backup_id = SaveManager.create_backup(save_id)
-    
-    if not backup_id:
-        raise HTTPException(status_code=404, detail=f"Save file with ID {save_id} not found or could not be backed up")
+    _validate_id(save_id)
+    backup = await _create_backup(save_id)
     
     return {
         "success": True,
         "message": f"Backup of save file with ID {save_id} created successfully",
-        "data": {
-            "backup_id": backup_id
-        }
+        "data": backup
     }
 
 @router.put("/{save_id}", response_model=APIResponse)
 async def update_save(save_id: str):
     """Update a save file with current player data"""
-    # Get all current players
-    players = get_all_players()
-    
-    # Update save file
-    save_file = SaveManager.update_save(save_id, players)
-    
-    if not save_file:
-        raise HTTPException(status_code=404, detail=f"Save file with ID {save_id} not found")
+    _validate_id(save_id)
+    save_file = await _update_save(save_id)
     
     return {
         "success": True,
@@ -14,6 +14,9 @@ from server.models.player import (
 )
 from server.models.save import SaveFile, SaveFileCreate
 from server.models.api import APIResponse, PaginatedResponse
+from server.utils.player_repository import repository, new_player_id, team_snapshot_id
+from server.utils.time_index import encode_cursor, decode_cursor
+from server.utils.matchup_stats import RESULT_CODES, record_result, matchup_stats, all_matchup_stats
 
 # Create FastAPI app
 app = FastAPI(
@@ -31,15 +34,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage (would be replaced with a database in production)
-players = {}
+# In-memory storage for save files; players live in the configured repository
 save_files = {}
 
 # Helper functions
+def get_player_name(player_id: str) -> str:
+    name = repository.get_player_name(player_id)
+    if name is None:
+        raise HTTPException(status_code=404, detail=f"Player with ID {player_id} not found")
+    return name
+
 def get_player(player_id: str) -> Player:
-    if player_id not in players:
+    player = repository.get_player(player_id)
+    if player is None:
         raise HTTPException(status_code=404, detail=f"Player with ID {player_id} not found")
-    return players[player_id]
+    return player
+
+def page_options(page: int, cursor: Optional[str], since: Optional[datetime], until: Optional[datetime], per_page: int) -> dict:
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Histories are stamped with naive local times
+    since, until = [t.astimezone().replace(tzinfo=None) if t is not None and t.tzinfo else t for t in (since, until)]
+    return {
+        "after": after,
+        "since": since,
+        "until": until,
+        "offset": 0 if after else (page - 1) * per_page
+    }
 
 # Routes
 @app.get("/", response_model=APIResponse)
@@ -53,7 +77,7 @@ async def root():
 # Player endpoints
 @app.post("/players/", response_model=APIResponse)
 async def create_player(player: PlayerCreate):
-    player_id = f"player_{len(players) + 1}"
+    player_id = new_player_id()
     
     # Create location
     location = MapLocation(
@@ -100,7 +124,7 @@ async def create_player(player: PlayerCreate):
         badges=set(player.badges)
     )
     
-    players[player_id] = new_player
+    repository.create_player(new_player)
     
     return APIResponse(
         success=True,
@@ -110,14 +134,11 @@ async def create_player(player: PlayerCreate):
 
 @app.get("/players/", response_model=PaginatedResponse)
 async def list_players(page: int = Query(1, ge=1), per_page: int = Query(10, ge=1, le=100)):
-    player_list = list(players.values())
-    total = len(player_list)
+    total = repository.count_players()
     total_pages = (total + per_page - 1) // per_page
     
     start_idx = (page - 1) * per_page
-    end_idx = min(start_idx + per_page, total)
-    
-    paginated_players = player_list[start_idx:end_idx]
+    paginated_players = repository.list_players(start_idx, per_page)
     
     return PaginatedResponse(
         success=True,
@@ -140,25 +161,21 @@ async def get_player_by_id(player_id: str):
 
 @app.put("/players/{player_id}", response_model=APIResponse)
 async def update_player(player_id: str, player_update: PlayerCreate):
-    player = get_player(player_id)
-    
-    # Update player fields
-    player.name = player_update.name
-    
-    # Update location
-    player.location = MapLocation(
-        location_tuple=player_update.location.location_tuple,
-        description=player_update.location.description,
-        accessible_locations=player_update.location.accessible_locations
-    )
-    
-    # Update items and badges
-    player.items = player_update.items
-    player.badges = set(player_update.badges)
-    
-    # Update last_updated timestamp
-    player.last_updated = datetime.now()
+    get_player_name(player_id)
+    
+    # Update player fields, location, items and badges, and the last_updated timestamp
+    repository.update_player(player_id, {
+        "name": player_update.name,
+        "location": MapLocation(
+            location_tuple=player_update.location.location_tuple,
+            description=player_update.location.description,
+            accessible_locations=player_update.location.accessible_locations
+        ),
+        "items": player_update.items,
+        "badges": set(player_update.badges)
+    }, datetime.now())
     
+    player = get_player(player_id)
     return APIResponse(
         success=True,
         message=f"Player {player.name} updated successfully",
@@ -167,11 +184,8 @@ async def update_player(player_id: str, player_update: PlayerCreate):
 
 @app.delete("/players/{player_id}", response_model=APIResponse)
 async def delete_player(player_id: str):
-    if player_id not in players:
-        raise HTTPException(status_code=404, detail=f"Player with ID {player_id} not found")
-    
-    player_name = players[player_id].name
-    del players[player_id]
+    player_name = get_player_name(player_id)
+    repository.delete_player(player_id)
     
     return APIResponse(
         success=True,
@@ -182,24 +196,25 @@ async def delete_player(player_id: str):
 # Team management endpoints
 @app.get("/players/{player_id}/team", response_model=APIResponse)
 async def get_player_team(player_id: str):
-    player = get_player(player_id)
+    player_name = get_player_name(player_id)
     return APIResponse(
         success=True,
-        message=f"Retrieved team for player {player.name}",
-        data={"team": [pokemon.dict() for pokemon in player.team]}
+        message=f"Retrieved team for player {player_name}",
+        data={"team": [pokemon.dict() for pokemon in repository.get_team(player_id)]}
     )
 
 @app.post("/players/{player_id}/team", response_model=APIResponse)
 async def add_pokemon_to_team(player_id: str, pokemon: PokemonCreate):
-    player = get_player(player_id)
+    player_name = get_player_name(player_id)
+    team = repository.get_team(player_id)
     
-    if len(player.team) >= 6:
+    if len(team) >= 6:
         raise HTTPException(status_code=400, detail="Team already has maximum 6 Pokemon")
     
     # Create new Pokemon
     base_stats = pokemon.base_stats
     new_pokemon = Pokemon(
-        id=len(player.team) + 1,
+        id=len(team) + 1,
         name=pokemon.name,
         level=pokemon.level,
         types=pokemon.types,
@@ -216,26 +231,26 @@ async def add_pokemon_to_team(player_id: str, pokemon: PokemonCreate):
         form=pokemon.form
     )
     
-    player.team.append(new_pokemon)
-    player.last_updated = datetime.now()
+    repository.add_pokemon(player_id, new_pokemon, datetime.now())
     
     return APIResponse(
         success=True,
-        message=f"Added {pokemon.name} to {player.name}'s team",
+        message=f"Added {pokemon.name} to {player_name}'s team",
         data=new_pokemon.dict()
     )
 
 @app.put("/players/{player_id}/team/{pokemon_index}", response_model=APIResponse)
 async def update_team_pokemon(player_id: str, pokemon_index: int, pokemon_update: PokemonCreate):
-    player = get_player(player_id)
+    player_name = get_player_name(player_id)
+    team = repository.get_team(player_id)
     
-    if pokemon_index < 0 or pokemon_index >= len(player.team):
+    if pokemon_index < 0 or pokemon_index >= len(team):
         raise HTTPException(status_code=404, detail=f"Pokemon at index {pokemon_index} not found")
     
     # Update Pokemon
     base_stats = pokemon_update.base_stats
-    player.team[pokemon_index] = Pokemon(
-        id=player.team[pokemon_index].id,
+    updated_pokemon = Pokemon(
+        id=team[pokemon_index].id,
         name=pokemon_update.name,
         level=pokemon_update.level,
         types=pokemon_update.types,
@@ -252,27 +267,26 @@ async def update_team_pokemon(player_id: str, pokemon_index: int, pokemon_update
         form=pokemon_update.form
     )
     
-    player.last_updated = datetime.now()
+    repository.replace_pokemon(player_id, pokemon_index, updated_pokemon, datetime.now())
     
     return APIResponse(
         success=True,
-        message=f"Updated {pokemon_update.name} in {player.name}'s team",
-        data=player.team[pokemon_index].dict()
+        message=f"Updated {pokemon_update.name} in {player_name}'s team",
+        data=updated_pokemon.dict()
     )
 
 @app.delete("/players/{player_id}/team/{pokemon_index}", response_model=APIResponse)
 async def remove_team_pokemon(player_id: str, pokemon_index: int):
-    player = get_player(player_id)
+    player_name = get_player_name(player_id)
     
-    if pokemon_index < 0 or pokemon_index >= len(player.team):
+    if pokemon_index < 0 or pokemon_index >= len(repository.get_team(player_id)):
         raise HTTPException(status_code=404, detail=f"Pokemon at index {pokemon_index} not found")
     
-    removed_pokemon = player.team.pop(pokemon_index)
-    player.last_updated = datetime.now()
+    removed_pokemon = repository.remove_pokemon(player_id, pokemon_index, datetime.now())
     
     return APIResponse(
         success=True,
-        message=f"Removed {removed_pokemon.name} from {player.name}'s team",
+        message=f"Removed {removed_pokemon.name} from {player_name}'s team",
         data=None
     )
 
@@ -288,20 +302,20 @@ async def get_player_location(player_id: str):
 
 @app.put("/players/{player_id}/location", response_model=APIResponse)
 async def update_player_location(player_id: str, location: MapLocationCreate):
-    player = get_player(player_id)
+    player_name = get_player_name(player_id)
     
-    player.location = MapLocation(
+    new_location = MapLocation(
         location_tuple=location.location_tuple,
         description=location.description,
         accessible_locations=location.accessible_locations
     )
     
-    player.last_updated = datetime.now()
+    repository.update_player(player_id, {"location": new_location}, datetime.now())
     
     return APIResponse(
         success=True,
-        message=f"Updated location for player {player.name}",
-        data=player.location.dict()
+        message=f"Updated location for player {player_name}",
+        data=new_location.dict()
     )
 
 # Thought history endpoints
@@ -310,44 +324,38 @@ async def get_player_thoughts(
     player_id: str, 
     page: int = Query(1, ge=1), 
     per_page: int = Query(10, ge=1, le=100),
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
 ):
-    player = get_player(player_id)
-    
-    # Filter by category if provided
-    thoughts = player.thought_history
-    if category:
-        thoughts = [t for t in thoughts if t.category == category]
+    player_name = get_player_name(player_id)
     
-    # Sort by timestamp (newest first)
-    thoughts = sorted(thoughts, key=lambda t: t.timestamp, reverse=True)
-    
-    # Paginate
-    total = len(thoughts)
+    # Newest first from the time index, filtered by category if provided;
+    # a cursor continues after the last page instead of counting pages
+    thoughts, total, next_key = repository.page_thoughts(
+        player_id, per_page, category or None, descending=True, **page_options(page, cursor, since, until, per_page)
+    )
     total_pages = (total + per_page - 1) // per_page
     
-    start_idx = (page - 1) * per_page
-    end_idx = min(start_idx + per_page, total)
-    
-    paginated_thoughts = thoughts[start_idx:end_idx]
-    
     return APIResponse(
         success=True,
-        message=f"Retrieved {len(paginated_thoughts)} thoughts for player {player.name}",
+        message=f"Retrieved {len(thoughts)} thoughts for player {player_name}",
         data={
-            "thoughts": [t.dict() for t in paginated_thoughts],
+            "thoughts": [t.dict() for t in thoughts],
             "pagination": {
                 "total": total,
                 "page": page,
                 "per_page": per_page,
-                "total_pages": total_pages
+                "total_pages": total_pages,
+                "next_cursor": encode_cursor(next_key) if next_key else None
             }
         }
     )
 
 @app.post("/players/{player_id}/thoughts", response_model=APIResponse)
 async def add_player_thought(player_id: str, thought: ThoughtCreate):
-    player = get_player(player_id)
+    player_name = get_player_name(player_id)
     
     new_thought = Thought(
         content=thought.content,
@@ -355,12 +363,11 @@ async def add_player_thought(player_id: str, thought: ThoughtCreate):
         context=thought.context
     )
     
-    player.thought_history.append(new_thought)
-    player.last_updated = datetime.now()
+    repository.add_thought(player_id, new_thought, datetime.now())
     
     return APIResponse(
         success=True,
-        message=f"Added thought for player {player.name}",
+        message=f"Added thought for player {player_name}",
         data=new_thought.dict()
     )
 
@@ -370,71 +377,75 @@ async def get_player_battles(
     player_id: str, 
     page: int = Query(1, ge=1), 
     per_page: int = Query(10, ge=1, le=100),
-    opponent_id: Optional[str] = None
+    opponent_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
 ):
-    player = get_player(player_id)
-    
-    # Filter by opponent if provided
-    battles = player.battle_history
-    if opponent_id:
-        battles = [b for b in battles if b.opponent_id == opponent_id]
-    
-    # Sort by start_time (newest first)
-    battles = sorted(battles, key=lambda b: b.start_time, reverse=True)
+    player_name = get_player_name(player_id)
     
-    # Paginate
-    total = len(battles)
+    # Newest first from the time index, filtered by opponent if provided
+    battles, total, next_key = repository.page_battles(
+        player_id, per_page, opponent_id or None, descending=True, **page_options(page, cursor, since, until, per_page)
+    )
     total_pages = (total + per_page - 1) // per_page
     
-    start_idx = (page - 1) * per_page
-    end_idx = min(start_idx + per_page, total)
-    
-    paginated_battles = battles[start_idx:end_idx]
-    
     return APIResponse(
         success=True,
-        message=f"Retrieved {len(paginated_battles)} battles for player {player.name}",
+        message=f"Retrieved {len(battles)} battles for player {player_name}",
         data={
-            "battles": [b.dict() for b in paginated_battles],
+            "battles": [b.dict() for b in battles],
             "pagination": {
                 "total": total,
                 "page": page,
                 "per_page": per_page,
-                "total_pages": total_pages
+                "total_pages": total_pages,
+                "next_cursor": encode_cursor(next_key) if next_key else None
             }
         }
     )
 
 @app.post("/players/{player_id}/battles", response_model=APIResponse)
 async def add_player_battle(player_id: str, battle: BattleCreate):
-    player = get_player(player_id)
+    player_name = get_player_name(player_id)
     
-    battle_id = f"battle_{len(player.battle_history) + 1}"
+    battle_id = f"battle_{repository.count_battles(player_id) + 1}"
+    now = datetime.now()
+    
+    # Refer to a snapshot of the current team, stored once per distinct team
+    team = repository.get_team(player_id)
+    snapshot_id = team_snapshot_id(team)
+    if repository.get_team_snapshot(player_id, snapshot_id) is None:
+        repository.put_team_snapshot(player_id, snapshot_id, team, now)
     
     new_battle = Battle(
         id=battle_id,
         opponent_id=battle.opponent_id,
         opponent_name=battle.opponent_name,
-        player_team=player.team,  # Use current team
+        player_team_id=snapshot_id,
         opponent_team=[]  # Will be populated during battle
     )
     
-    player.battle_history.append(new_battle)
-    player.last_updated = datetime.now()
+    repository.add_battle(player_id, new_battle, now)
     
     return APIResponse(
         success=True,
-        message=f"Started battle for player {player.name} against {battle.opponent_name}",
+        message=f"Started battle for player {player_name} against {battle.opponent_name}",
         data={"battle_id": battle_id}
     )
 
 @app.get("/players/{player_id}/battles/{battle_id}", response_model=APIResponse)
-async def get_battle_by_id(player_id: str, battle_id: str):
-    player = get_player(player_id)
+async def get_battle_by_id(player_id: str, battle_id: str, expand_teams: bool = False):
+    get_player_name(player_id)
     
-    battle = next((b for b in player.battle_history if b.id == battle_id), None)
-    if not battle:
+    found = repository.get_battle(player_id, battle_id)
+    if not found:
         raise HTTPException(status_code=404, detail=f"Battle with ID {battle_id} not found")
+    _, battle = found
+    
+    # Fill in the team from its snapshot
+    if expand_teams and battle.player_team_id:
+        battle = battle.copy(update={"player_team": repository.get_team_snapshot(player_id, battle.player_team_id) or []})
     
     return APIResponse(
         success=True,
@@ -444,33 +455,34 @@ async def get_battle_by_id(player_id: str, battle_id: str):
 
 @app.put("/players/{player_id}/battles/{battle_id}", response_model=APIResponse)
 async def update_battle(player_id: str, battle_id: str, result: str):
-    player = get_player(player_id)
+    get_player_name(player_id)
     
-    battle = next((b for b in player.battle_history if b.id == battle_id), None)
-    if not battle:
+    found = repository.get_battle(player_id, battle_id)
+    if not found:
         raise HTTPException(status_code=404, detail=f"Battle with ID {battle_id} not found")
+    _, battle = found
     
     # Update battle result
+    now = datetime.now()
+    repository.end_battle(player_id, battle_id, result, now)
     battle.result = result
-    battle.end_time = datetime.now()
+    battle.end_time = now
     
     # Update matchup record
-    if battle.opponent_id not in player.matchup_records:
-        player.matchup_records[battle.opponent_id] = MatchupRecord(
+    record = repository.get_matchup(player_id, battle.opponent_id)
+    if record is None:
+        record = MatchupRecord(
             opponent_id=battle.opponent_id,
             opponent_name=battle.opponent_name
         )
+    else:
+        record = record.copy(deep=True)
     
-    record = player.matchup_records[battle.opponent_id]
-    if result == "win":
-        record.wins += 1
-    elif result == "loss":
-        record.losses += 1
-    elif result == "draw":
-        record.draws += 1
-    
-    record.last_battle = datetime.now()
-    player.last_updated = datetime.now()
+    if result in RESULT_CODES:
+        record_result(record, result, now)
+    else:
+        record.last_battle = now
+    repository.put_matchup(player_id, record, now)
     
     return APIResponse(
         success=True,
@@ -481,25 +493,27 @@ async def update_battle(player_id: str, battle_id: str, result: str):
 # Matchup record endpoints
 @app.get("/players/{player_id}/matchups", response_model=APIResponse)
 async def get_player_matchups(player_id: str):
-    player = get_player(player_id)
+    player_name = get_player_name(player_id)
+    matchups = repository.get_matchups(player_id)
     
     return APIResponse(
         success=True,
-        message=f"Retrieved matchup records for player {player.name}",
-        data={"matchups": {k: v.dict() for k, v in player.matchup_records.items()}}
+        message=f"Retrieved matchup records for player {player_name}",
+        data={"matchups": {k: v.dict() for k, v in matchups.items()}, "stats": all_matchup_stats(matchups)}
     )
 
 @app.get("/players/{player_id}/matchups/{opponent_id}", response_model=APIResponse)
 async def get_specific_matchup(player_id: str, opponent_id: str):
-    player = get_player(player_id)
+    get_player_name(player_id)
     
-    if opponent_id not in player.matchup_records:
+    record = repository.get_matchup(player_id, opponent_id)
+    if record is None:
         raise HTTPException(status_code=404, detail=f"Matchup record with opponent {opponent_id} not found")
     
     return APIResponse(
         success=True,
         message=f"Retrieved matchup record with opponent {opponent_id}",
-        data=player.matchup_records[opponent_id].dict()
+        data={**record.dict(), "stats": matchup_stats(record)}
     )
 
 # Save/load endpoints
@@ -508,7 +522,7 @@ async def create_save(save: SaveFileCreate):
     save_id = f"save_{len(save_files) + 1}"
     
     # Create a snapshot of all players
-    data = {player_id: player.dict() for player_id, player in players.items()}
+    data = {player.id: player.dict() for player in repository.all_players()}
     
     new_save = SaveFile(
         id=save_id,
@@ -552,10 +566,7 @@ async def load_save(save_id: str):
     save = save_files[save_id]
     
     # Load player data from save file
-    # In a real implementation, you would deserialize the data properly
-    # This is a simplified version
-    global players
-    players = save.data
+    repository.replace_all([Player(**data) for data in save.data.values()])
     
     return APIResponse(
         success=True,
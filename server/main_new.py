@@ -3,11 +3,17 @@ from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import os
+import signal
+import asyncio
 import uvicorn
 
 # Import API modules
 from server.api import save
 from server.api import player
+from server.utils.save_jobs import save_jobs
+from server.utils.autosave import autosave
+from server.utils.battle_stream import battle_stream
+from server.utils.change_stream import change_stream
 
 # Create FastAPI app
 app = FastAPI(title="Pokemon Player State Tracker")
@@ -28,6 +34,42 @@ api_router.include_router(save.router)
 # Include API router in app
 app.include_router(api_router)
 
+# Restore player state from the mutation log
+@app.on_event("startup")
+async def restore_players():
+    replayed = player.restore_from_log()
+    print(f"Restored {player.repository.count_players()} players ({replayed} logged mutations replayed)")
+
+# Start saving changes in the background
+@app.on_event("startup")
+async def start_autosave():
+    autosave.start(save.autosave_players)
+
+# Battle and change streams only end with their battle or client, and the server
+# waits for open connections before shutting down, so end them as soon as it is
+# asked to stop
+@app.on_event("startup")
+async def end_streams_on_exit():
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if callable(previous):
+            def handle_exit(signum, frame, previous=previous):
+                loop.call_soon_threadsafe(battle_stream.close_all)
+                loop.call_soon_threadsafe(change_stream.close_all)
+                previous(signum, frame)
+            signal.signal(sig, handle_exit)
+
+# End streams, write the last autosave and let background save jobs finish
+# before exiting, then keep the change tracker for the next run
+@app.on_event("shutdown")
+async def finish_save_jobs():
+    battle_stream.close_all()
+    change_stream.close_all()
+    await autosave.stop()
+    await save_jobs.shutdown()
+    player.save_tracker()
+
 # Root endpoint
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field
-from typing import Dict, List, Any, Optional, Set
+from pydantic import BaseModel, Field, WrapSerializer
+from typing import Dict, List, Any, Optional, Set, Annotated, Literal, Union
 from datetime import datetime
 from server.models.pokemon import Pokemon, PokemonCreate
+from server.models.turn import TurnLog, TurnList
 
 class MapLocation(BaseModel):
     location_tuple: List[str]
@@ -14,11 +15,18 @@ class MapLocationCreate(BaseModel):
     accessible_locations: List[List[str]] = []
 
 class Thought(BaseModel):
+    id: Optional[str] = None
     content: str
     category: str = "general"  # general, battle, exploration
     timestamp: datetime = Field(default_factory=datetime.now)
     context: Optional[Dict[str, Any]] = None
 
+def _dump_history(value: Any, handler) -> Any:
+    # Long histories may be a ThoughtHistory (see server.utils.thought_spill)
+    return handler(value if isinstance(value, list) else list(value))
+
+ThoughtList = Annotated[List[Thought], WrapSerializer(_dump_history)]
+
 class ThoughtCreate(BaseModel):
     content: str
     category: str = "general"  # general, battle, exploration
@@ -31,17 +39,25 @@ class MatchupRecord(BaseModel):
     losses: int = 0
     draws: int = 0
     last_battle: Optional[datetime] = None
+    # Rolling aggregates, maintained by server.utils.matchup_stats
+    recent_results: str = ""  # last results, oldest first: w, l or d
+    streak: int = 0  # length of the run of results equal to the last one
+    best_win_streak: int = 0
+    longest_loss_streak: int = 0
+    hourly: List[List[int]] = []  # [hour, wins, losses, draws] for the last 24 hours
+    daily: List[List[int]] = []  # [day, wins, losses, draws] for the last 30 days
 
 class Battle(BaseModel):
     id: str
     opponent_id: str
     opponent_name: str
     player_team: List[Pokemon] = []
+    player_team_id: Optional[str] = None  # team snapshot, see Player.team_snapshots
     opponent_team: List[Pokemon] = []
     start_time: datetime = Field(default_factory=datetime.now)
     end_time: Optional[datetime] = None
     result: Optional[str] = None  # win, loss, draw
-    turns: List[Dict[str, Any]] = []
+    turns: TurnList = Field(default_factory=TurnLog)
 
 class BattleCreate(BaseModel):
     opponent_id: str
@@ -52,9 +68,10 @@ class Player(BaseModel):
     name: str
     team: List[Pokemon] = []
     location: MapLocation
-    thought_history: List[Thought] = []
+    thought_history: ThoughtList = []
     battle_history: List[Battle] = []
     matchup_records: Dict[str, MatchupRecord] = {}
+    team_snapshots: Dict[str, List[Pokemon]] = {}
     items: List[str] = []
     badges: Set[str] = set()
     created_at: datetime = Field(default_factory=datetime.now)
@@ -72,3 +89,29 @@ class PlayerUpdate(BaseModel):
     location: MapLocationCreate
     items: List[str] = []
     badges: List[str] = []
+
+# Items of a batch of changes (POST /players/batch), told apart by "type"
+class BatchThought(ThoughtCreate):
+    type: Literal["thought"]
+    player_id: str
+
+class BatchBattleStart(BattleCreate):
+    type: Literal["battle_start"]
+    player_id: str
+
+class BatchBattleEnd(BaseModel):
+    type: Literal["battle_end"]
+    player_id: str
+    battle_id: str
+    result: str  # win, loss, draw
+
+class BatchLocation(BaseModel):
+    type: Literal["location"]
+    player_id: str
+    location: MapLocationCreate
+
+BatchItem = Annotated[Union[BatchThought, BatchBattleStart, BatchBattleEnd, BatchLocation], Field(discriminator="type")]
+
+class BatchRequest(BaseModel):
+    # Items are validated one by one, so an invalid item fails on its own
+    items: List[Dict[str, Any]]
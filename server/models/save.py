@@ -6,20 +6,54 @@ class SaveFile(BaseModel):
     id: str
     name: str
     game_version: str = "Black2White2"
+    format: str = "json"  # json, compact
     created_at: datetime = Field(default_factory=datetime.now)
     last_updated: datetime = Field(default_factory=datetime.now)
-    data: Dict[str, Any]
+    players: List[Dict[str, Any]] = []
+    data: Dict[str, Any] = {}
 
 class SaveFileCreate(BaseModel):
     name: str
     game_version: str = "Black2White2"
+    format: str = "json"  # json, compact
 
 class SaveFileResponse(BaseModel):
     id: str
     name: str
     game_version: str
+    format: str = "json"
     created_at: datetime
     last_updated: datetime
 
 class SaveFileList(BaseModel):
     saves: List[SaveFileResponse]
+
+class SaveJobCreate(BaseModel):
+    action: str  # create, update, load, backup
+    save_id: Optional[str] = None
+    name: Optional[str] = None
+    game_version: str = "Black2White2"
+    format: str = "json"  # json, compact
+    lazy: bool = False  # load only: read histories on first access
+
+class SaveJob(BaseModel):
+    id: str
+    action: str
+    save_id: Optional[str] = None
+    status: str = "pending"  # pending, running, completed, failed
+    created_at: datetime = Field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+class BackupInfo(BaseModel):
+    id: str
+    save_id: str
+    created_at: datetime
+    size: int  # bytes of save data in the backup
+    new_bytes: int  # bytes of chunks this backup added to the store
+
+class AutosaveConfig(BaseModel):
+    interval: float  # seconds between autosaves, 0 to disable
+    save_id: Optional[str] = None  # save to update; a new one is created if unset
@@ -0,0 +1,174 @@
+import sys
+from array import array
+from typing import Dict, List, Any, Optional, Iterator, Union, Annotated
+from pydantic import BaseModel, PlainValidator, PlainSerializer, WithJsonSchema
+
+class TurnEvent(BaseModel):
+    turn: int
+    actor: str
+    action: str = "move"  # move, switch, item
+    move: Optional[str] = None
+    target: Optional[str] = None
+    damage: Optional[int] = None
+    hp_after: Optional[int] = None
+    switch_in: Optional[str] = None
+    item: Optional[str] = None
+
+# Integer fields of a turn, stored as 32-bit values with MISSING for "not set"
+INT_COLUMNS = ("turn", "damage", "hp_after")
+MISSING = -2 ** 31
+INT_MAX = 2 ** 31 - 1
+
+# String fields of a turn, stored as codes into the log's string table (0 = not set)
+STR_COLUMNS = ("actor", "action", "move", "target", "switch_in", "item")
+
+# Order in which a turn's fields are read back
+COLUMNS = tuple(TurnEvent.model_fields)
+
+class TurnLog:
+    """A battle's turns, stored column by column.
+
+    Each integer field is an array of 32-bit values and each string field
+    an array of codes into a table that holds every distinct string of the
+    battle once (interned, so names are shared between battles). A turn
+    takes about 24 bytes instead of a dict per turn. Keys outside these
+    columns, and values that do not fit them, are kept per turn in
+    ``extra``. Turns read back, in order, as dicts with the same keys and
+    values they were added with.
+    """
+
+    __slots__ = ("ints", "codes", "strings", "string_codes", "extra")
+
+    def __init__(self, turns: Optional[List[Dict[str, Any]]] = None):
+        self.ints = {name: array("i") for name in INT_COLUMNS}
+        self.codes = {name: array("H") for name in STR_COLUMNS}
+        self.strings: List[Optional[str]] = [None]
+        self.string_codes: Dict[str, int] = {}
+        self.extra: Dict[int, Dict[str, Any]] = {}
+        if turns:
+            self.extend(turns)
+
+    @classmethod
+    def validate(cls, value: Any) -> "TurnLog":
+        if isinstance(value, TurnLog):
+            return value
+        if not isinstance(value, (list, tuple)):
+            raise ValueError("Turns must be a list")
+        for turn in value:
+            if not isinstance(turn, dict):
+                raise ValueError("Each turn must be an object")
+        return cls(value)
+
+    def _code(self, value: str) -> int:
+        code = self.string_codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            if code == 2 ** 16:
+                # Widen the code columns once a battle has more distinct strings
+                self.codes = {name: array("I", column) for name, column in self.codes.items()}
+            value = sys.intern(value)
+            self.strings.append(value)
+            self.string_codes[value] = code
+        return code
+
+    def append(self, turn: Dict[str, Any]) -> None:
+        """Add a turn to the end of the log"""
+        extra = {}
+        for name, column in self.ints.items():
+            value = turn.get(name)
+            if type(value) is int and MISSING < value <= INT_MAX:
+                column.append(value)
+            else:
+                column.append(MISSING)
+                if name in turn:
+                    extra[name] = value
+        for name in STR_COLUMNS:
+            value = turn.get(name)
+            if isinstance(value, str):
+                code = self._code(value)
+                self.codes[name].append(code)
+            else:
+                self.codes[name].append(0)
+                if name in turn:
+                    extra[name] = value
+        for name, value in turn.items():
+            if name not in self.ints and name not in self.codes:
+                extra[name] = value
+        if extra:
+            self.extra[len(self) - 1] = extra
+
+    def extend(self, turns: List[Dict[str, Any]]) -> None:
+        """Add turns to the end of the log"""
+        for turn in turns:
+            self.append(turn)
+
+    @property
+    def last_turn(self) -> Optional[int]:
+        """Turn number of the last turn added, if it has one"""
+        column = self.ints["turn"]
+        if not column or column[-1] == MISSING:
+            return None
+        return column[-1]
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """Get one turn as a dict"""
+        turn = {}
+        for name in COLUMNS:
+            if name in self.ints:
+                value = self.ints[name][index]
+                if value != MISSING:
+                    turn[name] = value
+            else:
+                code = self.codes[name][index]
+                if code:
+                    turn[name] = self.strings[code]
+        extra = self.extra.get(index if index >= 0 else index + len(self))
+        if extra:
+            turn.update(extra)
+        return turn
+
+    def __len__(self) -> int:
+        return len(self.ints["turn"])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if isinstance(index, slice):
+            return [self.row(i) for i in range(*index.indices(len(self)))]
+        if index < -len(self) or index >= len(self):
+            raise IndexError("turn index out of range")
+        return self.row(index)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, TurnLog):
+            return self.to_list() == other.to_list()
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"TurnLog({len(self)} turns)"
+
+    def freeze(self) -> "TurnLog":
+        """Get a copy of the turns so far, which later appends do not change"""
+        frozen = TurnLog.__new__(TurnLog)
+        frozen.ints = {name: array(column.typecode, column) for name, column in self.ints.items()}
+        frozen.codes = {name: array(column.typecode, column) for name, column in self.codes.items()}
+        frozen.strings = list(self.strings)
+        frozen.string_codes = dict(self.string_codes)
+        frozen.extra = dict(self.extra)
+        return frozen
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Get every turn as a dict, in order"""
+        return list(self)
+
+# Field type for a battle's turns: validated from (and serialized to) a list of dicts
+TurnList = Annotated[
+    TurnLog,
+    PlainValidator(TurnLog.validate),
+    PlainSerializer(TurnLog.to_list, return_type=List[Dict[str, Any]]),
+    WithJsonSchema({"type": "array", "items": {"type": "object"}})
+]
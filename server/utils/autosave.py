@@ -0,0 +1,191 @@
+import os
+import asyncio
+import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
+
+from server.utils.change_tracker import change_tracker
+
+# Seconds between autosaves; 0 disables autosave until it is configured
+AUTOSAVE_INTERVAL = float(os.environ.get("PST_AUTOSAVE_INTERVAL", "0"))
+
+# Save that autosave updates; a new save is created on the first write if unset
+AUTOSAVE_SAVE_ID = os.environ.get("PST_AUTOSAVE_SAVE_ID") or None
+
+# Unsaved mutations at which mutating requests wait for a write to finish
+AUTOSAVE_MAX_PENDING = int(os.environ.get("PST_AUTOSAVE_MAX_PENDING", "5000"))
+
+class AutosaveScheduler:
+    """Background task that saves the players periodically.
+
+    Mutations only call ``notify``. The task writes at most once per
+    ``interval``, so a burst of changes becomes one incremental save, and
+    it skips the write entirely when the change tracker has not moved
+    since the last one. If ``max_pending`` mutations pile up without
+    being saved (writes are slower than changes arrive), a write starts
+    straight away and ``wait_for_capacity`` holds mutating requests until
+    it finishes. ``stop`` writes any remaining changes.
+
+    The actual write is a coroutine passed to ``start``: it takes the
+    target save ID (or None to create one) and returns the ID it wrote.
+    """
+
+    def __init__(self, interval: float = AUTOSAVE_INTERVAL, save_id: Optional[str] = AUTOSAVE_SAVE_ID, max_pending: int = AUTOSAVE_MAX_PENDING):
+        self.interval = interval
+        self.save_id = save_id
+        self.max_pending = max_pending
+        self.pending = 0
+        self.writes = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_write: Optional[datetime.datetime] = None
+        self.last_error: Optional[str] = None
+        self._saved_version: Optional[Tuple[str, int]] = None
+        self._write: Optional[Callable[[Optional[str]], Awaitable[str]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._dirty: Optional[asyncio.Event] = None
+        self._urgent: Optional[asyncio.Event] = None
+        self._written: Optional[asyncio.Event] = None
+        self._writing = False
+        self._stopping = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def start(self, write: Callable[[Optional[str]], Awaitable[str]]) -> None:
+        """Start the autosave task on the running event loop"""
+        self._write = write
+        self._dirty = asyncio.Event()
+        self._urgent = asyncio.Event()
+        self._written = asyncio.Event()
+        if self.pending:
+            self._dirty.set()
+        self._task = asyncio.create_task(self._run())
+
+    def configure(self, interval: float, save_id: Optional[str] = None) -> None:
+        """Change the interval (0 disables autosave) and the target save"""
+        self.interval = interval
+        if save_id is not None:
+            self.save_id = save_id
+        if self._dirty is not None:
+            # Re-arm the loop so the new interval takes effect, and let
+            # requests held under the old settings continue
+            if self.pending:
+                self._dirty.set()
+            self._signal_written()
+
+    def notify(self) -> None:
+        """Record that the players changed"""
+        self.pending += 1
+        if self._dirty is not None:
+            self._dirty.set()
+            if self.enabled and self.pending >= self.max_pending:
+                self._urgent.set()
+
+    async def wait_for_capacity(self) -> None:
+        """Wait while too many mutations are waiting to be saved.
+
+        Requests are not held after a failed write, so a broken save
+        target shows up in ``status`` instead of stalling the API.
+        """
+        while self.enabled and self._task is not None and self.pending >= self.max_pending and self.last_error is None:
+            written = self._written
+            self._dirty.set()
+            self._urgent.set()
+            await written.wait()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_write = loop.time()
+        while not self._stopping:
+            await self._dirty.wait()
+            if self._stopping:
+                break
+            if not self.enabled:
+                # Wait to be configured (or for a flush on shutdown)
+                self._dirty.clear()
+                continue
+
+            # Let changes accumulate for the rest of the interval
+            delay = self.interval - (loop.time() - last_write)
+            if delay > 0 and not self._urgent.is_set():
+                try:
+                    await asyncio.wait_for(self._urgent.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                if self._stopping:
+                    break
+
+            self._dirty.clear()
+            self._urgent.clear()
+            await self.flush()
+            last_write = loop.time()
+
+    async def flush(self) -> bool:
+        """Write now if anything changed since the last write"""
+        if self._write is None or self._writing:
+            return False
+
+        version = (change_tracker.session, change_tracker.clock)
+        if version == self._saved_version:
+            self.pending = 0
+            self.skipped += 1
+            self._signal_written()
+            return False
+
+        pending = self.pending
+        self._writing = True
+        try:
+            self.save_id = await self._write(self.save_id)
+            self._saved_version = version
+            self.pending = max(0, self.pending - pending)
+            self.writes += 1
+            self.last_write = datetime.datetime.now()
+            self.last_error = None
+            return True
+        except Exception as e:
+            self.failures += 1
+            self.last_error = getattr(e, "detail", None) or str(e)
+            print(f"Error autosaving to {self.save_id}: {self.last_error}")
+            return False
+        finally:
+            self._writing = False
+            self._signal_written()
+
+    def _signal_written(self) -> None:
+        # Wake requests held by backpressure; later ones wait for the next write
+        self._written.set()
+        self._written = asyncio.Event()
+
+    async def stop(self) -> None:
+        """Stop the task and write any changes that were not saved yet"""
+        if self._task is None:
+            return
+
+        # Let a write in progress finish rather than cancelling it
+        self._stopping = True
+        self._dirty.set()
+        self._urgent.set()
+        await self._task
+        self._task = None
+
+        if self.enabled and self.pending:
+            await self.flush()
+
+    def status(self) -> Dict[str, Any]:
+        """Get the autosave settings and counters"""
+        return {
+            "enabled": self.enabled,
+            "interval": self.interval,
+            "save_id": self.save_id,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "writes": self.writes,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "last_write": self.last_write,
+            "last_error": self.last_error
+        }
+
+# Shared autosave scheduler, started with the app
+autosave = AutosaveScheduler()
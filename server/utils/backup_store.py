@@ -0,0 +1,252 @@
+import os
+import hashlib
+import datetime
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+from server.utils.file_io import atomic_open, atomic_write_json, read_json
+
+# Directory for the chunk store and backup manifests
+BACKUP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "backups")
+
+# Files are split into chunks of this size. Save segments only ever grow
+# at the end or are replaced whole, so fixed-size chunks of an appended
+# file match the chunks of its previous version up to the old end.
+CHUNK_SIZE = 64 * 1024
+
+class BackupStore:
+    """Content-addressed store of save backups.
+
+    Every file of a backed-up save is split into chunks, and each chunk is
+    stored once under its SHA-256 hash in ``chunks/``. A backup is just a
+    manifest in ``manifests/`` listing the chunks of each file, so chunks
+    that did not change are shared with earlier backups and a backup only
+    writes what changed. Files whose inode, size and mtime match the
+    previous backup of the same save are not even re-read.
+
+    Deleting a backup only removes its manifest; ``collect_garbage``
+    removes the chunks no manifest refers to any more.
+    """
+
+    def __init__(self, root: str = BACKUP_DIR):
+        self.root = root
+        self.chunk_dir = os.path.join(root, "chunks")
+        self.manifest_dir = os.path.join(root, "manifests")
+        # Held while chunks are written or collected, so garbage
+        # collection never sees a backup whose manifest is not written yet
+        self.lock = threading.Lock()
+
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def _manifest_path(self, backup_id: str) -> str:
+        return os.path.join(self.manifest_dir, f"{backup_id}.json")
+
+    def _put_chunk(self, data: bytes) -> Tuple[str, bool]:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return digest, False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_open(path, "wb") as f:
+            f.write(data)
+        return digest, True
+
+    def _store_file(self, path: str, previous: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+        st = os.stat(path)
+        stat = [st.st_ino, st.st_size, st.st_mtime_ns]
+        if previous is not None and previous["stat"] == stat:
+            return previous, 0
+
+        chunks = []
+        new_bytes = 0
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                digest, new = self._put_chunk(data)
+                chunks.append(digest)
+                if new:
+                    new_bytes += len(data)
+        return {"size": st.st_size, "stat": stat, "chunks": chunks}, new_bytes
+
+    def _latest(self, save_id: str) -> Optional[Dict[str, Any]]:
+        # Backup IDs start with the save ID and end with a sortable timestamp
+        if not os.path.isdir(self.manifest_dir):
+            return None
+        prefix = f"{save_id}_backup_"
+        for filename in sorted(os.listdir(self.manifest_dir), reverse=True):
+            if filename.startswith(prefix) and filename.endswith(".json"):
+                manifest = read_json(os.path.join(self.manifest_dir, filename))
+                if manifest["save_id"] == save_id:
+                    return manifest
+        return None
+
+    def create(self, backup_id: str, save_id: str, source: str) -> Dict[str, Any]:
+        """Back up a save directory (or a legacy single-file save)"""
+        if os.path.isdir(source):
+            paths = []
+            for root, _, files in os.walk(source):
+                for filename in files:
+                    if not filename.endswith(".tmp"):
+                        paths.append(os.path.relpath(os.path.join(root, filename), source))
+            paths.sort()
+            kind = "dir"
+        else:
+            paths = [os.path.basename(source)]
+            source = os.path.dirname(source)
+            kind = "file"
+
+        with self.lock:
+            latest = self._latest(save_id)
+            previous_files = latest["files"] if latest is not None and latest["kind"] == kind else {}
+
+            files = {}
+            size = 0
+            new_bytes = 0
+            for path in paths:
+                entry, written = self._store_file(os.path.join(source, path), previous_files.get(path))
+                files[path] = entry
+                size += entry["size"]
+                new_bytes += written
+
+            manifest = {
+                "id": backup_id,
+                "save_id": save_id,
+                "kind": kind,
+                "created_at": datetime.datetime.now(),
+                "size": size,
+                "new_bytes": new_bytes,
+                "files": files
+            }
+            os.makedirs(self.manifest_dir, exist_ok=True)
+            atomic_write_json(self._manifest_path(backup_id), manifest)
+
+        return self._summary(manifest)
+
+    def get(self, backup_id: str) -> Optional[Dict[str, Any]]:
+        """Read a backup's manifest"""
+        path = self._manifest_path(backup_id)
+        if not os.path.exists(path):
+            return None
+        return read_json(path)
+
+    def _summary(self, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: manifest[key] for key in ("id", "save_id", "created_at", "size", "new_bytes")}
+
+    def list(self, save_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List backups, newest first, optionally only those of one save"""
+        if not os.path.isdir(self.manifest_dir):
+            return []
+
+        backups = []
+        for filename in os.listdir(self.manifest_dir):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                manifest = read_json(os.path.join(self.manifest_dir, filename))
+            except Exception as e:
+                print(f"Error reading backup manifest {filename}: {e}")
+                continue
+            if save_id is None or manifest["save_id"] == save_id:
+                backups.append(self._summary(manifest))
+
+        backups.sort(key=lambda backup: str(backup["created_at"]), reverse=True)
+        return backups
+
+    def exists(self, backup_id: str) -> bool:
+        """Check whether a backup exists"""
+        return os.path.exists(self._manifest_path(backup_id))
+
+    def restore(self, backup_id: str, target: str) -> Optional[str]:
+        """Write a backup's files under ``target`` and return its kind.
+
+        For directory backups ``target`` is the directory to create; for
+        single-file backups it is the file to write.
+        """
+        manifest = self.get(backup_id)
+        if manifest is None:
+            return None
+
+        for path, entry in manifest["files"].items():
+            dst = os.path.join(target, path) if manifest["kind"] == "dir" else target
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            with open(dst, "wb") as f:
+                for digest in entry["chunks"]:
+                    with open(self._chunk_path(digest), "rb") as chunk:
+                        f.write(chunk.read())
+                f.flush()
+                os.fsync(f.fileno())
+        return manifest["kind"]
+
+    def verify(self, backup_id: str) -> Optional[Dict[str, Any]]:
+        """Check that every chunk of a backup exists and matches its hash"""
+        manifest = self.get(backup_id)
+        if manifest is None:
+            return None
+
+        missing = []
+        corrupt = []
+        checked = set()
+        for path, entry in manifest["files"].items():
+            size = 0
+            for digest in entry["chunks"]:
+                chunk_path = self._chunk_path(digest)
+                if not os.path.exists(chunk_path):
+                    missing.append(digest)
+                    continue
+                with open(chunk_path, "rb") as f:
+                    data = f.read()
+                size += len(data)
+                if digest not in checked and hashlib.sha256(data).hexdigest() != digest:
+                    corrupt.append(digest)
+                checked.add(digest)
+            if size != entry["size"] and not missing:
+                corrupt.append(path)
+
+        return {
+            "id": backup_id,
+            "ok": not missing and not corrupt,
+            "files": len(manifest["files"]),
+            "chunks": len(checked) + len(missing),
+            "missing": missing,
+            "corrupt": corrupt
+        }
+
+    def delete(self, backup_id: str) -> bool:
+        """Delete a backup's manifest; its chunks are freed by garbage collection"""
+        path = self._manifest_path(backup_id)
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+        return True
+
+    def collect_garbage(self) -> Dict[str, int]:
+        """Delete chunks that no backup refers to"""
+        with self.lock:
+            referenced = set()
+            if os.path.isdir(self.manifest_dir):
+                for filename in os.listdir(self.manifest_dir):
+                    if filename.endswith(".json"):
+                        manifest = read_json(os.path.join(self.manifest_dir, filename))
+                        for entry in manifest["files"].values():
+                            referenced.update(entry["chunks"])
+
+            removed = 0
+            freed = 0
+            if os.path.isdir(self.chunk_dir):
+                for prefix in os.listdir(self.chunk_dir):
+                    prefix_dir = os.path.join(self.chunk_dir, prefix)
+                    for digest in os.listdir(prefix_dir):
+                        if digest not in referenced:
+                            path = os.path.join(prefix_dir, digest)
+                            freed += os.path.getsize(path)
+                            os.remove(path)
+                            removed += 1
+
+        return {"removed_chunks": removed, "freed_bytes": freed, "referenced_chunks": len(referenced)}
+
+# Shared backup store used by the save manager
+backup_store = BackupStore()
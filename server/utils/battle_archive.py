@@ -0,0 +1,143 @@
+import os
+import json
+import uuid
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterator, Union
+
+from server.models.player import Battle
+from server.models.turn import TurnLog
+from server.utils.file_io import json_default
+from server.utils.lazy_player import PIN_DIR
+
+# Whether the in-memory repository moves the turns of ended battles to disk
+TIER_BATTLES = os.environ.get("PST_TIER_BATTLES", "1") != "0"
+
+# Archived battles whose decoded turns stay in memory after a read
+ARCHIVE_CACHE_SIZE = int(os.environ.get("PST_ARCHIVE_CACHE", "32"))
+
+# Decoded turns by (archive path, offset), least recently read first
+_decoded: "OrderedDict[tuple, TurnLog]" = OrderedDict()
+_decoded_lock = threading.Lock()
+
+class ArchivedTurns(TurnLog):
+    """Turns of an ended battle, kept in an archive file instead of memory.
+
+    Only the location of the turns and the number of the last turn are
+    held. Reads decode the turns into a ``TurnLog`` shared through a small
+    cache of recently read battles, so reading a battle turn by turn
+    decodes it once. Archived turns cannot be changed.
+    """
+
+    __slots__ = ("path", "offset", "size", "count", "final_turn")
+
+    def __init__(self, path: str, offset: int, size: int, count: int, final_turn: Optional[int]):
+        self.path = path
+        self.offset = offset
+        self.size = size
+        self.count = count
+        self.final_turn = final_turn
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Read the turns from the archive"""
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            return json.loads(f.read(self.size))
+
+    def _decoded(self) -> TurnLog:
+        # Decode on the first read; later reads share the cached log
+        key = (self.path, self.offset)
+        with _decoded_lock:
+            log = _decoded.get(key)
+            if log is not None:
+                _decoded.move_to_end(key)
+                return log
+
+        log = TurnLog(self.load())
+        with _decoded_lock:
+            _decoded[key] = log
+            while len(_decoded) > ARCHIVE_CACHE_SIZE:
+                _decoded.popitem(last=False)
+        return log
+
+    def append(self, turn: Dict[str, Any]) -> None:
+        raise ValueError("Turns of an archived battle cannot be changed")
+
+    def extend(self, turns: List[Dict[str, Any]]) -> None:
+        raise ValueError("Turns of an archived battle cannot be changed")
+
+    @property
+    def last_turn(self) -> Optional[int]:
+        return self.final_turn
+
+    def row(self, index: int) -> Dict[str, Any]:
+        return self._decoded().row(index)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._decoded())
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        return self._decoded()[index]
+
+    def __repr__(self) -> str:
+        return f"ArchivedTurns({self.count} turns at {self.path}:{self.offset})"
+
+    def freeze(self) -> "ArchivedTurns":
+        return self
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return self._decoded().to_list()
+
+class BattleArchive:
+    """Append-only file holding the turns of ended battles.
+
+    Ended battles stay in the player's history with their summary fields
+    (ID, opponent, times, result, team snapshot) and an ``ArchivedTurns``
+    in place of their turns, so the memory a long history takes does not
+    grow with its turns. The turns are synced to disk before the battles
+    drop their in-memory copy. The file lives under ``PIN_DIR`` and is pruned
+    with the pins: ``rotate`` starts a new file when the players are
+    replaced, and the old one is removed once nothing holds it.
+    """
+
+    def __init__(self, root: str = PIN_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        self.rotate()
+
+    def rotate(self) -> None:
+        """Start a new archive file for battles archived from now on"""
+        with self.lock:
+            self.path = os.path.join(self.root, f"archive_{uuid.uuid4().hex}", "battles.jsonl")
+
+    def archive(self, battles: List[Battle]) -> None:
+        """Move the turns of ended battles to the archive"""
+        battles = [battle for battle in battles if battle.result is not None and not isinstance(battle.turns, ArchivedTurns)]
+        if not battles:
+            return
+
+        with self.lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                archived = []
+                with open(self.path, "ab") as f:
+                    for battle in battles:
+                        data = json.dumps(battle.turns.to_list(), default=json_default).encode()
+                        offset = f.tell()
+                        f.write(data + b"\n")
+                        archived.append(ArchivedTurns(self.path, offset, len(data), len(battle.turns), battle.turns.last_turn))
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                # The battles keep their turns in memory
+                print(f"Error archiving battle turns: {e}")
+                return
+
+            for battle, turns in zip(battles, archived):
+                battle.turns = turns
+
+# Shared archive used by the in-memory repository
+battle_archive = BattleArchive()
@@ -0,0 +1,162 @@
+import os
+import json
+import asyncio
+from typing import List, Dict, Any, Optional, Set, Tuple, AsyncIterator
+
+from server.models.turn import TurnLog
+from server.utils.file_io import json_default
+from server.utils.player_repository import PlayerRepository, repository
+
+# Events queued per viewer before it is considered behind and catches up from storage
+STREAM_QUEUE_SIZE = int(os.environ.get("PST_STREAM_QUEUE_SIZE", "256"))
+
+# Seconds without events after which a stream sends a keep-alive comment
+KEEPALIVE_INTERVAL = float(os.environ.get("PST_STREAM_KEEPALIVE", "15"))
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Format a server-sent event"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=json_default)}")
+    return "\n".join(lines) + "\n\n"
+
+def first_turn_index(turns: TurnLog, turn: int) -> int:
+    """Get the index of the first event of a turn number (turns are in turn order)"""
+    for index, event in enumerate(turns):
+        if event.get("turn", turn) >= turn:
+            return index
+    return len(turns)
+
+class Subscription:
+    """One viewer's bounded queue of battle events.
+
+    Producers never wait on it: when the queue is full its events are
+    dropped and replaced by a single "lagged" marker, and the viewer reads
+    the turns it missed from storage before following the queue again.
+    """
+
+    __slots__ = ("queue", "lagged")
+
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(size)
+        self.lagged = False
+
+    def offer(self, event: Tuple) -> None:
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(("lagged",))
+            self.lagged = True
+
+    def close(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(("closed",))
+        self.lagged = True
+
+class BattleStream:
+    """Pushes the turns of battles to their viewers as they are recorded.
+
+    The battle mutations call ``turns_added`` and ``battle_ended``, which
+    only put events on the queues of the battle's current viewers. A
+    viewer's ``events`` first replays the stored turns from where it asked
+    to start, then follows the live events; if it falls behind it replays
+    the missed turns from storage again, so it always sees every turn in
+    order, and a slow viewer never holds up a mutation.
+    """
+
+    def __init__(self, repository: PlayerRepository, queue_size: int = STREAM_QUEUE_SIZE, keepalive: float = KEEPALIVE_INTERVAL):
+        self.repository = repository
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self.subscribers: Dict[Tuple[str, str], Set[Subscription]] = {}
+
+    @property
+    def viewers(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self.subscribers.values())
+
+    def _publish(self, player_id: str, battle_id: str, event: Tuple) -> None:
+        for subscription in self.subscribers.get((player_id, battle_id), ()):
+            subscription.offer(event)
+
+    def turns_added(self, player_id: str, battle_id: str, turns: List[Dict[str, Any]]) -> None:
+        """Send turns just appended to a battle to its viewers"""
+        if (player_id, battle_id) not in self.subscribers:
+            return
+        _, battle = self.repository.get_battle(player_id, battle_id)
+        start = len(battle.turns) - len(turns)
+        for offset, turn in enumerate(turns):
+            self._publish(player_id, battle_id, ("turn", start + offset, turn))
+
+    def battle_ended(self, player_id: str, battle_id: str) -> None:
+        """Tell a battle's viewers that it has ended"""
+        self._publish(player_id, battle_id, ("end",))
+
+    def close_player(self, player_id: str) -> None:
+        """End the streams of a player's battles"""
+        for (subscribed_player, battle_id), subscriptions in self.subscribers.items():
+            if subscribed_player == player_id:
+                for subscription in subscriptions:
+                    subscription.close()
+
+    def close_all(self) -> None:
+        """End every stream"""
+        for subscriptions in self.subscribers.values():
+            for subscription in subscriptions:
+                subscription.close()
+
+    async def events(self, player_id: str, battle_id: str, start: int = 0) -> AsyncIterator[str]:
+        """Stream a battle's turns from index ``start`` as server-sent events"""
+        key = (player_id, battle_id)
+        subscription = Subscription(self.queue_size)
+        self.subscribers.setdefault(key, set()).add(subscription)
+        index = start
+        try:
+            while True:
+                # Replay the stored turns this viewer has not seen; anything
+                # recorded from here on is also on its queue
+                found = self.repository.get_battle(player_id, battle_id)
+                if found is None:
+                    yield format_event("closed", {"battle_id": battle_id})
+                    return
+                _, battle = found
+                subscription.lagged = False
+                turns, result, end_time = battle.turns[index:], battle.result, battle.end_time
+                for turn in turns:
+                    yield format_event("turn", {"index": index, "turn": turn}, index)
+                    index += 1
+                if result is not None:
+                    yield format_event("end", {"battle_id": battle_id, "result": result, "end_time": end_time})
+                    return
+
+                # Follow the live events until the battle ends or the viewer falls behind
+                while True:
+                    try:
+                        event = await asyncio.wait_for(subscription.queue.get(), self.keepalive)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+                        continue
+                    if event[0] == "turn":
+                        if event[1] >= index:
+                            yield format_event("turn", {"index": event[1], "turn": event[2]}, event[1])
+                            index = event[1] + 1
+                    elif event[0] == "closed":
+                        yield format_event("closed", {"battle_id": battle_id})
+                        return
+                    else:
+                        # "end" and "lagged" both go back to storage for the rest
+                        break
+        finally:
+            subscriptions = self.subscribers.get(key)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscribers[key]
+
+# Shared stream of the API's battles
+battle_stream = BattleStream(repository)
@@ -0,0 +1,112 @@
+import os
+import uuid
+import datetime
+import itertools
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple, Deque
+
+from server.utils.change_tracker import PLAYER_COLLECTIONS
+
+# Most recent changes kept for clients catching up; older cursors get a snapshot
+JOURNAL_SIZE = int(os.environ.get("PST_JOURNAL_SIZE", "10000"))
+
+# Collections each mutation changes
+OP_COLLECTIONS = {
+    "create_player": PLAYER_COLLECTIONS,
+    "update_player": ["profile"],
+    "delete_player": PLAYER_COLLECTIONS,
+    "add_pokemon": ["team"],
+    "remove_pokemon": ["team"],
+    "add_thought": ["thoughts"],
+    "start_battle": ["battles", "snapshots"],
+    "end_battle": ["battles", "matchups"],
+    "add_turns": ["battles"]
+}
+
+# A journal entry: sequence number, timestamp, operation, player ID, payload
+JournalEntry = Tuple[int, datetime.datetime, str, str, Dict[str, Any]]
+
+class ChangeJournal:
+    """Ordered record of the most recent mutations, for clients to catch up.
+
+    Every mutation applied by a request is appended with the next sequence
+    number and the same payload it is logged with, so a client holding a
+    copy of the players can apply the changes itself. Only the last
+    ``size`` changes are kept. A cursor names a position in one session of
+    the journal; a new session starts whenever the whole player set is
+    replaced, and cursors from another session or from before the oldest
+    kept change can no longer be served (``changes_since`` returns None).
+    """
+
+    def __init__(self, size: int = JOURNAL_SIZE):
+        self.size = size
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every change and start a new session"""
+        self.session = uuid.uuid4().hex[:16]
+        self.seq = 0
+        self.entries: Deque[JournalEntry] = deque(maxlen=self.size)
+
+    @property
+    def cursor(self) -> str:
+        """Get the cursor of the latest change"""
+        return self.encode(self.seq)
+
+    def encode(self, seq: int) -> str:
+        return f"{self.session}.{seq}"
+
+    def decode(self, cursor: str) -> Optional[int]:
+        """Get the sequence number of a cursor, or None if it is not from this session"""
+        session, _, seq = cursor.partition(".")
+        if session != self.session or not seq.isdigit() or int(seq) > self.seq:
+            return None
+        return int(seq)
+
+    def record(self, mutations: List[Tuple[str, str, Dict[str, Any]]], timestamp: datetime.datetime) -> None:
+        """Append applied mutations, in order"""
+        for op, player_id, payload in mutations:
+            self.seq += 1
+            self.entries.append((self.seq, timestamp, op, player_id, payload))
+
+    def changes_since(
+        self,
+        cursor: str,
+        player_id: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Optional[Tuple[List[Dict[str, Any]], str, bool]]:
+        """Get the changes after a cursor (of one player, if given).
+
+        Returns the changes, the cursor to continue from and whether more
+        changes follow, or None if the cursor is too old or unknown.
+        """
+        seq = self.decode(cursor)
+        first = self.entries[0][0] if self.entries else self.seq + 1
+        if seq is None or seq < first - 1:
+            return None
+
+        changes = []
+        last = self.seq
+        for entry in itertools.islice(self.entries, seq - first + 1, None):
+            if player_id is not None and entry[3] != player_id:
+                continue
+            if limit is not None and len(changes) == limit:
+                last = changes[-1]["seq"]
+                break
+            changes.append(self.format(entry))
+        return changes, self.encode(last), last < self.seq
+
+    @staticmethod
+    def format(entry: JournalEntry) -> Dict[str, Any]:
+        seq, timestamp, op, player_id, payload = entry
+        return {
+            "seq": seq,
+            "timestamp": timestamp,
+            "op": op,
+            "player_id": player_id,
+            "collections": OP_COLLECTIONS[op],
+            "data": payload
+        }
+
+# Shared journal of the API's changes
+change_journal = ChangeJournal()
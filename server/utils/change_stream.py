@@ -0,0 +1,127 @@
+import os
+import asyncio
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable, Iterable, AsyncIterator
+
+from server.utils.battle_stream import format_event, KEEPALIVE_INTERVAL
+from server.utils.change_journal import ChangeJournal, OP_COLLECTIONS, change_journal
+
+# Seconds a subscriber waits after being woken, so changes in a burst go out together
+PUSH_INTERVAL = float(os.environ.get("PST_PUSH_INTERVAL", "0.25"))
+
+class Topics:
+    """The players and collections a subscriber follows (None for all)"""
+
+    __slots__ = ("players", "collections")
+
+    def __init__(self, players: Optional[Iterable[str]] = None, collections: Optional[Iterable[str]] = None):
+        self.players = set(players) if players is not None else None
+        self.collections = set(collections) if collections is not None else None
+
+    def matches(self, op: str, player_id: str) -> bool:
+        if self.players is not None and player_id not in self.players:
+            return False
+        return self.collections is None or not self.collections.isdisjoint(OP_COLLECTIONS[op])
+
+def coalesce(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop changes that later ones in the same message make redundant.
+
+    A player update carries the player's whole profile, so only the last
+    update of each player is kept, and nothing is kept of a player that is
+    deleted in the same message except its deletion.
+    """
+    last_update = {}
+    last_delete = {}
+    for i, change in enumerate(changes):
+        if change["op"] == "update_player":
+            last_update[change["player_id"]] = i
+        elif change["op"] == "delete_player":
+            last_delete[change["player_id"]] = i
+    return [
+        change for i, change in enumerate(changes)
+        if i >= last_delete.get(change["player_id"], -1)
+        and (change["op"] != "update_player" or last_update[change["player_id"]] == i)
+    ]
+
+class Subscriber:
+    __slots__ = ("topics", "wakeup", "closed")
+
+    def __init__(self, topics: Topics):
+        self.topics = topics
+        self.wakeup = asyncio.Event()
+        self.closed = False
+
+class ChangeStream:
+    """Pushes the changes in the change journal to subscribers as they happen.
+
+    Subscribers hold no queue: a mutation only wakes the subscribers whose
+    topics it matches, and each one then reads the journal from its own
+    cursor. After waking it waits ``interval`` seconds first, so a burst of
+    changes, or everything a slow subscriber missed while it was sending,
+    goes out as one coalesced message. A subscriber whose cursor the
+    journal no longer covers (it fell too far behind, or the players were
+    replaced) gets a new snapshot instead.
+    """
+
+    def __init__(self, journal: ChangeJournal, interval: float = PUSH_INTERVAL, keepalive: float = KEEPALIVE_INTERVAL):
+        self.journal = journal
+        self.interval = interval
+        self.keepalive = keepalive
+        self.subscribers: Set[Subscriber] = set()
+
+    def changes_recorded(self, mutations: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """Wake the subscribers that follow any of the mutations just journaled"""
+        for subscriber in self.subscribers:
+            if any(subscriber.topics.matches(op, player_id) for op, player_id, _ in mutations):
+                subscriber.wakeup.set()
+
+    def reset(self) -> None:
+        """Wake every subscriber after the journal started a new session"""
+        for subscriber in self.subscribers:
+            subscriber.wakeup.set()
+
+    def close_all(self) -> None:
+        """End every stream"""
+        for subscriber in self.subscribers:
+            subscriber.closed = True
+            subscriber.wakeup.set()
+
+    async def events(
+        self,
+        topics: Topics,
+        snapshot: Callable[[], List[Dict[str, Any]]],
+        cursor: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream the changes matching ``topics`` after ``cursor`` as server-sent events.
+
+        Without a cursor (or with one the journal no longer covers) the
+        stream starts with a snapshot of the players the topics cover.
+        """
+        subscriber = Subscriber(topics)
+        self.subscribers.add(subscriber)
+        try:
+            while not subscriber.closed:
+                # Changes made from here on wake the subscriber again
+                subscriber.wakeup.clear()
+                found = self.journal.changes_since(cursor) if cursor else None
+                if found is None:
+                    cursor = self.journal.cursor
+                    yield format_event("snapshot", {"players": snapshot(), "cursor": cursor}, cursor)
+                else:
+                    changes, cursor, _ = found
+                    changes = [change for change in changes if topics.matches(change["op"], change["player_id"])]
+                    if changes:
+                        yield format_event("changes", {"changes": coalesce(changes), "cursor": cursor}, cursor)
+
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if not subscriber.closed:
+                    await asyncio.sleep(self.interval)
+            yield format_event("closed", {})
+        finally:
+            self.subscribers.discard(subscriber)
+
+# Shared stream of the API's changes
+change_stream = ChangeStream(change_journal)
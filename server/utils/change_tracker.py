@@ -0,0 +1,148 @@
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from server.utils.file_io import atomic_write_json, read_json
+
+# Collections a player is split into for change tracking and persistence
+PLAYER_COLLECTIONS = ["profile", "team", "thoughts", "battles", "matchups", "snapshots"]
+
+# Items modified in place remembered per collection; older ones are forgotten
+TRACKED_UPDATES = int(os.environ.get("PST_TRACKED_UPDATES", "1024"))
+
+# Where a clean shutdown leaves the tracker for the next run
+TRACKER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "tracker.json")
+
+class ChangeTracker:
+    """Tracks which parts of which players changed, and when.
+
+    Every change stamps the touched collection with a value from a single
+    monotonically increasing clock. Consumers (such as incremental saves)
+    remember the clock value they last saw and ask what changed since.
+    Clock values are only meaningful within one ``session``; a new session
+    starts whenever the whole player set is replaced, or when the server
+    restarts without the tracker having been saved on a clean shutdown.
+
+    For items modified in place only the latest change of each item is
+    kept, and only for the ``max_updates`` most recently modified items of
+    a collection. Changes older than that are summed up by a floor: asking
+    for the updates since a version below the floor returns None, and the
+    consumer has to treat the whole collection as changed.
+    """
+
+    def __init__(self, max_updates: int = TRACKED_UPDATES):
+        self.max_updates = max_updates
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all change history and start a new session"""
+        self.session = uuid.uuid4().hex
+        self.clock = 0
+        self.versions: Dict[str, Dict[str, int]] = {}
+        # Clock of the latest change of each item, oldest first
+        self.updates: Dict[str, Dict[str, OrderedDict[int, int]]] = {}
+        self.floors: Dict[str, Dict[str, int]] = {}
+
+    def save(self, path: str, stamp: Any = None) -> None:
+        """Write the tracker to ``path`` so the next run can carry on its session
+
+        ``stamp`` identifies the player state the versions describe;
+        ``restore`` only takes the tracker back with the same stamp.
+        """
+        atomic_write_json(path, {
+            "stamp": stamp,
+            "session": self.session,
+            "clock": self.clock,
+            "versions": self.versions,
+            "updates": {
+                player_id: {collection: list(updates.items()) for collection, updates in collections.items()}
+                for player_id, collections in self.updates.items()
+            },
+            "floors": self.floors
+        })
+
+    def restore(self, path: str, stamp: Any = None) -> bool:
+        """Carry on the session saved to ``path`` if it describes the same players
+
+        The file is removed either way: once the server runs again players
+        can change without it being rewritten, so it is only good once.
+        """
+        try:
+            state = read_json(path)
+        except (OSError, ValueError):
+            return False
+        os.remove(path)
+        if state.get("stamp") != stamp:
+            return False
+
+        self.session = state["session"]
+        self.clock = state["clock"]
+        self.versions = state["versions"]
+        self.updates = {
+            player_id: {collection: OrderedDict((int(index), clock) for index, clock in updates) for collection, updates in collections.items()}
+            for player_id, collections in state["updates"].items()
+        }
+        self.floors = state["floors"]
+        return True
+
+    def mark(self, player_id: str, collection: str, index: Optional[int] = None) -> int:
+        """Record a change to a player's collection.
+
+        ``index`` identifies an existing item that was modified in place;
+        appends do not need one because consumers track collection length.
+        """
+        self.clock += 1
+        self.versions.setdefault(player_id, {})[collection] = self.clock
+        if index is not None:
+            updates = self.updates.setdefault(player_id, {}).setdefault(collection, OrderedDict())
+            updates.pop(index, None)
+            updates[index] = self.clock
+            if len(updates) > self.max_updates:
+                _, clock = updates.popitem(last=False)
+                self.floors.setdefault(player_id, {})[collection] = clock
+        return self.clock
+
+    def mark_all(self, player_id: str) -> int:
+        """Record a change to every collection of a player"""
+        for collection in PLAYER_COLLECTIONS:
+            self.mark(player_id, collection)
+        return self.clock
+
+    def forget(self, player_id: str) -> None:
+        """Drop change history for a deleted player"""
+        # The deletion still moves the clock, so the player set's version changes
+        self.clock += 1
+        self.versions.pop(player_id, None)
+        self.updates.pop(player_id, None)
+        self.floors.pop(player_id, None)
+
+    def version(self, player_id: str, collection: str) -> int:
+        """Get the clock value of the latest change to a collection"""
+        return self.versions.get(player_id, {}).get(collection, 0)
+
+    def player_version(self, player_id: str) -> int:
+        """Get the clock value of the latest change to any of a player's collections"""
+        return max(self.versions.get(player_id, {}).values(), default=0)
+
+    def changed_since(self, player_id: str, collection: str, version: int) -> bool:
+        """Check whether a collection changed after ``version``"""
+        return self.version(player_id, collection) > version
+
+    def updated_indices(self, player_id: str, collection: str, version: int) -> Optional[Set[int]]:
+        """Get the indices of items modified in place after ``version``.
+
+        Returns None if some of those changes were already forgotten.
+        """
+        if version < self.floors.get(player_id, {}).get(collection, 0):
+            return None
+
+        indices = set()
+        for index, clock in reversed(self.updates.get(player_id, {}).get(collection, {}).items()):
+            if clock <= version:
+                break
+            indices.add(index)
+        return indices
+
+# Shared tracker used by the player API and the save manager
+change_tracker = ChangeTracker()
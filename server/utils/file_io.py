@@ -0,0 +1,98 @@
+import os
+import json
+import datetime
+import tempfile
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, IO
+from pydantic import BaseModel
+
+def json_default(value: Any) -> Any:
+    """Serialize values the json module does not handle natively"""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, BaseModel):
+        return value.dict()
+    return str(value)
+
+@contextmanager
+def atomic_open(path: str, mode: str = "w") -> Iterator[IO]:
+    """Open a temp file that is renamed over ``path`` once the block completes.
+
+    Every call gets its own uniquely named temp file next to ``path``, so
+    concurrent writers of the same file never write into each other's temp
+    file; the last rename wins. The temp file is removed if the block fails.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def atomic_write_json(path: str, data: Any) -> None:
+    """Write JSON to a temp file and rename it over the destination"""
+    with atomic_open(path) as f:
+        json.dump(data, f, default=json_default)
+
+def read_json(path: str) -> Any:
+    """Read a JSON document from disk"""
+    with open(path, "r") as f:
+        return json.load(f)
+
+def append_json_lines(path: str, records: List[Any], offset: int = 0) -> int:
+    """Append records as JSON lines after ``offset`` bytes and return the new size.
+
+    Anything past ``offset`` (for example a partial append from a crash
+    before the caller recorded the new size) is truncated first. With an
+    ``offset`` of 0 the file is rewritten through a temp file instead, so
+    readers of the old file (or of links to it) keep complete records.
+    """
+    if offset == 0:
+        with atomic_open(path, "wb") as f:
+            _write_json_lines(f, records)
+            size = f.tell()
+        return size
+
+    mode = "r+b" if os.path.exists(path) else "wb"
+    with open(path, mode) as f:
+        f.truncate(offset)
+        f.seek(offset)
+        _write_json_lines(f, records)
+        return f.tell()
+
+def _write_json_lines(f, records: List[Any]) -> None:
+    for record in records:
+        f.write(json.dumps(record, default=json_default).encode() + b"\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+def atomic_copy_prefix(src: str, dst: str, size: int) -> None:
+    """Copy the first ``size`` bytes of a file through a temp file"""
+    with open(src, "rb") as fin, atomic_open(dst, "wb") as fout:
+        remaining = size
+        while remaining > 0:
+            chunk = fin.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                raise EOFError(f"{src} is shorter than {size} bytes")
+            fout.write(chunk)
+            remaining -= len(chunk)
+
+def iter_json_lines(path: str, size: int) -> Iterator[Any]:
+    """Iterate over the JSON lines in the first ``size`` bytes of a file"""
+    if not os.path.exists(path):
+        return
+
+    read = 0
+    with open(path, "rb") as f:
+        for line in f:
+            read += len(line)
+            if read > size:
+                break
+            yield json.loads(line)
@@ -0,0 +1,194 @@
+import os
+import uuid
+import shutil
+import threading
+from typing import List, Dict, Any, Optional, Iterable
+from pydantic import PrivateAttr
+
+from server.models.player import Player, Thought, Battle
+from server.utils.file_io import atomic_copy_prefix
+from server.utils.mutation_log import WAL_DIR
+from server.utils.save_codec import read_indexed_records
+
+# Links to the save segments that lazily loaded players read from
+PIN_DIR = os.path.join(WAL_DIR, "segments")
+
+# Player fields that are loaded on first access, and the models of their items
+LAZY_FIELDS = {
+    "thought_history": Thought,
+    "battle_history": Battle
+}
+
+# Saves read players from a worker thread while the event loop may touch
+# the same histories; each field is loaded by one of them
+_load_lock = threading.Lock()
+
+class LazyPlayer(Player):
+    """Player whose histories are read from save segments on first access.
+
+    Histories are left out of the model until they are touched. Each
+    missing field has a segment reference: a file pinned under ``PIN_DIR``
+    (a hard link, so later saves and deletes cannot change it) plus the
+    number of bytes holding the field's records. Dumping the model loads
+    the fields that are dumped.
+    """
+
+    _segments: Dict[str, Dict[str, Any]] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def from_segments(cls, data: Dict[str, Any], segments: Dict[str, Dict[str, Any]]) -> "LazyPlayer":
+        """Build a player from its small fields and references to its histories"""
+        player = cls(**{key: value for key, value in data.items() if key not in segments})
+        for field in segments:
+            del player.__dict__[field]
+        player._segments = dict(segments)
+        return player
+
+    def __getattr__(self, name: str) -> Any:
+        if name in LAZY_FIELDS:
+            with _load_lock:
+                # Another reader may have loaded it while this one waited
+                if name not in self.__dict__:
+                    segment = self._segments.get(name)
+                    if segment is None:
+                        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+                    model = LAZY_FIELDS[name]
+                    self.__dict__[name] = [model(**item) for item in read_indexed_records(segment["path"], segment["size"])]
+                    self._segments.pop(name, None)
+                return self.__dict__[name]
+        return super().__getattr__(name)
+
+    def pending_segment(self, field: str) -> Optional[Dict[str, Any]]:
+        """Get the segment a field will be loaded from, if it was not loaded yet"""
+        if field in self.__dict__:
+            return None
+        return self._segments.get(field)
+
+    def _load_dumped(self, include: Any, exclude: Any) -> None:
+        for field in LAZY_FIELDS:
+            if self.pending_segment(field) is None:
+                continue
+            if include is not None and field not in include:
+                continue
+            if isinstance(exclude, dict) and exclude.get(field) is True:
+                continue
+            if isinstance(exclude, (set, frozenset, list, tuple)) and field in exclude:
+                continue
+            getattr(self, field)
+
+    def model_dump(self, **kwargs) -> Dict[str, Any]:
+        self._load_dumped(kwargs.get("include"), kwargs.get("exclude"))
+        return super().model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs) -> str:
+        self._load_dumped(kwargs.get("include"), kwargs.get("exclude"))
+        return super().model_dump_json(**kwargs)
+
+def _freeze(field: str, history: Any) -> Any:
+    # Later appends, spills and battle updates must not show in the copy.
+    # Thoughts never change once added; battles are copied when their
+    # turns can still change (archived turns cannot)
+    if field == "battle_history":
+        frozen = []
+        for battle in history:
+            turns = battle.turns.freeze()
+            frozen.append(battle if turns is battle.turns else battle.copy(update={"turns": turns}))
+        return frozen
+    return history.freeze() if hasattr(history, "freeze") else list(history)
+
+def snapshot_player(player: Player) -> Dict[str, Any]:
+    """Take what a checkpoint needs of a player, without reading its histories.
+
+    The small fields are dumped straight away and the histories frozen as
+    they are, so ``dump_snapshot`` can serialize them later (off the event
+    loop) while the player keeps changing. Pending histories of a lazy
+    player stay references to their segments.
+    """
+    pending = {}
+    if isinstance(player, LazyPlayer):
+        pending = {field: player.pending_segment(field) for field in LAZY_FIELDS if player.pending_segment(field)}
+    data = player.dict(exclude=set(LAZY_FIELDS))
+    for field in LAZY_FIELDS:
+        if field not in pending:
+            data[field] = _freeze(field, getattr(player, field))
+    if pending:
+        data["lazy_segments"] = pending
+    return data
+
+def dump_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Serialize the histories of a player snapshot"""
+    return {
+        key: [item.dict() for item in value] if key in LAZY_FIELDS else value
+        for key, value in snapshot.items()
+    }
+
+def dump_player(player: Player) -> Dict[str, Any]:
+    """Dump a player for a checkpoint without loading pending histories"""
+    return dump_snapshot(snapshot_player(player))
+
+def restore_player(data: Dict[str, Any]) -> Player:
+    """Rebuild a player dumped by ``dump_player``"""
+    pending = data.pop("lazy_segments", None)
+    if pending:
+        return LazyPlayer.from_segments(data, pending)
+    return Player(**data)
+
+def new_pin_dir() -> str:
+    """Get a fresh directory for the segments of one lazy load"""
+    return os.path.join(PIN_DIR, uuid.uuid4().hex)
+
+def pin_segment(src: str, dst: str, size: int, **info: Any) -> Dict[str, Any]:
+    """Pin the first ``size`` bytes of a segment and return a reference to it"""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        # No hard links here (or across devices): fall back to a copy
+        atomic_copy_prefix(src, dst, size)
+    return {"path": dst, "size": size, **info}
+
+# Pinned files (or pin directories) in use by a planned save or a load in
+# progress, so pruning keeps them
+_held: Dict[str, int] = {}
+_held_lock = threading.Lock()
+
+def hold_pins(paths: Iterable[str]) -> None:
+    """Keep pinned files from being pruned until they are released"""
+    with _held_lock:
+        for path in paths:
+            _held[path] = _held.get(path, 0) + 1
+
+def release_pins(paths: Iterable[str]) -> None:
+    """Release pinned files held by ``hold_pins``"""
+    with _held_lock:
+        for path in paths:
+            _held[path] -= 1
+            if not _held[path]:
+                del _held[path]
+
+def _pin_root(path: str) -> str:
+    return os.path.relpath(path, PIN_DIR).split(os.sep)[0]
+
+def prune_pins(players: Iterable[Player], keep: Iterable[str] = ()) -> None:
+    """Delete pinned segments that neither the players nor a held save need.
+
+    Called after a checkpoint, which only references the pins of the
+    players in it. A load in progress holds its pin directory, and files
+    in ``keep`` (such as the current battle archive) are never pruned.
+    """
+    if not os.path.isdir(PIN_DIR):
+        return
+
+    needed = {_pin_root(path) for path in keep}
+    for player in players:
+        if isinstance(player, LazyPlayer):
+            for field in LAZY_FIELDS:
+                segment = player.pending_segment(field)
+                if segment:
+                    needed.add(_pin_root(segment["path"]))
+    with _held_lock:
+        needed.update(_pin_root(path) for path in _held)
+
+    for name in os.listdir(PIN_DIR):
+        if name not in needed:
+            shutil.rmtree(os.path.join(PIN_DIR, name), ignore_errors=True)
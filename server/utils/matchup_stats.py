@@ -0,0 +1,100 @@
+import os
+import datetime
+from typing import Dict, Any, Optional
+
+from server.models.player import MatchupRecord
+
+# Number of most recent results kept per matchup for the sliding window
+MATCHUP_WINDOW = int(os.environ.get("PST_MATCHUP_WINDOW", "50"))
+
+# Time buckets kept per matchup: (field, bucket length in seconds, buckets kept)
+BUCKETS = {
+    "last_24h": ("hourly", 3600, 24),
+    "last_30d": ("daily", 86400, 30)
+}
+
+# Result letters used in MatchupRecord.recent_results
+RESULT_CODES = {"win": "w", "loss": "l", "draw": "d"}
+RESULT_COLUMNS = {"win": 1, "loss": 2, "draw": 3}
+
+def _period(timestamp: datetime.datetime, length: int) -> int:
+    return int(timestamp.timestamp() // length)
+
+def record_result(matchup: MatchupRecord, result: str, timestamp: datetime.datetime) -> None:
+    """Add a battle result to a matchup record and its rolling aggregates.
+
+    Every update touches a bounded amount of state (the result window and
+    the newest time bucket), so it costs the same however many battles
+    the player has.
+    """
+    if result == "win":
+        matchup.wins += 1
+    elif result == "loss":
+        matchup.losses += 1
+    else:
+        matchup.draws += 1
+    matchup.last_battle = timestamp
+
+    # Streak of identical results, and the longest ones seen
+    code = RESULT_CODES[result]
+    matchup.streak = matchup.streak + 1 if matchup.recent_results.endswith(code) else 1
+    if result == "win":
+        matchup.best_win_streak = max(matchup.best_win_streak, matchup.streak)
+    elif result == "loss":
+        matchup.longest_loss_streak = max(matchup.longest_loss_streak, matchup.streak)
+
+    # Sliding window of the most recent results
+    matchup.recent_results = (matchup.recent_results + code)[-MATCHUP_WINDOW:]
+
+    # Time buckets: [period, wins, losses, draws], oldest first. Results
+    # stamped before the newest bucket (clock changes) are counted in it.
+    for field, length, count in BUCKETS.values():
+        buckets = getattr(matchup, field)
+        period = _period(timestamp, length)
+        if not buckets or buckets[-1][0] < period:
+            buckets.append([period, 0, 0, 0])
+            while buckets[0][0] <= period - count:
+                buckets.pop(0)
+        buckets[-1][RESULT_COLUMNS[result]] += 1
+
+def _totals(wins: int, losses: int, draws: int) -> Dict[str, Any]:
+    battles = wins + losses + draws
+    return {
+        "battles": battles,
+        "wins": wins,
+        "losses": losses,
+        "draws": draws,
+        "win_rate": wins / battles if battles else None
+    }
+
+def matchup_stats(matchup: MatchupRecord, now: Optional[datetime.datetime] = None) -> Dict[str, Any]:
+    """Summarize the rolling aggregates of a matchup record"""
+    now = now or datetime.datetime.now()
+    recent = matchup.recent_results
+    stats = {
+        "recent": _totals(recent.count("w"), recent.count("l"), recent.count("d")),
+        "streak": {
+            "result": next((name for name, code in RESULT_CODES.items() if recent.endswith(code)), None),
+            "length": matchup.streak
+        },
+        "best_win_streak": matchup.best_win_streak,
+        "longest_loss_streak": matchup.longest_loss_streak
+    }
+    for name, (field, length, count) in BUCKETS.items():
+        start = _period(now, length) - count
+        totals = [0, 0, 0]
+        for bucket in getattr(matchup, field):
+            if bucket[0] > start:
+                for i in range(3):
+                    totals[i] += bucket[i + 1]
+        stats[name] = _totals(*totals)
+    return stats
+
+def all_matchup_stats(matchups: Dict[str, MatchupRecord]) -> Dict[str, Dict[str, Any]]:
+    """Summarize every matchup record of a player, by opponent"""
+    now = datetime.datetime.now()
+    return {opponent_id: matchup_stats(matchup, now) for opponent_id, matchup in matchups.items()}
+
+def stats_period(now: Optional[datetime.datetime] = None) -> int:
+    """Get the current shortest time bucket; stats only move with it or with new results"""
+    return _period(now or datetime.datetime.now(), min(length for _, length, _ in BUCKETS.values()))
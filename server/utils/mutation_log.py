@@ -0,0 +1,244 @@
+import os
+import json
+import shutil
+import datetime
+import tempfile
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
+
+from server.utils.file_io import json_default
+
+# Directory for the write-ahead log and its checkpoints
+WAL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "wal")
+
+# Number of logged mutations between automatic checkpoints
+CHECKPOINT_INTERVAL = int(os.environ.get("PST_CHECKPOINT_INTERVAL", "1000"))
+
+# Whether each appended mutation is fsync'd before the request returns
+FSYNC_MUTATIONS = os.environ.get("PST_FSYNC_MUTATIONS", "1") != "0"
+
+# Ensure WAL directory exists
+os.makedirs(WAL_DIR, exist_ok=True)
+
+class MutationLog:
+    """Append-only log of player mutations with periodic checkpoints.
+
+    Every mutation is written as one JSON line to ``mutations.log``, so the
+    cost of persisting it is proportional to the size of the mutation, not
+    of the whole tracker state. Every ``checkpoint_interval`` records a full
+    snapshot is written to ``checkpoint.json`` and the log is truncated.
+    On startup the checkpoint is loaded and the log tail is replayed.
+
+    A checkpoint can also be written while mutations keep coming in:
+    ``begin_checkpoint`` moves the log aside to ``mutations.log.1`` and
+    returns the sequence number the snapshot covers, and once the snapshot
+    is durable ``commit_checkpoint`` installs it and removes the old log.
+    Until then both logs are replayed, in order.
+    """
+
+    def __init__(self, wal_dir: str = WAL_DIR, checkpoint_interval: int = CHECKPOINT_INTERVAL, fsync: bool = FSYNC_MUTATIONS):
+        self.wal_dir = wal_dir
+        self.checkpoint_interval = checkpoint_interval
+        self.fsync = fsync
+        self.log_path = os.path.join(wal_dir, "mutations.log")
+        self.checkpoint_path = os.path.join(wal_dir, "checkpoint.json")
+        self.rotated_path = f"{self.log_path}.1"
+        self.seq = 0
+        self.records_since_checkpoint = 0
+        # Sequence number covered by the checkpoint being written, if any
+        self.pending: Optional[int] = None
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(self.wal_dir, exist_ok=True)
+            self._file = open(self.log_path, "a")
+        return self._file
+
+    def append(self, op: str, player_id: Optional[str], payload: Dict[str, Any], timestamp: datetime.datetime) -> int:
+        """Append a single mutation record and return its sequence number"""
+        return self.append_many([(op, player_id, payload)], timestamp)
+
+    def append_many(self, mutations: List[Tuple[str, Optional[str], Dict[str, Any]]], timestamp: datetime.datetime) -> int:
+        """Append (op, player_id, payload) records with one write and fsync, and return the last sequence number"""
+        lines = []
+        for op, player_id, payload in mutations:
+            self.seq += 1
+            record = {
+                "seq": self.seq,
+                "op": op,
+                "player_id": player_id,
+                "timestamp": timestamp,
+                "payload": payload
+            }
+            lines.append(json.dumps(record, default=json_default) + "\n")
+
+        f = self._open()
+        f.write("".join(lines))
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+        self.records_since_checkpoint += len(lines)
+        return self.seq
+
+    def needs_checkpoint(self) -> bool:
+        """Check whether enough records have accumulated to checkpoint"""
+        return self.records_since_checkpoint >= self.checkpoint_interval
+
+    def checkpoint(self, players: List[Dict[str, Any]]) -> None:
+        """Write a full snapshot of all players and truncate the log"""
+        self.commit_checkpoint(self.prepare_checkpoint(players))
+
+    def prepare_checkpoint(self, players: List[Dict[str, Any]]) -> str:
+        """Write the bulk of a snapshot to a temporary file.
+
+        This does all the encoding and most of the I/O, and can run off the
+        event loop; ``commit_checkpoint`` then stamps the sequence number
+        and installs it. Returns the temporary file's path.
+        """
+        os.makedirs(self.wal_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.wal_dir, prefix="checkpoint.", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write('{"created_at": ' + json.dumps(datetime.datetime.now(), default=json_default) + ', "players": ')
+            json.dump(players, f, default=json_default)
+            f.write(', "seq": ')
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path
+
+    def begin_checkpoint(self) -> Optional[int]:
+        """Start a checkpoint of the state as of now, to be written in the background.
+
+        Later records go to a new log, so the snapshot can be written while
+        mutations continue. Returns the sequence number the snapshot must
+        cover, or None while another checkpoint is still being written.
+        """
+        if self.pending is not None:
+            return None
+
+        self.close()
+        if os.path.exists(self.log_path):
+            if os.path.exists(self.rotated_path):
+                # An earlier checkpoint failed: its records stay in front of these
+                with open(self.log_path, "rb") as src, open(self.rotated_path, "ab") as dst:
+                    shutil.copyfileobj(src, dst)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(self.log_path)
+            else:
+                os.replace(self.log_path, self.rotated_path)
+
+        self.pending = self.seq
+        self.records_since_checkpoint = 0
+        return self.seq
+
+    def abort_checkpoint(self, seq: int) -> None:
+        """Give up on a checkpoint started by ``begin_checkpoint``"""
+        if self.pending == seq:
+            self.pending = None
+
+    def commit_checkpoint(self, tmp_path: str, seq: Optional[int] = None) -> bool:
+        """Install a prepared snapshot.
+
+        Without ``seq`` the snapshot is of the current state, and the log is
+        truncated. With it, the snapshot is the one ``begin_checkpoint``
+        returned ``seq`` for, and only the log moved aside then is removed;
+        if a newer checkpoint was installed meanwhile, the snapshot is
+        discarded and False returned.
+        """
+        if seq is not None and seq != self.pending:
+            os.remove(tmp_path)
+            return False
+
+        # The snapshot records the sequence number it covers, so a crash
+        # between writing it and truncating the log only replays no-ops
+        with open(tmp_path, "a") as f:
+            f.write(f"{self.seq if seq is None else seq}}}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+        if seq is None:
+            self.close()
+            with open(self.log_path, "w") as f:
+                f.flush()
+                os.fsync(f.fileno())
+            self.records_since_checkpoint = 0
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+        self.pending = None
+        return True
+
+    def read_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Read the latest checkpoint, if one exists"""
+        if not os.path.exists(self.checkpoint_path):
+            return None
+
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading checkpoint {self.checkpoint_path}: {e}")
+            return None
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the complete records in the logs, oldest first.
+
+        A torn final line (a crash in the middle of an append) is dropped
+        and truncated away so later appends start on a clean line.
+        """
+        yield from self._iter_file(self.rotated_path)
+        yield from self._iter_file(self.log_path)
+
+    def _iter_file(self, path: str) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return
+
+        valid_end = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                valid_end += len(line)
+                yield record
+
+        if valid_end < os.path.getsize(path):
+            print(f"Discarding torn tail of mutation log {path}")
+            with open(path, "r+b") as f:
+                f.truncate(valid_end)
+
+    def load_checkpoint(self) -> List[Dict[str, Any]]:
+        """Load the latest checkpoint and return its player dictionaries"""
+        checkpoint = self.read_checkpoint() or {"seq": 0, "players": []}
+        self.seq = checkpoint["seq"]
+        return checkpoint["players"]
+
+    def replay_records(self, apply: Callable[[Dict[str, Any]], None]) -> int:
+        """Apply every log record newer than the loaded checkpoint"""
+        replayed = 0
+        for record in self.iter_records():
+            if record["seq"] <= self.seq:
+                continue
+            try:
+                apply(record)
+            except Exception as e:
+                print(f"Error replaying mutation {record['seq']} ({record['op']}): {e}")
+            self.seq = record["seq"]
+            replayed += 1
+
+        self.records_since_checkpoint = replayed
+        return replayed
+
+    def close(self) -> None:
+        """Close the underlying log file"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+# Shared log used by the player API
+mutation_log = MutationLog()
@@ -0,0 +1,496 @@
+import os
+import json
+import uuid
+import hashlib
+import datetime
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Tuple, Sequence, Iterable
+
+from server.models.player import Player, Thought, Battle, MatchupRecord
+from server.models.pokemon import Pokemon
+from server.models.turn import TurnEvent
+from server.utils.lazy_player import LazyPlayer
+from server.utils.battle_archive import BattleArchive, battle_archive, TIER_BATTLES
+from server.utils.thought_spill import ThoughtHistory, THOUGHT_RETENTION, SPILL_BLOCK
+from server.utils.time_index import TimeKey, TimeIndex
+
+# Storage backend for players: "memory" or "sqlite"
+STORAGE_BACKEND = os.environ.get("PST_STORAGE", "memory")
+
+# Database file used by the SQLite backend
+SQLITE_PATH = os.environ.get(
+    "PST_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "tracker.db")
+)
+
+def new_player_id() -> str:
+    """Generate an ID for a new player"""
+    # Random rather than counted, so an ID is never handed out twice, even
+    # after players are deleted or the server restarts
+    return f"player_{uuid.uuid4().hex[:12]}"
+
+def team_snapshot_id(team: List[Pokemon]) -> str:
+    """Get the ID of a team snapshot: a hash of the team's contents"""
+    data = json.dumps([pokemon.dict() for pokemon in team], sort_keys=True)
+    return "team_" + hashlib.sha256(data.encode()).hexdigest()[:16]
+
+class PlayerRepository(ABC):
+    """Storage for players and their team, thoughts, battles and matchups.
+
+    The API only reads and writes player state through these methods, so
+    backends can store it however suits them. Write methods take the
+    timestamp of the change and set the player's ``last_updated`` to it.
+    Callers check that a player exists (``get_player_name``) before
+    calling the other methods for it.
+
+    ``durable`` backends keep their own state across restarts, so the
+    mutation log and its checkpoints are not used with them.
+    """
+
+    durable = False
+
+    # Players
+    @abstractmethod
+    def count_players(self) -> int:
+        """Get the number of players"""
+
+    @abstractmethod
+    def list_players(self, offset: int, limit: int, collections: Optional[Iterable[str]] = None) -> List[Player]:
+        """Get a page of players, in creation order (see ``get_player``)"""
+
+    @abstractmethod
+    def all_players(self) -> List[Player]:
+        """Get every player, in creation order"""
+
+    @abstractmethod
+    def player_ids(self) -> List[str]:
+        """Get the ID of every player, in creation order"""
+
+    @abstractmethod
+    def get_player(self, player_id: str, collections: Optional[Iterable[str]] = None) -> Optional[Player]:
+        """Get a player with all its collections, or only the named ones.
+
+        Collections that are not named may be left empty, so callers must
+        not read them from the returned player.
+        """
+
+    @abstractmethod
+    def get_player_name(self, player_id: str) -> Optional[str]:
+        """Get a player's name, or None if the player does not exist"""
+
+    @abstractmethod
+    def create_player(self, player: Player) -> None:
+        """Add a new player"""
+
+    @abstractmethod
+    def update_player(self, player_id: str, fields: Dict[str, Any], timestamp: datetime.datetime) -> None:
+        """Set profile fields (name, location, items, badges) of a player"""
+
+    @abstractmethod
+    def delete_player(self, player_id: str) -> bool:
+        """Delete a player and everything it owns"""
+
+    @abstractmethod
+    def replace_all(self, players: List[Player]) -> None:
+        """Replace every player, for example when a save is loaded"""
+
+    # Team
+    @abstractmethod
+    def get_team(self, player_id: str) -> List[Pokemon]:
+        """Get a player's team"""
+
+    @abstractmethod
+    def add_pokemon(self, player_id: str, pokemon: Pokemon, timestamp: datetime.datetime) -> None:
+        """Append a Pokemon to a player's team"""
+
+    @abstractmethod
+    def replace_pokemon(self, player_id: str, index: int, pokemon: Pokemon, timestamp: datetime.datetime) -> None:
+        """Replace the Pokemon at a team index"""
+
+    @abstractmethod
+    def remove_pokemon(self, player_id: str, index: int, timestamp: datetime.datetime) -> Pokemon:
+        """Remove and return the Pokemon at a team index"""
+
+    # Thoughts
+    @abstractmethod
+    def count_thoughts(self, player_id: str) -> int:
+        """Get the number of thoughts a player has"""
+
+    @abstractmethod
+    def get_thoughts(self, player_id: str) -> List[Thought]:
+        """Get a player's thoughts, oldest first"""
+
+    @abstractmethod
+    def page_thoughts(
+        self,
+        player_id: str,
+        limit: int,
+        category: Optional[str] = None,
+        after: Optional[TimeKey] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        descending: bool = False,
+        offset: int = 0
+    ) -> Tuple[List[Thought], int, Optional[TimeKey]]:
+        """Get a page of a player's thoughts by timestamp (see ``page_keys``)"""
+
+    @abstractmethod
+    def get_thoughts_at(self, player_id: str, positions: List[int]) -> List[Thought]:
+        """Get a player's thoughts at positions of its history, in the order given"""
+
+    @abstractmethod
+    def add_thought(self, player_id: str, thought: Thought, timestamp: datetime.datetime) -> None:
+        """Append a thought to a player's history"""
+
+    # Battles
+    @abstractmethod
+    def count_battles(self, player_id: str) -> int:
+        """Get the number of battles a player has"""
+
+    @abstractmethod
+    def get_battles(self, player_id: str, opponent_id: Optional[str] = None) -> List[Battle]:
+        """Get a player's battles, oldest first, optionally against one opponent"""
+
+    @abstractmethod
+    def page_battles(
+        self,
+        player_id: str,
+        limit: int,
+        opponent_id: Optional[str] = None,
+        after: Optional[TimeKey] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        descending: bool = False,
+        offset: int = 0
+    ) -> Tuple[List[Battle], int, Optional[TimeKey]]:
+        """Get a page of a player's battles by start time (see ``page_keys``)"""
+
+    @abstractmethod
+    def get_battle(self, player_id: str, battle_id: str) -> Optional[Tuple[int, Battle]]:
+        """Get a battle and its index in the player's history"""
+
+    @abstractmethod
+    def add_battle(self, player_id: str, battle: Battle, timestamp: datetime.datetime) -> None:
+        """Append a battle to a player's history"""
+
+    @abstractmethod
+    def end_battle(self, player_id: str, battle_id: str, result: str, end_time: datetime.datetime) -> int:
+        """Record a battle's result and return its index"""
+
+    @abstractmethod
+    def add_turns(self, player_id: str, battle_id: str, turns: List[TurnEvent], timestamp: datetime.datetime) -> int:
+        """Append turns to a battle and return its index"""
+
+    # Matchups
+    @abstractmethod
+    def get_matchups(self, player_id: str) -> Dict[str, MatchupRecord]:
+        """Get a player's matchup records by opponent"""
+
+    @abstractmethod
+    def get_matchup(self, player_id: str, opponent_id: str) -> Optional[MatchupRecord]:
+        """Get a player's matchup record against one opponent"""
+
+    @abstractmethod
+    def put_matchup(self, player_id: str, matchup: MatchupRecord, timestamp: datetime.datetime) -> None:
+        """Create or replace a matchup record"""
+
+    # Team snapshots
+    @abstractmethod
+    def get_team_snapshots(self, player_id: str) -> Dict[str, List[Pokemon]]:
+        """Get a player's team snapshots by ID"""
+
+    @abstractmethod
+    def get_team_snapshot(self, player_id: str, snapshot_id: str) -> Optional[List[Pokemon]]:
+        """Get one team snapshot, or None if the player has no such snapshot"""
+
+    @abstractmethod
+    def put_team_snapshot(self, player_id: str, snapshot_id: str, team: List[Pokemon], timestamp: datetime.datetime) -> None:
+        """Store a team snapshot under its ID"""
+
+class InMemoryPlayerRepository(PlayerRepository):
+    """Players kept as models in a dictionary.
+
+    Reads return the live models (and their lists), so they are cheap but
+    must not be modified by callers.
+
+    Battles are indexed per player by ID and by opponent, so looking up a
+    battle or an opponent's battles does not scan the history. A player's
+    index is built on its first battle lookup (so lazily loaded histories
+    stay unread until then) and kept up to date by ``add_battle``; it is
+    dropped whenever the player is replaced.
+
+    Thoughts and battles also get a time index per player (by timestamp
+    overall and per category or opponent), built on the first page read
+    and kept up to date in the same way, so a page of the history costs
+    the same however long it is.
+
+    With an ``archive``, the turns of a battle move to disk when it ends
+    (and when players are installed, for histories that are already
+    loaded), so only the battle's summary stays in memory.
+
+    With a ``thought_retention``, a thought history that outgrows it
+    becomes a ``ThoughtHistory``: only its most recent thoughts stay in
+    memory, the older ones are spilled to disk, and pages of it are read
+    through its own time index.
+    """
+
+    def __init__(self, archive: Optional[BattleArchive] = None, thought_retention: int = 0):
+        self.archive = archive
+        self.thought_retention = thought_retention
+        self.players: Dict[str, Player] = {}
+        self.battle_ids: Dict[str, Dict[str, int]] = {}
+        self.opponent_battles: Dict[str, Dict[str, List[int]]] = {}
+        self.thought_times: Dict[str, TimeIndex] = {}
+        self.battle_times: Dict[str, TimeIndex] = {}
+
+    def _battle_index(self, player_id: str) -> Dict[str, int]:
+        if player_id not in self.battle_ids:
+            by_id = {}
+            by_opponent = {}
+            for i, battle in enumerate(self.players[player_id].battle_history):
+                by_id.setdefault(battle.id, i)
+                by_opponent.setdefault(battle.opponent_id, []).append(i)
+            self.battle_ids[player_id] = by_id
+            self.opponent_battles[player_id] = by_opponent
+        return self.battle_ids[player_id]
+
+    def _thought_times(self, player_id: str) -> TimeIndex:
+        if player_id not in self.thought_times:
+            index = TimeIndex()
+            for i, thought in enumerate(self.players[player_id].thought_history):
+                index.add(thought.timestamp, i, thought.category)
+            self.thought_times[player_id] = index
+        return self.thought_times[player_id]
+
+    def _thoughts(self, player_id: str) -> Sequence[Thought]:
+        player = self.players[player_id]
+        thoughts = player.thought_history
+        if self.thought_retention and not isinstance(thoughts, ThoughtHistory) and len(thoughts) >= self.thought_retention + SPILL_BLOCK:
+            thoughts = player.thought_history = ThoughtHistory.from_thoughts(thoughts, self.thought_retention)
+            self.thought_times.pop(player_id, None)
+        return thoughts
+
+    def _battle_times(self, player_id: str) -> TimeIndex:
+        if player_id not in self.battle_times:
+            index = TimeIndex()
+            for i, battle in enumerate(self.players[player_id].battle_history):
+                index.add(battle.start_time, i, battle.opponent_id)
+            self.battle_times[player_id] = index
+        return self.battle_times[player_id]
+
+    def _drop_index(self, player_id: str) -> None:
+        self.battle_ids.pop(player_id, None)
+        self.opponent_battles.pop(player_id, None)
+        self.thought_times.pop(player_id, None)
+        self.battle_times.pop(player_id, None)
+
+    def count_players(self) -> int:
+        return len(self.players)
+
+    def list_players(self, offset: int, limit: int, collections: Optional[Iterable[str]] = None) -> List[Player]:
+        return list(self.players.values())[offset:offset + limit]
+
+    def all_players(self) -> List[Player]:
+        return list(self.players.values())
+
+    def player_ids(self) -> List[str]:
+        return list(self.players)
+
+    def get_player(self, player_id: str, collections: Optional[Iterable[str]] = None) -> Optional[Player]:
+        return self.players.get(player_id)
+
+    def get_player_name(self, player_id: str) -> Optional[str]:
+        player = self.players.get(player_id)
+        return player.name if player is not None else None
+
+    def create_player(self, player: Player) -> None:
+        self.players[player.id] = player
+        self._drop_index(player.id)
+
+    def update_player(self, player_id: str, fields: Dict[str, Any], timestamp: datetime.datetime) -> None:
+        player = self.players[player_id]
+        for name, value in fields.items():
+            setattr(player, name, value)
+        player.last_updated = timestamp
+
+    def delete_player(self, player_id: str) -> bool:
+        self._drop_index(player_id)
+        return self.players.pop(player_id, None) is not None
+
+    def replace_all(self, players: List[Player]) -> None:
+        self.players = {player.id: player for player in players}
+        self.battle_ids = {}
+        self.opponent_battles = {}
+        self.thought_times = {}
+        self.battle_times = {}
+        if self.archive is not None:
+            self.archive.rotate()
+            for player in players:
+                if not (isinstance(player, LazyPlayer) and player.pending_segment("battle_history")):
+                    self.archive.archive(player.battle_history)
+        if self.thought_retention:
+            for player in players:
+                if not (isinstance(player, LazyPlayer) and player.pending_segment("thought_history")):
+                    self._thoughts(player.id)
+
+    def get_team(self, player_id: str) -> List[Pokemon]:
+        return self.players[player_id].team
+
+    def add_pokemon(self, player_id: str, pokemon: Pokemon, timestamp: datetime.datetime) -> None:
+        player = self.players[player_id]
+        player.team.append(pokemon)
+        player.last_updated = timestamp
+
+    def replace_pokemon(self, player_id: str, index: int, pokemon: Pokemon, timestamp: datetime.datetime) -> None:
+        player = self.players[player_id]
+        player.team[index] = pokemon
+        player.last_updated = timestamp
+
+    def remove_pokemon(self, player_id: str, index: int, timestamp: datetime.datetime) -> Pokemon:
+        player = self.players[player_id]
+        player.last_updated = timestamp
+        return player.team.pop(index)
+
+    def _count(self, player_id: str, field: str) -> int:
+        # Histories not loaded yet are counted from their save segment
+        player = self.players[player_id]
+        if isinstance(player, LazyPlayer):
+            segment = player.pending_segment(field)
+            if segment is not None and segment.get("count") is not None:
+                return segment["count"]
+        return len(getattr(player, field))
+
+    def count_thoughts(self, player_id: str) -> int:
+        return self._count(player_id, "thought_history")
+
+    def get_thoughts(self, player_id: str) -> List[Thought]:
+        return self._thoughts(player_id)
+
+    def page_thoughts(
+        self,
+        player_id: str,
+        limit: int,
+        category: Optional[str] = None,
+        after: Optional[TimeKey] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        descending: bool = False,
+        offset: int = 0
+    ) -> Tuple[List[Thought], int, Optional[TimeKey]]:
+        thoughts = self._thoughts(player_id)
+        if isinstance(thoughts, ThoughtHistory):
+            return thoughts.page(limit, category, after=after, since=since, until=until, descending=descending, offset=offset)
+        keys, total, next_key = self._thought_times(player_id).page(
+            limit, category, after=after, since=since, until=until, descending=descending, offset=offset
+        )
+        return [thoughts[i] for _, i in keys], total, next_key
+
+    def get_thoughts_at(self, player_id: str, positions: List[int]) -> List[Thought]:
+        thoughts = self._thoughts(player_id)
+        return [thoughts[i] for i in positions]
+
+    def add_thought(self, player_id: str, thought: Thought, timestamp: datetime.datetime) -> None:
+        player = self.players[player_id]
+        if player_id in self.thought_times:
+            self.thought_times[player_id].add(thought.timestamp, len(player.thought_history), thought.category)
+        player.thought_history.append(thought)
+        player.last_updated = timestamp
+        self._thoughts(player_id)
+
+    def count_battles(self, player_id: str) -> int:
+        return self._count(player_id, "battle_history")
+
+    def get_battles(self, player_id: str, opponent_id: Optional[str] = None) -> List[Battle]:
+        battles = self.players[player_id].battle_history
+        if opponent_id is not None:
+            self._battle_index(player_id)
+            battles = [battles[i] for i in self.opponent_battles[player_id].get(opponent_id, [])]
+        return battles
+
+    def page_battles(
+        self,
+        player_id: str,
+        limit: int,
+        opponent_id: Optional[str] = None,
+        after: Optional[TimeKey] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        descending: bool = False,
+        offset: int = 0
+    ) -> Tuple[List[Battle], int, Optional[TimeKey]]:
+        keys, total, next_key = self._battle_times(player_id).page(
+            limit, opponent_id, after=after, since=since, until=until, descending=descending, offset=offset
+        )
+        battles = self.players[player_id].battle_history
+        return [battles[i] for _, i in keys], total, next_key
+
+    def get_battle(self, player_id: str, battle_id: str) -> Optional[Tuple[int, Battle]]:
+        index = self._battle_index(player_id).get(battle_id)
+        if index is None:
+            return None
+        return index, self.players[player_id].battle_history[index]
+
+    def add_battle(self, player_id: str, battle: Battle, timestamp: datetime.datetime) -> None:
+        player = self.players[player_id]
+        if player_id in self.battle_ids:
+            index = len(player.battle_history)
+            self.battle_ids[player_id].setdefault(battle.id, index)
+            self.opponent_battles[player_id].setdefault(battle.opponent_id, []).append(index)
+        if player_id in self.battle_times:
+            self.battle_times[player_id].add(battle.start_time, len(player.battle_history), battle.opponent_id)
+        player.battle_history.append(battle)
+        player.last_updated = timestamp
+
+    def end_battle(self, player_id: str, battle_id: str, result: str, end_time: datetime.datetime) -> int:
+        index, battle = self.get_battle(player_id, battle_id)
+        battle.result = result
+        battle.end_time = end_time
+        self.players[player_id].last_updated = end_time
+        if self.archive is not None:
+            self.archive.archive([battle])
+        return index
+
+    def add_turns(self, player_id: str, battle_id: str, turns: List[TurnEvent], timestamp: datetime.datetime) -> int:
+        index, battle = self.get_battle(player_id, battle_id)
+        battle.turns.extend(turn.dict(exclude_none=True) for turn in turns)
+        self.players[player_id].last_updated = timestamp
+        return index
+
+    def get_matchups(self, player_id: str) -> Dict[str, MatchupRecord]:
+        return self.players[player_id].matchup_records
+
+    def get_matchup(self, player_id: str, opponent_id: str) -> Optional[MatchupRecord]:
+        return self.players[player_id].matchup_records.get(opponent_id)
+
+    def put_matchup(self, player_id: str, matchup: MatchupRecord, timestamp: datetime.datetime) -> None:
+        player = self.players[player_id]
+        player.matchup_records[matchup.opponent_id] = matchup
+        player.last_updated = timestamp
+
+    def get_team_snapshots(self, player_id: str) -> Dict[str, List[Pokemon]]:
+        return self.players[player_id].team_snapshots
+
+    def get_team_snapshot(self, player_id: str, snapshot_id: str) -> Optional[List[Pokemon]]:
+        return self.players[player_id].team_snapshots.get(snapshot_id)
+
+    def put_team_snapshot(self, player_id: str, snapshot_id: str, team: List[Pokemon], timestamp: datetime.datetime) -> None:
+        player = self.players[player_id]
+        player.team_snapshots[snapshot_id] = team
+        player.last_updated = timestamp
+
+def create_repository(
+    backend: str = STORAGE_BACKEND,
+    path: str = SQLITE_PATH,
+    archive: Optional[BattleArchive] = None,
+    thought_retention: int = 0
+) -> PlayerRepository:
+    """Create the repository for a storage backend"""
+    if backend == "memory":
+        return InMemoryPlayerRepository(archive, thought_retention)
+    if backend == "sqlite":
+        from server.utils.sqlite_repository import SqlitePlayerRepository
+        return SqlitePlayerRepository(path)
+    raise ValueError(f"Unknown storage backend: {backend}. Must be memory or sqlite")
+
+# Shared repository used by the API
+repository = create_repository(archive=battle_archive if TIER_BATTLES else None, thought_retention=THOUGHT_RETENTION)
@@ -0,0 +1,62 @@
+from typing import List, Dict, Any, Optional, Set, Iterable
+
+from server.models.player import Player
+from server.utils.player_repository import PlayerRepository
+
+# Player fields that hold a history or a collection, which the
+# repository may leave unread when they are not asked for
+COLLECTION_FIELDS = ("thought_history", "battle_history", "matchup_records", "team_snapshots")
+
+# Computed fields: sizes of the histories, read without loading them
+COUNT_FIELDS = {
+    "thought_count": "count_thoughts",
+    "battle_count": "count_battles"
+}
+
+PLAYER_FIELDS = (*Player.model_fields, *COUNT_FIELDS)
+
+# What list endpoints return by default: everything but the collections
+PLAYER_SUMMARY = tuple(field for field in PLAYER_FIELDS if field not in COLLECTION_FIELDS)
+
+def parse_fields(
+    fields: Optional[str],
+    exclude: Optional[str],
+    default: Iterable[str],
+    known: Iterable[str] = PLAYER_FIELDS
+) -> List[str]:
+    """Get the fields to return from comma-separated ``fields`` and ``exclude``.
+
+    Without ``fields`` the ``default`` fields are returned; "*" asks for
+    every field. The ID is always returned. Raises ValueError for a name
+    that is not a field.
+    """
+    known = list(known)
+    if fields is None:
+        selected = list(default)
+    elif fields.strip() == "*":
+        selected = known
+    else:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+    excluded = {name.strip() for name in (exclude or "").split(",") if name.strip()}
+
+    unknown = [name for name in (*selected, *excluded) if name not in known]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return [name for name in known if name == "id" or (name in selected and name not in excluded)]
+
+def collections(fields: Iterable[str]) -> Set[str]:
+    """Get the collections a projection needs read"""
+    return {field for field in fields if field in COLLECTION_FIELDS}
+
+def project_player(player: Player, fields: List[str], repository: PlayerRepository) -> Dict[str, Any]:
+    """Dump the selected fields of a player.
+
+    Only the selected model fields are serialized, and lazily loaded
+    histories that are not selected stay unread. Counts come from the
+    repository.
+    """
+    data = player.model_dump(include={field for field in fields if field in Player.model_fields})
+    for field in fields:
+        if field in COUNT_FIELDS:
+            data[field] = getattr(repository, COUNT_FIELDS[field])(player.id)
+    return {field: data[field] for field in fields}
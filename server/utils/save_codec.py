@@ -0,0 +1,373 @@
+import os
+import gzip
+import struct
+import datetime
+from typing import List, Dict, Any, Iterator, Optional
+
+from server.utils.file_io import json_default, atomic_open, atomic_write_json, read_json, append_json_lines, iter_json_lines
+
+# Every compact stream (gzip member) starts with this marker once decompressed
+COMPACT_MAGIC = b"PST\x01"
+
+# gzip magic number, used to tell compact files from JSON ones
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Strings up to this length are interned and written once per stream;
+# longer ones (thought content, descriptions) rarely repeat
+INTERN_MAX_LENGTH = 48
+
+# Size of the encode buffer and of each read from the decompressed stream
+CHUNK_SIZE = 64 * 1024
+
+# Value tags
+TAG_NONE = 0x00
+TAG_FALSE = 0x01
+TAG_TRUE = 0x02
+TAG_INT = 0x03
+TAG_FLOAT = 0x04
+TAG_STR = 0x05
+TAG_STR_DEF = 0x06
+TAG_STR_REF = 0x07
+TAG_DATETIME = 0x08
+TAG_DATETIME_TZ = 0x09
+TAG_LIST = 0x0A
+TAG_DICT = 0x0B
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+_DOUBLE = struct.Struct("<d")
+
+class CompactEncoder:
+    """Streaming encoder for the compact save format.
+
+    Values are written as tagged binary: integers as zigzag varints,
+    datetimes as microseconds since the epoch, and dictionary keys and
+    short strings once per stream, then as small table references. Each
+    top-level value is length-prefixed and flushed to ``stream`` (normally
+    a gzip writer) as soon as the buffer fills, so only one record at a
+    time is ever held in memory in encoded form.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = bytearray(COMPACT_MAGIC)
+        self.strings: Dict[str, int] = {}
+
+    def encode(self, value: Any) -> None:
+        """Append one top-level value to the stream"""
+        encoded = bytearray()
+        self._encode(value, encoded)
+        _write_varint(self.buffer, len(encoded))
+        self.buffer += encoded
+        if len(self.buffer) >= CHUNK_SIZE:
+            self.flush()
+
+    def _string(self, value: str, buffer: bytearray) -> None:
+        index = self.strings.get(value)
+        if index is not None:
+            buffer.append(TAG_STR_REF)
+            _write_varint(buffer, index)
+            return
+
+        data = value.encode()
+        if len(value) <= INTERN_MAX_LENGTH:
+            self.strings[value] = len(self.strings)
+            buffer.append(TAG_STR_DEF)
+        else:
+            buffer.append(TAG_STR)
+        _write_varint(buffer, len(data))
+        buffer += data
+
+    def _encode(self, value: Any, buffer: bytearray) -> None:
+        kind = type(value)
+        if kind is str:
+            self._string(value, buffer)
+        elif kind is int:
+            buffer.append(TAG_INT)
+            _write_varint(buffer, value * 2 if value >= 0 else -value * 2 - 1)
+        elif kind is dict:
+            buffer.append(TAG_DICT)
+            _write_varint(buffer, len(value))
+            for key, item in value.items():
+                self._string(key if type(key) is str else str(key), buffer)
+                self._encode(item, buffer)
+        elif kind is list or kind is tuple:
+            buffer.append(TAG_LIST)
+            _write_varint(buffer, len(value))
+            for item in value:
+                self._encode(item, buffer)
+        elif value is None:
+            buffer.append(TAG_NONE)
+        elif value is True:
+            buffer.append(TAG_TRUE)
+        elif value is False:
+            buffer.append(TAG_FALSE)
+        elif isinstance(value, datetime.datetime):
+            offset = value.utcoffset()
+            if offset is None:
+                buffer.append(TAG_DATETIME)
+            else:
+                buffer.append(TAG_DATETIME_TZ)
+                minutes = offset // datetime.timedelta(minutes=1)
+                _write_varint(buffer, minutes * 2 if minutes >= 0 else -minutes * 2 - 1)
+                value = value.replace(tzinfo=None)
+            micros = (value - EPOCH) // datetime.timedelta(microseconds=1)
+            _write_varint(buffer, micros * 2 if micros >= 0 else -micros * 2 - 1)
+        elif isinstance(value, float):
+            buffer.append(TAG_FLOAT)
+            buffer += _DOUBLE.pack(value)
+        elif isinstance(value, int):
+            self._encode(int(value), buffer)
+        elif isinstance(value, (set, frozenset)):
+            self._encode(sorted(value), buffer)
+        else:
+            self._encode(json_default(value), buffer)
+
+    def flush(self) -> None:
+        """Write buffered bytes to the underlying stream"""
+        if self.buffer:
+            self.stream.write(self.buffer)
+            self.buffer = bytearray()
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def _read_varint(data: bytes, pos: int):
+    byte = data[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    result = byte & 0x7F
+    shift = 7
+    pos += 1
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+class CompactDecoder:
+    """Streaming decoder for the compact save format.
+
+    Reads the decompressed stream in chunks and decodes one length-prefixed
+    top-level value at a time. Consecutive compact streams (for example
+    gzip members appended to a record segment) are handled by resetting
+    the string table whenever a stream marker is seen between values.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.data = b""
+        self.pos = 0
+        self.strings: List[str] = []
+
+    def _fill(self, needed: int) -> bool:
+        if len(self.data) - self.pos >= needed:
+            return True
+        chunks = [self.data[self.pos:]]
+        available = len(chunks[0])
+        while available < needed:
+            chunk = self.stream.read(max(CHUNK_SIZE, needed - available))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            available += len(chunk)
+        self.data = b"".join(chunks)
+        self.pos = 0
+        return available >= needed
+
+    def _decode(self, data: bytes, pos: int):
+        tag = data[pos]
+        pos += 1
+        if tag == TAG_STR_REF:
+            index, pos = _read_varint(data, pos)
+            return self.strings[index], pos
+        if tag == TAG_INT:
+            value, pos = _read_varint(data, pos)
+            return (value >> 1) if not value & 1 else -((value + 1) >> 1), pos
+        if tag == TAG_DICT:
+            length, pos = _read_varint(data, pos)
+            result = {}
+            for _ in range(length):
+                key, pos = self._decode(data, pos)
+                result[key], pos = self._decode(data, pos)
+            return result, pos
+        if tag == TAG_STR_DEF or tag == TAG_STR:
+            length, pos = _read_varint(data, pos)
+            value = data[pos:pos + length].decode()
+            if tag == TAG_STR_DEF:
+                self.strings.append(value)
+            return value, pos + length
+        if tag == TAG_LIST:
+            length, pos = _read_varint(data, pos)
+            result = []
+            for _ in range(length):
+                item, pos = self._decode(data, pos)
+                result.append(item)
+            return result, pos
+        if tag == TAG_NONE:
+            return None, pos
+        if tag == TAG_TRUE:
+            return True, pos
+        if tag == TAG_FALSE:
+            return False, pos
+        if tag == TAG_DATETIME:
+            value, pos = _read_varint(data, pos)
+            micros = (value >> 1) if not value & 1 else -((value + 1) >> 1)
+            return EPOCH + datetime.timedelta(microseconds=micros), pos
+        if tag == TAG_DATETIME_TZ:
+            value, pos = _read_varint(data, pos)
+            minutes = (value >> 1) if not value & 1 else -((value + 1) >> 1)
+            value, pos = _read_varint(data, pos)
+            micros = (value >> 1) if not value & 1 else -((value + 1) >> 1)
+            value = EPOCH + datetime.timedelta(microseconds=micros)
+            return value.replace(tzinfo=datetime.timezone(datetime.timedelta(minutes=minutes))), pos
+        if tag == TAG_FLOAT:
+            return _DOUBLE.unpack_from(data, pos)[0], pos + 8
+        raise ValueError(f"Unknown tag {tag:#x} in compact stream")
+
+    def __iter__(self) -> Iterator[Any]:
+        magic_length = len(COMPACT_MAGIC)
+        while self._fill(1):
+            # A new stream starts with the magic marker and its own strings
+            if self._fill(magic_length) and self.data[self.pos:self.pos + magic_length] == COMPACT_MAGIC:
+                self.pos += magic_length
+                self.strings = []
+                continue
+
+            # Length prefix (at most 10 bytes), then the value itself
+            self._fill(10)
+            length, self.pos = _read_varint(self.data, self.pos)
+            if not self._fill(length):
+                raise EOFError("Unexpected end of compact stream")
+            value, end = self._decode(self.data, self.pos)
+            if end != self.pos + length:
+                raise ValueError("Corrupt compact stream: value length mismatch")
+            self.pos = end
+            yield value
+
+class _LimitedReader:
+    """File wrapper that stops reading after ``size`` bytes"""
+
+    def __init__(self, f, size: int):
+        self.f = f
+        self.remaining = size
+
+    def read(self, n: int = -1) -> bytes:
+        if n < 0 or n > self.remaining:
+            n = self.remaining
+        data = self.f.read(n)
+        self.remaining -= len(data)
+        return data
+
+class JsonCodec:
+    """Plain JSON segments (documents) and JSON lines (records)"""
+
+    name = "json"
+    document_extension = ".json"
+    records_extension = ".jsonl"
+
+    def dump_document(self, path: str, data: Any) -> None:
+        atomic_write_json(path, data)
+
+    def load_document(self, path: str) -> Any:
+        return read_json(path)
+
+    def append_records(self, path: str, records: List[Any], offset: int = 0) -> int:
+        return append_json_lines(path, records, offset)
+
+    def iter_records(self, path: str, size: int) -> Iterator[Any]:
+        return iter_json_lines(path, size)
+
+class CompactCodec:
+    """gzip-compressed, tagged binary segments.
+
+    Documents are a single compact stream. Record segments are a sequence
+    of gzip members, one per append, each holding its own compact stream,
+    so appending never rewrites earlier records.
+    """
+
+    name = "compact"
+    document_extension = ".bin"
+    records_extension = ".bin"
+
+    def __init__(self, compresslevel: int = 6):
+        self.compresslevel = compresslevel
+
+    def _write_values(self, f, values) -> None:
+        with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=self.compresslevel, mtime=0) as gz:
+            encoder = CompactEncoder(gz)
+            for value in values:
+                encoder.encode(value)
+            encoder.flush()
+
+    def dump_document(self, path: str, data: Any) -> None:
+        with atomic_open(path, "wb") as f:
+            self._write_values(f, [data])
+
+    def load_document(self, path: str) -> Any:
+        with gzip.open(path, "rb") as gz:
+            for value in CompactDecoder(gz):
+                return value
+        raise ValueError(f"Empty compact document {path}")
+
+    def append_records(self, path: str, records: List[Any], offset: int = 0) -> int:
+        if offset == 0:
+            # Rewrites replace the file, like JSON lines rewrites do
+            with atomic_open(path, "wb") as f:
+                if records:
+                    self._write_values(f, records)
+                size = f.tell()
+            return size
+
+        mode = "r+b" if os.path.exists(path) else "wb"
+        with open(path, mode) as f:
+            f.truncate(offset)
+            f.seek(offset)
+            if records:
+                self._write_values(f, records)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def iter_records(self, path: str, size: int) -> Iterator[Any]:
+        if not os.path.exists(path) or size == 0:
+            return
+        with open(path, "rb") as f:
+            with gzip.GzipFile(fileobj=_LimitedReader(f, size), mode="rb") as gz:
+                yield from CompactDecoder(gz)
+
+# Available on-disk formats for save segments
+CODECS = {
+    JsonCodec.name: JsonCodec(),
+    CompactCodec.name: CompactCodec(),
+}
+
+def get_codec(name: Optional[str]):
+    """Get a codec by name, defaulting to JSON"""
+    return CODECS[name or JsonCodec.name]
+
+def detect_codec(path: str):
+    """Pick the codec for an existing file from its leading bytes"""
+    with open(path, "rb") as f:
+        magic = f.read(len(GZIP_MAGIC))
+    return CODECS[CompactCodec.name] if magic == GZIP_MAGIC else CODECS[JsonCodec.name]
+
+def read_indexed_records(path: str, size: int) -> List[Any]:
+    """Fold a segment of ``[index, item]`` records into the list of items.
+
+    Later records for an index replace earlier ones, so the result holds
+    the latest version of every item.
+    """
+    items = []
+    records = detect_codec(path).iter_records(path, size) if size else []
+    for index, item in records:
+        if index == len(items):
+            items.append(item)
+        else:
+            items[index] = item
+    return items
@@ -0,0 +1,103 @@
+import os
+import threading
+from typing import List, Dict, Any, Optional, Callable
+
+from server.utils.file_io import atomic_write_json, read_json
+
+# Name of the manifest file kept alongside the saves
+MANIFEST_NAME = "index.manifest"
+
+class SaveIndex:
+    """Manifest of save metadata, so listing saves never opens the saves.
+
+    Each entry holds the metadata shown in save listings plus the mtime and
+    size of the file it was read from (the header for directory saves, the
+    whole file for legacy single-file saves). Listing only reads the
+    manifest and stats each save; entries that are missing or whose file
+    changed behind the manager's back are re-read through ``read_metadata``
+    and written back, so a deleted or stale manifest repairs itself. Saves
+    are written from several threads, so every read-modify-write of the
+    manifest holds ``lock``.
+    """
+
+    def __init__(self, save_dir: str, read_metadata: Callable[[str], Optional[Dict[str, Any]]], source_path: Callable[[str], Optional[str]]):
+        self.save_dir = save_dir
+        self.path = os.path.join(save_dir, MANIFEST_NAME)
+        self.read_metadata = read_metadata
+        self.source_path = source_path
+        self.lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            return read_json(self.path)
+        except Exception as e:
+            print(f"Error reading save index {self.path}, rebuilding: {e}")
+            return {}
+
+    def _stat(self, save_id: str) -> Optional[List[int]]:
+        path = self.source_path(save_id)
+        if path is None:
+            return None
+        st = os.stat(path)
+        return [st.st_mtime_ns, st.st_size]
+
+    def _entry(self, save_id: str) -> Optional[Dict[str, Any]]:
+        stat = self._stat(save_id)
+        metadata = self.read_metadata(save_id)
+        if stat is None or metadata is None:
+            return None
+        return {"stat": stat, "save": metadata}
+
+    def put(self, save_id: str) -> None:
+        """Refresh the entry for a save after it was written"""
+        entry = self._entry(save_id)
+        with self.lock:
+            entries = self._load()
+            if entry is None:
+                entries.pop(save_id, None)
+            else:
+                entries[save_id] = entry
+            atomic_write_json(self.path, entries)
+
+    def remove(self, save_id: str) -> None:
+        """Drop the entry for a deleted save"""
+        with self.lock:
+            entries = self._load()
+            if entries.pop(save_id, None) is not None:
+                atomic_write_json(self.path, entries)
+
+    def list(self, save_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get metadata for the given saves, repairing stale entries"""
+        with self.lock:
+            return self._list(save_ids)
+
+    def _list(self, save_ids: List[str]) -> List[Dict[str, Any]]:
+        entries = self._load()
+        changed = False
+
+        for save_id in set(entries) - set(save_ids):
+            del entries[save_id]
+            changed = True
+
+        for save_id in save_ids:
+            entry = entries.get(save_id)
+            try:
+                if entry is None or entry["stat"] != self._stat(save_id):
+                    entry = self._entry(save_id)
+                    changed = True
+            except Exception as e:
+                print(f"Error indexing save {save_id}: {e}")
+                entry = None
+
+            if entry is None:
+                entries.pop(save_id, None)
+            else:
+                entries[save_id] = entry
+
+        if changed:
+            atomic_write_json(self.path, entries)
+
+        return [entries[save_id]["save"] for save_id in save_ids if save_id in entries]
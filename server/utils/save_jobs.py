@@ -0,0 +1,107 @@
+import os
+import asyncio
+import datetime
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, Awaitable, List, Set
+
+from server.models.save import SaveJob
+
+# Threads doing save/load disk I/O and encoding
+SAVE_WORKERS = int(os.environ.get("PST_SAVE_WORKERS", "2"))
+
+# Jobs that may be pending or running at once before submissions are refused
+MAX_ACTIVE_JOBS = int(os.environ.get("PST_MAX_SAVE_JOBS", "8"))
+
+# Finished jobs kept around for polling
+JOB_HISTORY = 100
+
+class SaveJobManager:
+    """Runs save I/O off the event loop and tracks background save jobs.
+
+    ``run_io`` hands blocking work to a small thread pool so a large save
+    never stalls other requests. ``submit`` starts an operation as a job
+    and returns straight away; clients poll the job for its result. At most
+    ``max_active`` jobs are pending or running, and only the last
+    ``history`` finished jobs are kept.
+    """
+
+    def __init__(self, max_workers: int = SAVE_WORKERS, max_active: int = MAX_ACTIVE_JOBS, history: int = JOB_HISTORY):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="save-io")
+        self.max_active = max_active
+        self.history = history
+        self.jobs: "OrderedDict[str, SaveJob]" = OrderedDict()
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.active = 0
+        self.counter = 0
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def run_io(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking function in the I/O pool and wait for it"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args))
+
+    def lock(self, save_id: str) -> asyncio.Lock:
+        """Get the lock serializing operations on one save"""
+        if save_id not in self.locks:
+            self.locks[save_id] = asyncio.Lock()
+        return self.locks[save_id]
+
+    def submit(self, action: str, save_id: Optional[str], operation: Callable[[], Awaitable[Any]]) -> Optional[SaveJob]:
+        """Start an operation as a background job.
+
+        Returns None when too many jobs are already active.
+        """
+        if self.active >= self.max_active:
+            return None
+
+        self.counter += 1
+        job = SaveJob(id=f"job_{self.counter}", action=action, save_id=save_id)
+        self.jobs[job.id] = job
+        self.active += 1
+        self._trim()
+
+        self.background(self._run(job, operation))
+        return job
+
+    def background(self, operation: Awaitable[Any]) -> None:
+        """Run a coroutine in the background; shutdown waits for it"""
+        task = asyncio.create_task(operation)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: SaveJob, operation: Callable[[], Awaitable[Any]]) -> None:
+        job.status = "running"
+        job.started_at = datetime.datetime.now()
+        try:
+            job.result = await operation()
+            job.status = "completed"
+        except Exception as e:
+            job.error = getattr(e, "detail", None) or str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.datetime.now()
+            self.active -= 1
+
+    def _trim(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ("completed", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[SaveJob]:
+        """Get a job by ID"""
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[SaveJob]:
+        """Get all tracked jobs, newest first"""
+        return list(reversed(self.jobs.values()))
+
+    async def shutdown(self) -> None:
+        """Wait for running jobs and in-flight writes to finish"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+
+# Shared job manager used by the save API
+save_jobs = SaveJobManager()
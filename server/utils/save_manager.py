@@ -1,5 +1,8 @@
 import os
+import re
 import json
+import uuid
+import shutil
 import datetime
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
@@ -7,6 +10,13 @@ from pydantic import BaseModel
 from server.models.player import Player
 from server.models.pokemon import Pokemon
 from server.models.save import SaveFile, SaveFileCreate, SaveFileResponse, SaveFileList
+from server.utils.change_tracker import change_tracker, PLAYER_COLLECTIONS
+from server.utils.file_io import atomic_write_json, atomic_copy_prefix, read_json
+from server.utils.save_codec import get_codec, detect_codec, read_indexed_records
+from server.utils.lazy_player import LazyPlayer, pin_segment, hold_pins, release_pins
+from server.utils.battle_archive import ArchivedTurns
+from server.utils.save_index import SaveIndex
+from server.utils.backup_store import backup_store
 
 # Directory for save files
 SAVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "saves")
@@ -14,35 +24,437 @@ SAVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__
 # Ensure save directory exists
 os.makedirs(SAVE_DIR, exist_ok=True)
 
+# Save, backup and player IDs become file names, so only plain names are allowed
+ID_PATTERN = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]*")
+
+def is_valid_id(value: str) -> bool:
+    """Check that an ID is a plain name: no path separators, no "..", no leading dot"""
+    return bool(ID_PATTERN.fullmatch(value)) and ".." not in value
+
+# Small player documents, rewritten whenever they change
+DOCUMENT_SEGMENTS = {
+    "profile": "profile",
+    "team": "team",
+    "matchups": "matchups",
+    "snapshots": "team_snapshots"
+}
+
+# Player histories, stored as append-only logs of (index, item) records
+RECORD_SEGMENTS = {
+    "thoughts": ("thoughts", "thought_history"),
+    "battles": ("battles", "battle_history")
+}
+
 class SaveManager:
-    """Manager for save/load functionality"""
+    """Manager for save/load functionality
+    
+    Saves are stored as a directory per save::
+    
+        <save_id>/save.json                      header and player list
+        <save_id>/players/<player_id>/state.json segment bookkeeping
+        <save_id>/players/<player_id>/*.json     profile, team, matchups, team snapshots
+        <save_id>/players/<player_id>/*.jsonl    thought and battle history
+    
+    Segments are JSON by default. Saves created with ``format="compact"``
+    use the gzip-compressed binary codec from ``save_codec`` instead (with
+    ``.bin`` segments); the codec of each file is detected when it is read.
+    
+    ``update_save`` consults the change tracker and only rewrites the
+    documents that changed, and only appends the history records that were
+    added or modified, so its cost scales with the changes since the last
+    save. Single-file ``<save_id>.json`` saves from older versions can
+    still be read, and are converted to the directory layout on update.
+    
+    Writing is split so the API can keep disk I/O off the event loop:
+    ``read_save_state`` and ``write_save`` only touch the disk, while
+    ``plan_save`` snapshots the players and must run where they are
+    mutated. ``create_save`` and ``update_save`` run all three in turn.
+    """
+    
+    @staticmethod
+    def _check_id(value: str) -> None:
+        # Last line of defence; the API rejects bad IDs with a 400 first
+        if not is_valid_id(value):
+            raise ValueError(f"Invalid ID: {value!r}")
     
     @staticmethod
     def get_save_path(save_id: str) -> str:
-        """Get the file path for a save file"""
+        """Get the file path for a legacy single-file save"""
+        SaveManager._check_id(save_id)
         return os.path.join(SAVE_DIR, f"{save_id}.json")
     
     @staticmethod
-    def create_save(save_data: SaveFileCreate, players: List[Player]) -> SaveFile:
-        """Create a new save file"""
+    def get_save_dir(save_id: str) -> str:
+        """Get the directory for a save"""
+        SaveManager._check_id(save_id)
+        return os.path.join(SAVE_DIR, save_id)
+    
+    @staticmethod
+    def get_header_path(save_id: str) -> str:
+        """Get the path of a save's header document"""
+        return os.path.join(SaveManager.get_save_dir(save_id), "save.json")
+    
+    @staticmethod
+    def get_player_dir(save_id: str, player_id: str) -> str:
+        """Get the segment directory for one player in a save"""
+        SaveManager._check_id(player_id)
+        return os.path.join(SaveManager.get_save_dir(save_id), "players", player_id)
+    
+    @staticmethod
+    def _parse_datetime(value: Any) -> datetime.datetime:
+        # Compact saves decode datetimes natively, JSON ones store strings
+        if isinstance(value, datetime.datetime):
+            return value
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    
+    @staticmethod
+    def _parse_header(header: Dict[str, Any]) -> Dict[str, Any]:
+        # Convert string dates to datetime objects
+        header["created_at"] = SaveManager._parse_datetime(header["created_at"])
+        header["last_updated"] = SaveManager._parse_datetime(header["last_updated"])
+        return header
+    
+    @staticmethod
+    def _dump_document(player: Player, collection: str) -> Any:
+        if collection == "team":
+            return [pokemon.dict() for pokemon in player.team]
+        if collection == "matchups":
+            return {k: v.dict() for k, v in player.matchup_records.items()}
+        if collection == "snapshots":
+            return {k: [pokemon.dict() for pokemon in team] for k, team in player.team_snapshots.items()}
+        return player.dict(exclude={"team", "thought_history", "battle_history", "matchup_records", "team_snapshots"})
+    
+    @staticmethod
+    def _plan_player(player: Player, state: Dict[str, Any], codec) -> Optional[Dict[str, Any]]:
+        """Work out which segments of one player changed since it was last saved
+        
+        This runs where players are mutated (the event loop), so it only
+        dumps the small documents and takes references to history items;
+        the items are serialized later by ``_write_player``. Thoughts never
+        change once appended, and a battle edited after planning is stamped
+        with a newer version, so the next save picks it up again.
+        """
+        # Versions are only comparable within one tracker session
+        if state.get("session") != change_tracker.session or state.get("format", "json") != codec.name:
+            state = {"versions": {}, "records": {}}
+        versions = state["versions"]
+        
+        # Nothing to do for players that did not change since they were saved
+        if versions and not any(change_tracker.changed_since(player.id, c, versions.get(c, 0)) for c in PLAYER_COLLECTIONS):
+            return None
+        
+        plan = {
+            "session": change_tracker.session,
+            "versions": {c: change_tracker.version(player.id, c) for c in PLAYER_COLLECTIONS},
+            "documents": {},
+            "records": {}
+        }
+        
+        for collection in DOCUMENT_SEGMENTS:
+            if collection not in versions or change_tracker.changed_since(player.id, collection, versions[collection]):
+                plan["documents"][collection] = SaveManager._dump_document(player, collection)
+        
+        for collection, (name, field) in RECORD_SEGMENTS.items():
+            segment = state["records"].get(collection)
+            
+            # Histories of a lazily loaded player that were never touched
+            # cannot have changed: keep or copy their segment unread
+            pending = player.pending_segment(field) if isinstance(player, LazyPlayer) else None
+            if pending is not None and pending["format"] == codec.name:
+                if collection in versions and segment:
+                    plan["records"][collection] = {"segment": segment}
+                else:
+                    plan["records"][collection] = {"copy": pending}
+                continue
+            
+            items = getattr(player, field)
+            count = len(items)
+            
+            updated = None
+            if collection in versions and segment and segment["count"] <= count:
+                # None if the tracker forgot some of the updates since the last save
+                updated = change_tracker.updated_indices(player.id, collection, versions[collection])
+            
+            if updated is not None:
+                # Append items modified in place, then new items, in index order
+                indices = sorted(i for i in updated if i < segment["count"]) + list(range(segment["count"], count))
+                lines = segment["lines"] + len(indices)
+                
+                if not indices:
+                    plan["records"][collection] = {"segment": segment}
+                    continue
+                if lines <= 2 * count + 16:
+                    plan["records"][collection] = {
+                        "items": [(i, items[i]) for i in indices],
+                        "offset": segment["size"],
+                        "count": count,
+                        "lines": lines
+                    }
+                    continue
+            
+            # No usable segment, or too many superseded records: rewrite it
+            plan["records"][collection] = {
+                "items": list(enumerate(items[:count])),
+                "offset": 0,
+                "count": count,
+                "lines": count
+            }
+        
+        return plan
+    
+    @staticmethod
+    def _write_player(player_dir: str, plan: Dict[str, Any], codec) -> None:
+        """Write the segments of one player described by a plan"""
+        os.makedirs(player_dir, exist_ok=True)
+        
+        for collection, data in plan["documents"].items():
+            codec.dump_document(os.path.join(player_dir, DOCUMENT_SEGMENTS[collection] + codec.document_extension), data)
+        
+        records = {}
+        for collection, entry in plan["records"].items():
+            if "segment" in entry:
+                records[collection] = entry["segment"]
+                continue
+            
+            path = os.path.join(player_dir, RECORD_SEGMENTS[collection][0] + codec.records_extension)
+            if "copy" in entry:
+                source = entry["copy"]
+                atomic_copy_prefix(source["path"], path, source["size"])
+                records[collection] = {"count": source["count"], "lines": source["lines"], "size": source["size"]}
+                continue
+            
+            size = codec.append_records(path, [[i, item.dict()] for i, item in entry["items"]], entry["offset"])
+            records[collection] = {"count": entry["count"], "lines": entry["lines"], "size": size}
+        
+        # The state file is written last, so a crash mid-update leaves the
+        # previous state pointing at a consistent prefix of each segment
+        atomic_write_json(os.path.join(player_dir, "state.json"), {
+            "session": plan["session"],
+            "format": codec.name,
+            "versions": plan["versions"],
+            "records": records
+        })
+    
+    @staticmethod
+    def _read_documents(player_dir: str, codec) -> Dict[str, Any]:
+        """Read the small documents of a player (everything but its histories)"""
+        def load_document(collection: str) -> Any:
+            path = os.path.join(player_dir, DOCUMENT_SEGMENTS[collection] + codec.document_extension)
+            return detect_codec(path).load_document(path)
+        
+        player_data = load_document("profile")
+        player_data["team"] = load_document("team")
+        player_data["matchup_records"] = load_document("matchups")
+        
+        # Saves written before team snapshots have no snapshot document
+        if os.path.exists(os.path.join(player_dir, DOCUMENT_SEGMENTS["snapshots"] + codec.document_extension)):
+            player_data["team_snapshots"] = load_document("snapshots")
+        return player_data
+    
+    @staticmethod
+    def _read_player(player_dir: str) -> Dict[str, Any]:
+        """Assemble a player dictionary from its segments"""
+        state = read_json(os.path.join(player_dir, "state.json"))
+        codec = get_codec(state.get("format"))
+        player_data = SaveManager._read_documents(player_dir, codec)
+        
+        for collection, (name, field) in RECORD_SEGMENTS.items():
+            path = os.path.join(player_dir, name + codec.records_extension)
+            player_data[field] = read_indexed_records(path, state["records"][collection]["size"])
+        
+        return player_data
+    
+    @staticmethod
+    def _read_lazy_player(player_dir: str, pin_dir: str) -> LazyPlayer:
+        """Build a player whose histories are only read when first accessed"""
+        state = read_json(os.path.join(player_dir, "state.json"))
+        codec = get_codec(state.get("format"))
+        player_data = SaveManager._read_documents(player_dir, codec)
+        
+        segments = {}
+        for collection, (name, field) in RECORD_SEGMENTS.items():
+            record = state["records"][collection]
+            if not record["size"]:
+                player_data[field] = []
+                continue
+            
+            segments[field] = pin_segment(
+                os.path.join(player_dir, name + codec.records_extension),
+                os.path.join(pin_dir, name + codec.records_extension),
+                record["size"],
+                format=codec.name,
+                count=record["count"],
+                lines=record["lines"]
+            )
+        
+        return LazyPlayer.from_segments(player_data, segments)
+    
+    @staticmethod
+    def new_save_id(now: datetime.datetime) -> str:
+        """Generate an ID for a new save"""
+        # Sortable by creation time; the random suffix keeps saves created
+        # in the same second apart
+        return f"save_{now.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    
+    @staticmethod
+    def new_save_state(save_data: SaveFileCreate) -> Dict[str, Any]:
+        """Build the state of a save that does not exist yet, ready for ``plan_save``"""
         # Generate save ID
-        save_id = f"save_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
-        
-        # Create save file object
-        save_file = SaveFile(
-            id=save_id,
-            name=save_data.name,
-            game_version=save_data.game_version,
-            created_at=datetime.datetime.now(),
-            last_updated=datetime.datetime.now(),
-            players=[player.dict() for player in players]
-        )
+        save_id = SaveManager.new_save_id(datetime.datetime.now())
+        
+        header = {
+            "id": save_id,
+            "name": save_data.name,
+            "game_version": save_data.game_version,
+            "format": save_data.format,
+            "created_at": datetime.datetime.now(),
+            "last_updated": datetime.datetime.now(),
+            "players": []
+        }
+        return {"header": header, "states": {}, "legacy_path": None}
+    
+    @staticmethod
+    def read_save_state(save_id: str) -> Optional[Dict[str, Any]]:
+        """Read a save's header and segment bookkeeping, ready for ``plan_save``
+        
+        This only does disk I/O, so it can run off the event loop.
+        """
+        legacy_path = SaveManager.get_save_path(save_id)
+        
+        if os.path.isdir(SaveManager.get_save_dir(save_id)):
+            header = SaveManager._parse_header(read_json(SaveManager.get_header_path(save_id)))
+        elif os.path.exists(legacy_path):
+            # Convert a single-file save to the directory layout
+            header = SaveManager._parse_header(read_json(legacy_path))
+            header.pop("data", None)
+            header["players"] = []
+        else:
+            return None
+        
+        states = {}
+        for player_id in header["players"]:
+            state_path = os.path.join(SaveManager.get_player_dir(save_id, player_id), "state.json")
+            if os.path.exists(state_path):
+                states[player_id] = read_json(state_path)
         
-        # Save to file
-        with open(SaveManager.get_save_path(save_id), "w") as f:
-            json.dump(save_file.dict(), f, default=str, indent=2)
+        return {
+            "header": header,
+            "states": states,
+            "legacy_path": legacy_path if os.path.exists(legacy_path) else None
+        }
+    
+    @staticmethod
+    def plan_save(save_state: Dict[str, Any], players: List[Player]) -> Dict[str, Any]:
+        """Snapshot what needs writing for the given players
+        
+        Must run where players are mutated; the cost is proportional to
+        what changed since the save was last written.
+        """
+        header = dict(save_state["header"])
+        codec = get_codec(header.get("format"))
+        
+        plans = {}
+        for player in players:
+            plan = SaveManager._plan_player(player, save_state["states"].get(player.id, {}), codec)
+            if plan is not None:
+                plans[player.id] = plan
+        
+        removed = set(header.get("players", [])) - {player.id for player in players}
+        header["players"] = [player.id for player in players]
+        
+        # Keep the pinned segments the plan copies, and the archives that
+        # battles it writes read their turns from, until it is written
+        pins = []
+        for plan in plans.values():
+            for entry in plan["records"].values():
+                if "copy" in entry:
+                    pins.append(entry["copy"]["path"])
+                for _, item in entry.get("items", []):
+                    if isinstance(getattr(item, "turns", None), ArchivedTurns):
+                        pins.append(item.turns.path)
+        hold_pins(pins)
+        
+        return {
+            "header": header,
+            "players": plans,
+            "removed": removed,
+            "legacy_path": save_state["legacy_path"],
+            "pins": pins
+        }
+    
+    @staticmethod
+    def write_save(save_plan: Dict[str, Any]) -> SaveFileResponse:
+        """Write changed player segments and then the save header
         
-        return save_file
+        This only does encoding and disk I/O, so it can run off the event loop.
+        """
+        header = save_plan["header"]
+        save_id = header["id"]
+        codec = get_codec(header.get("format"))
+        
+        os.makedirs(SaveManager.get_save_dir(save_id), exist_ok=True)
+        try:
+            for player_id, plan in save_plan["players"].items():
+                SaveManager._write_player(SaveManager.get_player_dir(save_id, player_id), plan, codec)
+        finally:
+            release_pins(save_plan["pins"])
+        
+        # Drop segments of players that no longer exist
+        for player_id in save_plan["removed"]:
+            shutil.rmtree(SaveManager.get_player_dir(save_id, player_id), ignore_errors=True)
+        
+        atomic_write_json(SaveManager.get_header_path(save_id), header)
+        
+        if save_plan["legacy_path"]:
+            os.remove(save_plan["legacy_path"])
+        save_index.put(save_id)
+        
+        return SaveManager._to_response(header)
+    
+    @staticmethod
+    def _to_response(header: Dict[str, Any]) -> SaveFileResponse:
+        return SaveFileResponse(
+            id=header["id"],
+            name=header["name"],
+            game_version=header["game_version"],
+            format=header.get("format", "json"),
+            created_at=header["created_at"],
+            last_updated=header["last_updated"]
+        )
+    
+    @staticmethod
+    def _source_path(save_id: str) -> Optional[str]:
+        """Get the file a save's metadata is read from"""
+        if os.path.exists(SaveManager.get_header_path(save_id)):
+            return SaveManager.get_header_path(save_id)
+        if os.path.exists(SaveManager.get_save_path(save_id)):
+            return SaveManager.get_save_path(save_id)
+        return None
+    
+    @staticmethod
+    def _read_metadata(save_id: str) -> Optional[Dict[str, Any]]:
+        """Read the listing metadata of a save from disk"""
+        path = SaveManager._source_path(save_id)
+        if path is None:
+            return None
+        
+        try:
+            # Legacy single-file saves have to be parsed whole, but only
+            # when they are first indexed or changed on disk
+            save_data = read_json(path)
+            metadata = {key: save_data[key] for key in ("id", "name", "game_version", "created_at", "last_updated")}
+            metadata["format"] = save_data.get("format", "json")
+            return metadata
+        except Exception as e:
+            print(f"Error loading save file {save_id}: {e}")
+            return None
+    
+    @staticmethod
+    def create_save(save_data: SaveFileCreate, players: List[Player]) -> SaveFileResponse:
+        """Create a new save file"""
+        # Save to disk
+        save_plan = SaveManager.plan_save(SaveManager.new_save_state(save_data), players)
+        return SaveManager.write_save(save_plan)
     
     @staticmethod
     def get_all_saves() -> List[SaveFileResponse]:
@@ -53,25 +465,18 @@ class SaveManager:
         if not os.path.exists(SAVE_DIR):
             return saves
         
-        # List all save files
+        # List all save files; only their metadata is read, from the index
+        save_ids = []
         for filename in os.listdir(SAVE_DIR):
-            if filename.endswith(".json"):
-                try:
-                    with open(os.path.join(SAVE_DIR, filename), "r") as f:
-                        save_data = json.load(f)
-                        # Convert string dates to datetime objects
-                        save_data["created_at"] = datetime.datetime.fromisoformat(save_data["created_at"].replace("Z", "+00:00"))
-                        save_data["last_updated"] = datetime.datetime.fromisoformat(save_data["last_updated"].replace("Z", "+00:00"))
-                        save_file = SaveFile(**save_data)
-                        saves.append(SaveFileResponse(
-                            id=save_file.id,
-                            name=save_file.name,
-                            game_version=save_file.game_version,
-                            created_at=save_file.created_at,
-                            last_updated=save_file.last_updated
-                        ))
-                except Exception as e:
-                    print(f"Error loading save file {filename}: {e}")
+            if filename.endswith(".tmp"):
+                continue
+            if os.path.isdir(os.path.join(SAVE_DIR, filename)):
+                save_ids.append(filename)
+            elif filename.endswith(".json"):
+                save_ids.append(filename[:-len(".json")])
+        
+        for metadata in save_index.list(save_ids):
+            saves.append(SaveFileResponse(**metadata))
         
         # Sort by last updated (newest first)
         saves.sort(key=lambda x: x.last_updated, reverse=True)
@@ -81,6 +486,18 @@ class SaveManager:
     @staticmethod
     def get_save(save_id: str) -> Optional[SaveFile]:
         """Get a specific save file"""
+        if os.path.isdir(SaveManager.get_save_dir(save_id)):
+            try:
+                save_data = SaveManager._parse_header(read_json(SaveManager.get_header_path(save_id)))
+                save_data["players"] = [
+                    SaveManager._read_player(SaveManager.get_player_dir(save_id, player_id))
+                    for player_id in save_data["players"]
+                ]
+                return SaveFile(**save_data)
+            except Exception as e:
+                print(f"Error loading save {save_id}: {e}")
+                return None
+        
         save_path = SaveManager.get_save_path(save_id)
         
         if not os.path.exists(save_path):
@@ -100,6 +517,15 @@ class SaveManager:
     @staticmethod
     def delete_save(save_id: str) -> bool:
         """Delete a save file"""
+        if os.path.isdir(SaveManager.get_save_dir(save_id)):
+            try:
+                shutil.rmtree(SaveManager.get_save_dir(save_id))
+                save_index.remove(save_id)
+                return True
+            except Exception as e:
+                print(f"Error deleting save {save_id}: {e}")
+                return False
+        
         save_path = SaveManager.get_save_path(save_id)
         
         if not os.path.exists(save_path):
@@ -107,6 +533,7 @@ class SaveManager:
         
         try:
             os.remove(save_path)
+            save_index.remove(save_id)
             return True
         except Exception as e:
             print(f"Error deleting save file {save_id}: {e}")
@@ -153,10 +580,11 @@ class SaveManager:
                     thought_history=player_data["thought_history"],
                     battle_history=player_data["battle_history"],
                     matchup_records=player_data["matchup_records"],
+                    team_snapshots=player_data.get("team_snapshots", {}),
                     items=player_data["items"],
                     badges=set(player_data["badges"]),
-                    created_at=datetime.datetime.fromisoformat(player_data["created_at"].replace("Z", "+00:00")),
-                    last_updated=datetime.datetime.fromisoformat(player_data["last_updated"].replace("Z", "+00:00"))
+                    created_at=SaveManager._parse_datetime(player_data["created_at"]),
+                    last_updated=SaveManager._parse_datetime(player_data["last_updated"])
                 )
                 
                 players.append(player)
@@ -167,45 +595,142 @@ class SaveManager:
             return None
     
     @staticmethod
-    def update_save(save_id: str, players: List[Player]) -> Optional[SaveFile]:
-        """Update an existing save file with new player data"""
-        save_file = SaveManager.get_save(save_id)
+    def load_save_lazy(save_id: str, pin_dir: str) -> Optional[List[Player]]:
+        """Load players from a save, deferring their histories
         
-        if not save_file:
+        Only the small documents of each player are read; thought and
+        battle history are pinned under ``pin_dir`` and read the first time
+        they are accessed. Legacy single-file saves are loaded eagerly.
+        """
+        if not os.path.isdir(SaveManager.get_save_dir(save_id)):
+            return SaveManager.load_save(save_id)
+        
+        try:
+            header = read_json(SaveManager.get_header_path(save_id))
+            return [
+                SaveManager._read_lazy_player(SaveManager.get_player_dir(save_id, player_id), os.path.join(pin_dir, player_id))
+                for player_id in header["players"]
+            ]
+        except Exception as e:
+            print(f"Error loading players from save {save_id}: {e}")
             return None
+    
+    @staticmethod
+    def adopt_save(save_id: str, session: str) -> None:
+        """Mark the segments of a just loaded save as up to date
+        
+        Loading a save replaces every player and starts a new tracker
+        ``session`` in which nothing changed yet, so the players are still
+        exactly what the save holds and later updates of it can append.
+        """
+        if not os.path.isdir(SaveManager.get_save_dir(save_id)):
+            return
         
         try:
-            # Update player data and last_updated timestamp
-            save_file.players = [player.dict() for player in players]
-            save_file.last_updated = datetime.datetime.now()
-            
-            # Save to file
-            with open(SaveManager.get_save_path(save_id), "w") as f:
-                json.dump(save_file.dict(), f, default=str, indent=2)
+            header = read_json(SaveManager.get_header_path(save_id))
+            for player_id in header["players"]:
+                state_path = os.path.join(SaveManager.get_player_dir(save_id, player_id), "state.json")
+                if not os.path.exists(state_path):
+                    continue
+                state = read_json(state_path)
+                state["session"] = session
+                state["versions"] = {c: 0 for c in PLAYER_COLLECTIONS}
+                atomic_write_json(state_path, state)
+        except Exception as e:
+            # The next update of the save rewrites it in full instead
+            print(f"Error adopting save {save_id}: {e}")
+    
+    @staticmethod
+    def update_save(save_id: str, players: List[Player]) -> Optional[SaveFileResponse]:
+        """Update an existing save file with new player data"""
+        try:
+            save_state = SaveManager.read_save_state(save_id)
+            if save_state is None:
+                return None
             
-            return save_file
+            # Update player data and last_updated timestamp
+            save_state["header"]["last_updated"] = datetime.datetime.now()
+            return SaveManager.write_save(SaveManager.plan_save(save_state, players))
         except Exception as e:
             print(f"Error updating save file {save_id}: {e}")
             return None
     
     @staticmethod
     def create_backup(save_id: str) -> Optional[str]:
-        """Create a backup of a save file"""
-        save_path = SaveManager.get_save_path(save_id)
+        """Create a backup of a save file
         
-        if not os.path.exists(save_path):
+        Backups go to the content-addressed backup store, so only the
+        parts of the save that changed since its last backup are written.
+        """
+        if os.path.isdir(SaveManager.get_save_dir(save_id)):
+            source = SaveManager.get_save_dir(save_id)
+        elif os.path.exists(SaveManager.get_save_path(save_id)):
+            source = SaveManager.get_save_path(save_id)
+        else:
             return None
         
         try:
-            # Generate backup filename with timestamp
+            # Generate backup ID with timestamp
             backup_id = f"{save_id}_backup_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
-            backup_path = SaveManager.get_save_path(backup_id)
-            
-            # Copy save file to backup
-            with open(save_path, "r") as src, open(backup_path, "w") as dst:
-                dst.write(src.read())
+            if backup_store.exists(backup_id):
+                backup_id = f"{backup_id}_{datetime.datetime.now().strftime('%f')}"
             
+            backup_store.create(backup_id, save_id, source)
             return backup_id
         except Exception as e:
-            print(f"Error creating backup of save file {save_id}: {e}")
+            print(f"Error creating backup of save {save_id}: {e}")
             return None
+    
+    @staticmethod
+    def restore_backup(backup_id: str, save_id: Optional[str] = None) -> Optional[SaveFileResponse]:
+        """Restore a backup as a save
+        
+        The backup is restored as ``save_id``, replacing that save if it
+        exists, or as a new save with the backup's ID.
+        """
+        manifest = backup_store.get(backup_id)
+        if manifest is None:
+            return None
+        
+        target_id = save_id or backup_id
+        save_dir = SaveManager.get_save_dir(target_id)
+        save_path = SaveManager.get_save_path(target_id)
+        
+        try:
+            if manifest["kind"] == "dir":
+                # Restore next to the save and swap it in with renames
+                tmp_dir = f"{save_dir}.restore.tmp"
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                backup_store.restore(backup_id, tmp_dir)
+                
+                header = read_json(os.path.join(tmp_dir, "save.json"))
+                header["id"] = target_id
+                atomic_write_json(os.path.join(tmp_dir, "save.json"), header)
+                
+                old_dir = f"{save_dir}.old.tmp"
+                if os.path.isdir(save_dir):
+                    shutil.rmtree(old_dir, ignore_errors=True)
+                    os.rename(save_dir, old_dir)
+                os.rename(tmp_dir, save_dir)
+                shutil.rmtree(old_dir, ignore_errors=True)
+                if os.path.exists(save_path):
+                    os.remove(save_path)
+            else:
+                tmp_path = f"{save_path}.restore.tmp"
+                backup_store.restore(backup_id, tmp_path)
+                
+                save_data = read_json(tmp_path)
+                save_data["id"] = target_id
+                atomic_write_json(save_path, save_data)
+                os.remove(tmp_path)
+                if os.path.isdir(save_dir):
+                    shutil.rmtree(save_dir)
+            
+            save_index.put(target_id)
+            return SaveFileResponse(**SaveManager._read_metadata(target_id))
+        except Exception as e:
+            print(f"Error restoring backup {backup_id}: {e}")
+            return None
+
+# Manifest of save metadata used for listings
+save_index = SaveIndex(SAVE_DIR, SaveManager._read_metadata, SaveManager._source_path)
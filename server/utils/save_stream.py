@@ -0,0 +1,330 @@
+import os
+import json
+import shutil
+import datetime
+from array import array
+from typing import List, Dict, Any, Optional, Iterator, Iterable
+
+from server.models.player import Player, Thought, Battle
+from server.utils.file_io import json_default, atomic_write_json, read_json
+from server.utils.save_codec import get_codec, detect_codec, CODECS
+from server.utils.lazy_player import pin_segment
+from server.utils.save_manager import SaveManager, DOCUMENT_SEGMENTS, RECORD_SEGMENTS, save_index, is_valid_id
+
+# Buffered history records per segment before they are appended to disk
+IMPORT_BATCH = 1000
+
+# Item models of the record lines, keyed by line type
+RECORD_TYPES = {
+    "thought": ("thoughts", Thought),
+    "battle": ("battles", Battle)
+}
+
+class StreamFormatError(ValueError):
+    """An import line that is malformed or out of order"""
+
+# Export
+#
+# An export is a stream of JSON lines: one "save" line with the header,
+# then for each player a "player" line (profile, team and matchup
+# records) followed by its "thought" and "battle" lines in history order.
+# Each battle line is followed by one "turn" line per turn. Only one
+# battle is ever held in memory on either side.
+def snapshot_save(save_id: str, pin_dir: str) -> Optional[Dict[str, Any]]:
+    """Pin the files of a save so it can be exported while it changes.
+
+    Every segment is hard-linked under ``pin_dir`` (see ``pin_segment``),
+    so later saves or a delete cannot change what the export reads.
+    Must run under the save's lock.
+    """
+    save_dir = SaveManager.get_save_dir(save_id)
+    if not os.path.isdir(save_dir):
+        legacy_path = SaveManager.get_save_path(save_id)
+        if not os.path.exists(legacy_path):
+            return None
+        pinned = pin_segment(legacy_path, os.path.join(pin_dir, os.path.basename(legacy_path)), os.path.getsize(legacy_path))
+        return {"legacy_path": pinned["path"]}
+
+    header = SaveManager._parse_header(read_json(SaveManager.get_header_path(save_id)))
+    players = []
+    for player_id in header["players"]:
+        player_dir = SaveManager.get_player_dir(save_id, player_id)
+        state = read_json(os.path.join(player_dir, "state.json"))
+        codec = get_codec(state.get("format"))
+        player_pins = os.path.join(pin_dir, player_id)
+
+        documents = {}
+        for collection, name in DOCUMENT_SEGMENTS.items():
+            path = os.path.join(player_dir, name + codec.document_extension)
+            if not os.path.exists(path):
+                continue
+            documents[collection] = pin_segment(path, os.path.join(player_pins, name + codec.document_extension), os.path.getsize(path))["path"]
+
+        records = {}
+        for collection, (name, field) in RECORD_SEGMENTS.items():
+            record = state["records"][collection]
+            path = os.path.join(player_dir, name + codec.records_extension)
+            if record["size"]:
+                records[collection] = pin_segment(path, os.path.join(player_pins, name + codec.records_extension), record["size"], count=record["count"], lines=record["lines"])
+            else:
+                records[collection] = {"path": path, "size": 0, "count": 0, "lines": 0}
+
+        players.append({"documents": documents, "records": records})
+
+    header["players"] = len(players)
+    return {"header": header, "players": players}
+
+def _iter_items(segment: Dict[str, Any]) -> Iterator[Any]:
+    """Iterate over the latest version of each item in a record segment, in order.
+
+    Segments that were only ever appended to hold every index once, in
+    order. Otherwise a first pass finds the last record of each index (a
+    few bytes per item), and items whose final record comes before that
+    of an earlier index wait in a small buffer.
+    """
+    if not segment["size"]:
+        return
+    codec = detect_codec(segment["path"])
+
+    if segment["lines"] == segment["count"]:
+        for index, item in codec.iter_records(segment["path"], segment["size"]):
+            yield item
+        return
+
+    last = array("q", [-1]) * segment["count"]
+    for position, (index, _) in enumerate(codec.iter_records(segment["path"], segment["size"])):
+        last[index] = position
+
+    waiting = {}
+    next_index = 0
+    for position, (index, item) in enumerate(codec.iter_records(segment["path"], segment["size"])):
+        if last[index] != position:
+            continue
+        waiting[index] = item
+        while next_index in waiting:
+            yield waiting.pop(next_index)
+            next_index += 1
+
+def _battle_lines(player_id: str, battle: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    turns = battle.pop("turns", [])
+    yield {"type": "battle", "player_id": player_id, "data": battle}
+    for turn in turns:
+        yield {"type": "turn", "player_id": player_id, "battle_id": battle["id"], "data": turn}
+
+def _player_lines(player: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    thoughts = player.pop("thought_history", [])
+    battles = player.pop("battle_history", [])
+    yield {"type": "player", "data": player}
+    for thought in thoughts:
+        yield {"type": "thought", "player_id": player["id"], "data": thought}
+    for battle in battles:
+        yield from _battle_lines(player["id"], battle)
+
+def iter_export(snapshot: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Iterate over the export lines of a pinned save"""
+    if "legacy_path" in snapshot:
+        # Single-file saves are one JSON document and are read whole
+        save_data = read_json(snapshot["legacy_path"])
+        players = save_data.pop("players", [])
+        save_data.pop("data", None)
+        yield {"type": "save", "data": {**save_data, "players": len(players)}}
+        for player in players:
+            yield from _player_lines(player)
+        return
+
+    yield {"type": "save", "data": snapshot["header"]}
+    for player in snapshot["players"]:
+        documents = player["documents"]
+        player_data = detect_codec(documents["profile"]).load_document(documents["profile"])
+        player_data["team"] = detect_codec(documents["team"]).load_document(documents["team"])
+        player_data["matchup_records"] = detect_codec(documents["matchups"]).load_document(documents["matchups"])
+        if "snapshots" in documents:
+            player_data["team_snapshots"] = detect_codec(documents["snapshots"]).load_document(documents["snapshots"])
+        yield {"type": "player", "data": player_data}
+
+        for thought in _iter_items(player["records"]["thoughts"]):
+            yield {"type": "thought", "player_id": player_data["id"], "data": thought}
+        for battle in _iter_items(player["records"]["battles"]):
+            yield from _battle_lines(player_data["id"], battle)
+
+def encode_lines(lines: Iterable[Dict[str, Any]], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Encode export lines as NDJSON, in chunks of about ``chunk_size`` bytes"""
+    buffer = bytearray()
+    for line in lines:
+        buffer += json.dumps(line, default=json_default).encode()
+        buffer += b"\n"
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+# Import
+class SaveImporter:
+    """Writes an export stream into a new save, a batch of lines at a time.
+
+    The save is written to a temporary directory, with history records
+    appended to their segments every ``IMPORT_BATCH`` items, and renamed
+    into place by ``finish``. Memory is bounded by one batch plus the
+    battle whose turns are being read.
+    """
+
+    def __init__(self, name: Optional[str] = None, save_format: Optional[str] = None):
+        self.name = name
+        self.format = save_format
+        self.header: Optional[Dict[str, Any]] = None
+        self.codec = None
+        self.tmp_dir: Optional[str] = None
+        self.player_ids: List[str] = []
+        self.player_id: Optional[str] = None
+        self.segments: Dict[str, Dict[str, Any]] = {}
+        self.buffers: Dict[str, List[Any]] = {}
+        self.battle: Optional[Dict[str, Any]] = None
+        self.line_number = 0
+
+    def _start(self, data: Dict[str, Any]) -> None:
+        save_format = self.format or data.get("format", "json")
+        if save_format not in CODECS:
+            raise StreamFormatError(f"Invalid format: {save_format}. Must be one of {', '.join(CODECS)}")
+
+        now = datetime.datetime.now()
+        save_id = SaveManager.new_save_id(now)
+        self.header = {
+            "id": save_id,
+            "name": self.name or data.get("name") or save_id,
+            "game_version": data.get("game_version", "Black2White2"),
+            "format": save_format,
+            "created_at": now,
+            "last_updated": now,
+            "players": []
+        }
+        self.codec = get_codec(save_format)
+        self.tmp_dir = f"{SaveManager.get_save_dir(save_id)}.import.tmp"
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+
+    def _player_dir(self, player_id: str) -> str:
+        return os.path.join(self.tmp_dir, "players", player_id)
+
+    def _flush(self, collection: str) -> None:
+        records = self.buffers[collection]
+        if not records:
+            return
+        segment = self.segments[collection]
+        path = os.path.join(self._player_dir(self.player_id), RECORD_SEGMENTS[collection][0] + self.codec.records_extension)
+        # The first batch (at offset 0) creates the segment; later ones append
+        segment["size"] = self.codec.append_records(path, records, segment["size"])
+        segment["count"] += len(records)
+        segment["lines"] += len(records)
+        records.clear()
+
+    def _add_record(self, collection: str, item: Dict[str, Any]) -> None:
+        self.buffers[collection].append([self.segments[collection]["count"] + len(self.buffers[collection]), item])
+        if len(self.buffers[collection]) >= IMPORT_BATCH:
+            self._flush(collection)
+
+    def _end_battle(self) -> None:
+        if self.battle is not None:
+            self._add_record("battles", Battle(**self.battle).dict())
+            self.battle = None
+
+    def _end_player(self) -> None:
+        if self.player_id is None:
+            return
+        self._end_battle()
+        for collection in RECORD_SEGMENTS:
+            self._flush(collection)
+
+        # Without a session the next update of the save rewrites every segment
+        atomic_write_json(os.path.join(self._player_dir(self.player_id), "state.json"), {
+            "session": None,
+            "format": self.codec.name,
+            "versions": {},
+            "records": self.segments
+        })
+        self.player_id = None
+
+    def _start_player(self, data: Dict[str, Any]) -> None:
+        self._end_player()
+        player = Player(**{**data, "thought_history": [], "battle_history": []})
+        # The ID names the player's segment directory
+        if not is_valid_id(player.id):
+            raise StreamFormatError(f"Invalid player ID: {player.id!r}")
+        if player.id in self.player_ids:
+            raise StreamFormatError(f"Duplicate player {player.id}")
+
+        player_dir = self._player_dir(player.id)
+        os.makedirs(player_dir)
+        for collection, name in DOCUMENT_SEGMENTS.items():
+            self.codec.dump_document(os.path.join(player_dir, name + self.codec.document_extension), SaveManager._dump_document(player, collection))
+
+        self.player_ids.append(player.id)
+        self.player_id = player.id
+        self.segments = {collection: {"count": 0, "lines": 0, "size": 0} for collection in RECORD_SEGMENTS}
+        self.buffers = {collection: [] for collection in RECORD_SEGMENTS}
+
+    def _check_player(self, line: Dict[str, Any]) -> None:
+        if self.player_id is None or line.get("player_id") != self.player_id:
+            raise StreamFormatError(f"{line['type']} for player {line.get('player_id')} does not follow that player's line")
+
+    def _add_line(self, line: Any) -> None:
+        if not isinstance(line, dict):
+            raise StreamFormatError("Line is not an object")
+        line_type = line.get("type")
+        data = line.get("data")
+        if not isinstance(data, dict):
+            raise StreamFormatError("Line has no data object")
+
+        if self.header is None:
+            if line_type != "save":
+                raise StreamFormatError("The first line must be the save line")
+            self._start(data)
+        elif line_type == "player":
+            self._start_player(data)
+        elif line_type == "turn":
+            self._check_player(line)
+            if self.battle is None or self.battle["id"] != line.get("battle_id"):
+                raise StreamFormatError(f"Turn for battle {line.get('battle_id')} does not follow that battle's line")
+            self.battle["turns"].append(data)
+        elif line_type in RECORD_TYPES:
+            self._check_player(line)
+            self._end_battle()
+            collection, model = RECORD_TYPES[line_type]
+            if line_type == "battle":
+                self.battle = {**data, "turns": []}
+            else:
+                self._add_record(collection, model(**data).dict())
+        else:
+            raise StreamFormatError(f"Unknown line type: {line_type}")
+
+    def add_lines(self, lines: List[bytes]) -> None:
+        """Parse and write a batch of NDJSON lines"""
+        for raw in lines:
+            self.line_number += 1
+            if not raw.strip():
+                continue
+            try:
+                self._add_line(json.loads(raw))
+            except StreamFormatError as e:
+                raise StreamFormatError(f"Line {self.line_number}: {e}")
+            except ValueError as e:
+                raise StreamFormatError(f"Line {self.line_number}: {e}")
+
+    def finish(self) -> Dict[str, Any]:
+        """Write the save header and move the save into place"""
+        if self.header is None:
+            raise StreamFormatError("The stream has no save line")
+        self._end_player()
+
+        self.header["players"] = self.player_ids
+        atomic_write_json(os.path.join(self.tmp_dir, "save.json"), self.header)
+        os.rename(self.tmp_dir, SaveManager.get_save_dir(self.header["id"]))
+        self.tmp_dir = None
+        save_index.put(self.header["id"])
+        return SaveManager._to_response(self.header)
+
+    def abort(self) -> None:
+        """Remove a partly imported save"""
+        if self.tmp_dir:
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+            self.tmp_dir = None
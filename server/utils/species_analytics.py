@@ -0,0 +1,157 @@
+from typing import List, Dict, Any, Optional, Set
+
+from server.models.player import Battle
+from server.models.pokemon import Pokemon
+from server.models.turn import TurnLog, MISSING
+from server.utils.player_repository import PlayerRepository, repository
+
+# Counters kept per species, in the order of each counter list
+COUNTERS = ("appearances", "wins", "losses", "draws", "kos", "faints", "damage_dealt", "damage_taken")
+APPEARANCES, WINS, LOSSES, DRAWS, KOS, FAINTS, DAMAGE_DEALT, DAMAGE_TAKEN = range(len(COUNTERS))
+RESULT_COUNTERS = {"win": WINS, "loss": LOSSES, "draw": DRAWS}
+
+SpeciesCounters = Dict[str, List[int]]
+
+def _counters(stats: SpeciesCounters, species: str) -> List[int]:
+    counters = stats.get(species)
+    if counters is None:
+        counters = stats[species] = [0] * len(COUNTERS)
+    return counters
+
+def battle_team(battle: Battle, snapshots: Dict[str, List[Pokemon]]) -> Set[str]:
+    """Get the species on the player's side of a battle"""
+    team = battle.player_team or snapshots.get(battle.player_team_id, [])
+    return {pokemon.name for pokemon in team}
+
+def add_turns(stats: SpeciesCounters, team: Set[str], turns: TurnLog, start: int = 0) -> None:
+    """Count the damage, KOs and faints in a battle's turns from ``start`` on.
+
+    Turns are attributed by name: an actor on the player's team dealt the
+    damage (and scored a KO if its target was left at 0 HP), a target on
+    the team took it (and fainted at 0 HP). The turn columns are read
+    directly, summed per string code, and only the totals are added per
+    species, so no dict is built per turn.
+    """
+    if type(turns) is not TurnLog:
+        # Archived turns are decoded from disk once into a column log
+        turns = TurnLog(turns.to_list())
+    strings = turns.strings
+    mine = [name in team for name in strings]
+    dealt = [0] * len(strings)
+    taken = [0] * len(strings)
+    kos = [0] * len(strings)
+    faints = [0] * len(strings)
+
+    columns = zip(turns.codes["actor"][start:], turns.codes["target"][start:], turns.ints["damage"][start:], turns.ints["hp_after"][start:])
+    for actor, target, damage, hp_after in columns:
+        knocked_out = hp_after == 0 and target != 0
+        if mine[actor]:
+            if damage != MISSING:
+                dealt[actor] += damage
+            if knocked_out and not mine[target]:
+                kos[actor] += 1
+        if target and mine[target]:
+            if damage != MISSING:
+                taken[target] += damage
+            if knocked_out:
+                faints[target] += 1
+
+    for code, name in enumerate(strings):
+        if mine[code] and (dealt[code] or taken[code] or kos[code] or faints[code]):
+            counters = _counters(stats, name)
+            counters[DAMAGE_DEALT] += dealt[code]
+            counters[DAMAGE_TAKEN] += taken[code]
+            counters[KOS] += kos[code]
+            counters[FAINTS] += faints[code]
+
+def add_battle(stats: SpeciesCounters, team: Set[str], result: Optional[str] = None) -> None:
+    """Count an appearance for each species of a battle, and its result"""
+    for species in team:
+        counters = _counters(stats, species)
+        counters[APPEARANCES] += 1
+        if result in RESULT_COUNTERS:
+            counters[RESULT_COUNTERS[result]] += 1
+
+def add_result(stats: SpeciesCounters, team: Set[str], result: str) -> None:
+    """Count the result of a battle for each of its species"""
+    for species in team:
+        _counters(stats, species)[RESULT_COUNTERS[result]] += 1
+
+def build_species_stats(battles: List[Battle], snapshots: Dict[str, List[Pokemon]]) -> SpeciesCounters:
+    """Count every species' performance over a battle history"""
+    stats: SpeciesCounters = {}
+    for battle in battles:
+        team = battle_team(battle, snapshots)
+        add_battle(stats, team, battle.result)
+        if len(battle.turns):
+            add_turns(stats, team, battle.turns)
+    return stats
+
+def species_summary(counters: List[int]) -> Dict[str, Any]:
+    """Summarize the counters of one species"""
+    summary = dict(zip(COUNTERS, counters))
+    decided = counters[WINS] + counters[LOSSES] + counters[DRAWS]
+    summary["win_rate"] = counters[WINS] / decided if decided else None
+    summary["damage_per_battle"] = counters[DAMAGE_DEALT] / counters[APPEARANCES] if counters[APPEARANCES] else None
+    return summary
+
+class SpeciesAnalytics:
+    """Per-species performance counters of each player's battles.
+
+    A player's counters are built from its battle history on first read
+    (or on ``rebuild``) and then kept up to date by the battle mutations,
+    so reading them does not walk the history again. Counters are derived
+    state: they are not saved, and are dropped whenever players are
+    replaced.
+    """
+
+    def __init__(self, repository: PlayerRepository):
+        self.repository = repository
+        self.players: Dict[str, SpeciesCounters] = {}
+
+    def reset(self) -> None:
+        """Drop the counters of every player"""
+        self.players = {}
+
+    def forget(self, player_id: str) -> None:
+        """Drop the counters of a player"""
+        self.players.pop(player_id, None)
+
+    def rebuild(self, player_id: str) -> SpeciesCounters:
+        """Count a player's species over its whole battle history"""
+        stats = build_species_stats(self.repository.get_battles(player_id), self.repository.get_team_snapshots(player_id))
+        self.players[player_id] = stats
+        return stats
+
+    def get(self, player_id: str) -> SpeciesCounters:
+        """Get a player's counters by species"""
+        stats = self.players.get(player_id)
+        if stats is None:
+            stats = self.rebuild(player_id)
+        return stats
+
+    def _team(self, player_id: str, battle: Battle) -> Set[str]:
+        snapshots = {}
+        if not battle.player_team and battle.player_team_id:
+            snapshots[battle.player_team_id] = self.repository.get_team_snapshot(player_id, battle.player_team_id) or []
+        return battle_team(battle, snapshots)
+
+    def battle_started(self, player_id: str, battle: Battle) -> None:
+        stats = self.players.get(player_id)
+        if stats is not None:
+            add_battle(stats, self._team(player_id, battle))
+
+    def turns_added(self, player_id: str, battle_id: str, count: int) -> None:
+        stats = self.players.get(player_id)
+        if stats is not None:
+            _, battle = self.repository.get_battle(player_id, battle_id)
+            add_turns(stats, self._team(player_id, battle), battle.turns, len(battle.turns) - count)
+
+    def battle_ended(self, player_id: str, battle_id: str, result: str) -> None:
+        stats = self.players.get(player_id)
+        if stats is not None and result in RESULT_COUNTERS:
+            _, battle = self.repository.get_battle(player_id, battle_id)
+            add_result(stats, self._team(player_id, battle), result)
+
+# Shared analytics for the API's repository
+species_analytics = SpeciesAnalytics(repository)
@@ -0,0 +1,538 @@
+import os
+import json
+import sqlite3
+import datetime
+import threading
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+
+from server.models.player import Player, Thought, Battle, MatchupRecord
+from server.models.pokemon import Pokemon
+from server.models.turn import TurnEvent
+from server.utils.file_io import json_default
+from server.utils.player_repository import PlayerRepository
+from server.utils.time_index import TimeKey
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    location TEXT NOT NULL,
+    team TEXT NOT NULL,
+    items TEXT NOT NULL,
+    badges TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    last_updated TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS thoughts (
+    player_id TEXT NOT NULL REFERENCES players(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    id TEXT,
+    content TEXT NOT NULL,
+    category TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    context TEXT,
+    PRIMARY KEY (player_id, seq)
+);
+CREATE INDEX IF NOT EXISTS thoughts_player_time ON thoughts (player_id, timestamp, seq);
+CREATE INDEX IF NOT EXISTS thoughts_player_category_time ON thoughts (player_id, category, timestamp, seq);
+
+CREATE TABLE IF NOT EXISTS battles (
+    player_id TEXT NOT NULL REFERENCES players(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    opponent_id TEXT NOT NULL,
+    opponent_name TEXT NOT NULL,
+    player_team TEXT NOT NULL,
+    player_team_id TEXT,
+    opponent_team TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT,
+    result TEXT,
+    PRIMARY KEY (player_id, seq)
+);
+CREATE INDEX IF NOT EXISTS battles_player_battle ON battles (player_id, id);
+CREATE INDEX IF NOT EXISTS battles_player_time ON battles (player_id, start_time, seq);
+CREATE INDEX IF NOT EXISTS battles_player_opponent_time ON battles (player_id, opponent_id, start_time, seq);
+
+CREATE TABLE IF NOT EXISTS battle_turns (
+    player_id TEXT NOT NULL,
+    battle_seq INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    turn TEXT NOT NULL,
+    PRIMARY KEY (player_id, battle_seq, idx),
+    FOREIGN KEY (player_id, battle_seq) REFERENCES battles(player_id, seq) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS matchups (
+    player_id TEXT NOT NULL REFERENCES players(id) ON DELETE CASCADE,
+    opponent_id TEXT NOT NULL,
+    opponent_name TEXT NOT NULL,
+    wins INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    last_battle TEXT,
+    rolling TEXT,
+    PRIMARY KEY (player_id, opponent_id)
+);
+CREATE INDEX IF NOT EXISTS matchups_opponent ON matchups (opponent_id);
+
+CREATE TABLE IF NOT EXISTS team_snapshots (
+    player_id TEXT NOT NULL REFERENCES players(id) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    team TEXT NOT NULL,
+    PRIMARY KEY (player_id, id)
+);
+"""
+
+# Matchup fields stored together as JSON in the "rolling" column
+ROLLING_FIELDS = ["recent_results", "streak", "best_win_streak", "longest_loss_streak", "hourly", "daily"]
+
+# Statements are module constants so sqlite3's statement cache prepares
+# each of them once per connection
+INSERT_PLAYER = "INSERT INTO players (id, name, location, team, items, badges, created_at, last_updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SELECT_PLAYER = "SELECT id, name, location, team, items, badges, created_at, last_updated FROM players"
+TOUCH_PLAYER = "UPDATE players SET last_updated = ? WHERE id = ?"
+INSERT_THOUGHT = "INSERT INTO thoughts (player_id, seq, id, content, category, timestamp, context) VALUES (?, ?, ?, ?, ?, ?, ?)"
+SELECT_THOUGHTS = "SELECT seq, id, content, category, timestamp, context FROM thoughts"
+INSERT_BATTLE = "INSERT INTO battles (player_id, seq, id, opponent_id, opponent_name, player_team, player_team_id, opponent_team, start_time, end_time, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+SELECT_BATTLES = "SELECT seq, id, opponent_id, opponent_name, player_team, player_team_id, opponent_team, start_time, end_time, result FROM battles"
+INSERT_TURN = "INSERT INTO battle_turns (player_id, battle_seq, idx, turn) VALUES (?, ?, ?, ?)"
+SELECT_TURNS = "SELECT battle_seq, turn FROM battle_turns"
+UPSERT_MATCHUP = "INSERT OR REPLACE INTO matchups (player_id, opponent_id, opponent_name, wins, losses, draws, last_battle, rolling) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SELECT_MATCHUPS = "SELECT opponent_id, opponent_name, wins, losses, draws, last_battle, rolling FROM matchups"
+INSERT_TEAM_SNAPSHOT = "INSERT OR IGNORE INTO team_snapshots (player_id, id, team) VALUES (?, ?, ?)"
+
+# Battles whose turns are read with one query; keeps the IN list well under
+# SQLite's limit on bound parameters
+TURN_BATCH = 500
+
+# Profile fields that ``update_player`` may set, all stored as JSON except the name
+PROFILE_COLUMNS = {"name", "location", "items", "badges"}
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=json_default)
+
+def _time(value: Optional[datetime.datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+class SqlitePlayerRepository(PlayerRepository):
+    """Players stored in an embedded SQLite database.
+
+    Thoughts, battles and matchups are rows indexed by player, opponent
+    and time, so reading one player's collection (or one battle) does not
+    touch anything else. Turns are rows keyed by battle and position, so
+    adding turns to a long battle only inserts the new ones. Small nested
+    values (team, location) are JSON columns, and each distinct team
+    snapshot is one row that battles refer to by ID. The database runs in WAL mode with ``synchronous=NORMAL``:
+    each write is one short transaction that survives a process crash.
+    """
+
+    durable = True
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        # The API runs on one event loop, but saves may read from a worker thread
+        self.lock = threading.RLock()
+
+    def close(self) -> None:
+        """Close the database connection"""
+        self.conn.close()
+
+    # Row conversion
+    def _player(self, row, collections: Optional[Iterable[str]] = None) -> Player:
+        player_id, name, location, team, items, badges, created_at, last_updated = row
+        # Only the collections asked for are read from their tables
+        readers = {
+            "thought_history": self.get_thoughts,
+            "battle_history": self.get_battles,
+            "matchup_records": self.get_matchups,
+            "team_snapshots": self.get_team_snapshots
+        }
+        if collections is not None:
+            readers = {field: reader for field, reader in readers.items() if field in collections}
+        return Player(
+            id=player_id,
+            name=name,
+            location=json.loads(location),
+            team=json.loads(team),
+            **{field: reader(player_id) for field, reader in readers.items()},
+            items=json.loads(items),
+            badges=set(json.loads(badges)),
+            created_at=created_at,
+            last_updated=last_updated
+        )
+
+    def _battle(self, row, turns: List[Dict[str, Any]]) -> Battle:
+        seq, battle_id, opponent_id, opponent_name, player_team, player_team_id, opponent_team, start_time, end_time, result = row
+        return Battle(
+            id=battle_id,
+            opponent_id=opponent_id,
+            opponent_name=opponent_name,
+            player_team=json.loads(player_team),
+            player_team_id=player_team_id,
+            opponent_team=json.loads(opponent_team),
+            start_time=start_time,
+            end_time=end_time,
+            result=result,
+            turns=turns
+        )
+
+    def _battles(self, player_id: str, rows) -> List[Battle]:
+        # Read the turns of every battle in a few range scans of the turn key
+        turns: Dict[int, List[Dict[str, Any]]] = {row[0]: [] for row in rows}
+        seqs = list(turns)
+        for start in range(0, len(seqs), TURN_BATCH):
+            batch = seqs[start:start + TURN_BATCH]
+            for battle_seq, turn in self.conn.execute(
+                SELECT_TURNS + f" WHERE player_id = ? AND battle_seq IN ({', '.join('?' * len(batch))}) ORDER BY battle_seq, idx",
+                [player_id, *batch]
+            ):
+                turns[battle_seq].append(json.loads(turn))
+        return [self._battle(row, turns[row[0]]) for row in rows]
+
+    def _thought(self, row) -> Thought:
+        seq, thought_id, content, category, timestamp, context = row
+        return Thought(id=thought_id, content=content, category=category, timestamp=timestamp, context=json.loads(context) if context is not None else None)
+
+    def _page(
+        self,
+        table: str,
+        select: str,
+        time_column: str,
+        group_column: str,
+        player_id: str,
+        limit: int,
+        group: Optional[str],
+        after: Optional[TimeKey],
+        since: Optional[datetime.datetime],
+        until: Optional[datetime.datetime],
+        descending: bool,
+        offset: int
+    ) -> Tuple[list, int, bool]:
+        # Every filter is a range of the (player, [group,] time, seq) indexes
+        where = ["player_id = ?"]
+        params: List[Any] = [player_id]
+        if group is not None:
+            where.append(f"{group_column} = ?")
+            params.append(group)
+        if since is not None:
+            where.append(f"{time_column} >= ?")
+            params.append(_time(since))
+        if until is not None:
+            where.append(f"{time_column} < ?")
+            params.append(_time(until))
+        total = self.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {' AND '.join(where)}", params).fetchone()[0]
+
+        if after is not None:
+            where.append(f"({time_column}, seq) {'<' if descending else '>'} (?, ?)")
+            params.extend([_time(after[0]), after[1]])
+        order = "DESC" if descending else "ASC"
+        rows = self.conn.execute(
+            f"{select} WHERE {' AND '.join(where)} ORDER BY {time_column} {order}, seq {order} LIMIT ? OFFSET ?",
+            params + [limit + 1, offset]
+        ).fetchall()
+        return rows[:limit], total, len(rows) > limit
+
+    def _matchup(self, row) -> MatchupRecord:
+        opponent_id, opponent_name, wins, losses, draws, last_battle, rolling = row
+        return MatchupRecord(
+            opponent_id=opponent_id,
+            opponent_name=opponent_name,
+            wins=wins,
+            losses=losses,
+            draws=draws,
+            last_battle=last_battle,
+            **(json.loads(rolling) if rolling else {})
+        )
+
+    def _insert_player(self, player: Player) -> None:
+        self.conn.execute(INSERT_PLAYER, (
+            player.id,
+            player.name,
+            _dumps(player.location.dict()),
+            _dumps([pokemon.dict() for pokemon in player.team]),
+            _dumps(player.items),
+            _dumps(sorted(player.badges)),
+            _time(player.created_at),
+            _time(player.last_updated)
+        ))
+        self.conn.executemany(INSERT_THOUGHT, [
+            (player.id, i, t.id, t.content, t.category, _time(t.timestamp), _dumps(t.context) if t.context is not None else None)
+            for i, t in enumerate(player.thought_history)
+        ])
+        self.conn.executemany(INSERT_BATTLE, [self._battle_params(player.id, i, b) for i, b in enumerate(player.battle_history)])
+        self.conn.executemany(INSERT_TURN, [params for i, b in enumerate(player.battle_history) for params in self._turn_params(player.id, i, b)])
+        self.conn.executemany(UPSERT_MATCHUP, [self._matchup_params(player.id, m) for m in player.matchup_records.values()])
+        self.conn.executemany(INSERT_TEAM_SNAPSHOT, [
+            (player.id, snapshot_id, _dumps([pokemon.dict() for pokemon in team]))
+            for snapshot_id, team in player.team_snapshots.items()
+        ])
+
+    def _battle_params(self, player_id: str, seq: int, battle: Battle) -> tuple:
+        return (
+            player_id, seq, battle.id, battle.opponent_id, battle.opponent_name,
+            _dumps([p.dict() for p in battle.player_team]),
+            battle.player_team_id,
+            _dumps([p.dict() for p in battle.opponent_team]),
+            _time(battle.start_time), _time(battle.end_time), battle.result
+        )
+
+    def _turn_params(self, player_id: str, seq: int, battle: Battle) -> List[tuple]:
+        return [(player_id, seq, i, _dumps(turn)) for i, turn in enumerate(battle.turns.to_list())]
+
+    def _matchup_params(self, player_id: str, matchup: MatchupRecord) -> tuple:
+        return (
+            player_id, matchup.opponent_id, matchup.opponent_name,
+            matchup.wins, matchup.losses, matchup.draws, _time(matchup.last_battle),
+            _dumps(matchup.dict(include=set(ROLLING_FIELDS)))
+        )
+
+    def _set_team(self, player_id: str, team: List[Pokemon], timestamp: datetime.datetime) -> None:
+        self.conn.execute(
+            "UPDATE players SET team = ?, last_updated = ? WHERE id = ?",
+            (_dumps([pokemon.dict() for pokemon in team]), _time(timestamp), player_id)
+        )
+
+    # Players
+    def count_players(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    def list_players(self, offset: int, limit: int, collections: Optional[Iterable[str]] = None) -> List[Player]:
+        with self.lock:
+            rows = self.conn.execute(SELECT_PLAYER + " ORDER BY seq LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+            return [self._player(row, collections) for row in rows]
+
+    def all_players(self) -> List[Player]:
+        with self.lock:
+            rows = self.conn.execute(SELECT_PLAYER + " ORDER BY seq").fetchall()
+            return [self._player(row) for row in rows]
+
+    def player_ids(self) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT id FROM players ORDER BY seq")]
+
+    def get_player(self, player_id: str, collections: Optional[Iterable[str]] = None) -> Optional[Player]:
+        with self.lock:
+            row = self.conn.execute(SELECT_PLAYER + " WHERE id = ?", (player_id,)).fetchone()
+            return self._player(row, collections) if row is not None else None
+
+    def get_player_name(self, player_id: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT name FROM players WHERE id = ?", (player_id,)).fetchone()
+            return row[0] if row is not None else None
+
+    def create_player(self, player: Player) -> None:
+        with self.lock, self.conn:
+            self._insert_player(player)
+
+    def update_player(self, player_id: str, fields: Dict[str, Any], timestamp: datetime.datetime) -> None:
+        assignments = []
+        params = []
+        for name, value in fields.items():
+            if name not in PROFILE_COLUMNS:
+                raise ValueError(f"Cannot update player field {name}")
+            if name == "location":
+                value = _dumps(value.dict())
+            elif name == "badges":
+                value = _dumps(sorted(value))
+            elif name != "name":
+                value = _dumps(value)
+            assignments.append(f"{name} = ?")
+            params.append(value)
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                f"UPDATE players SET {', '.join(assignments + ['last_updated = ?'])} WHERE id = ?",
+                params + [_time(timestamp), player_id]
+            )
+
+    def delete_player(self, player_id: str) -> bool:
+        with self.lock, self.conn:
+            return self.conn.execute("DELETE FROM players WHERE id = ?", (player_id,)).rowcount > 0
+
+    def replace_all(self, players: List[Player]) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM players")
+            for player in players:
+                self._insert_player(player)
+
+    # Team
+    def get_team(self, player_id: str) -> List[Pokemon]:
+        with self.lock:
+            row = self.conn.execute("SELECT team FROM players WHERE id = ?", (player_id,)).fetchone()
+            return [Pokemon(**pokemon) for pokemon in json.loads(row[0])]
+
+    def add_pokemon(self, player_id: str, pokemon: Pokemon, timestamp: datetime.datetime) -> None:
+        with self.lock, self.conn:
+            team = self.get_team(player_id)
+            team.append(pokemon)
+            self._set_team(player_id, team, timestamp)
+
+    def replace_pokemon(self, player_id: str, index: int, pokemon: Pokemon, timestamp: datetime.datetime) -> None:
+        with self.lock, self.conn:
+            team = self.get_team(player_id)
+            team[index] = pokemon
+            self._set_team(player_id, team, timestamp)
+
+    def remove_pokemon(self, player_id: str, index: int, timestamp: datetime.datetime) -> Pokemon:
+        with self.lock, self.conn:
+            team = self.get_team(player_id)
+            removed = team.pop(index)
+            self._set_team(player_id, team, timestamp)
+            return removed
+
+    # Thoughts
+    def count_thoughts(self, player_id: str) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM thoughts WHERE player_id = ?", (player_id,)).fetchone()[0]
+
+    def get_thoughts(self, player_id: str) -> List[Thought]:
+        with self.lock:
+            rows = self.conn.execute(SELECT_THOUGHTS + " WHERE player_id = ? ORDER BY seq", (player_id,)).fetchall()
+            return [self._thought(row) for row in rows]
+
+    def page_thoughts(
+        self,
+        player_id: str,
+        limit: int,
+        category: Optional[str] = None,
+        after: Optional[TimeKey] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        descending: bool = False,
+        offset: int = 0
+    ) -> Tuple[List[Thought], int, Optional[TimeKey]]:
+        with self.lock:
+            rows, total, more = self._page(
+                "thoughts", SELECT_THOUGHTS, "timestamp", "category", player_id, limit, category, after, since, until, descending, offset
+            )
+            thoughts = [self._thought(row) for row in rows]
+            return thoughts, total, (thoughts[-1].timestamp, rows[-1][0]) if more else None
+
+    def get_thoughts_at(self, player_id: str, positions: List[int]) -> List[Thought]:
+        if not positions:
+            return []
+        with self.lock:
+            rows = self.conn.execute(
+                SELECT_THOUGHTS + f" WHERE player_id = ? AND seq IN ({', '.join('?' * len(positions))})",
+                [player_id, *positions]
+            ).fetchall()
+            thoughts = {row[0]: self._thought(row) for row in rows}
+            return [thoughts[i] for i in positions]
+
+    def add_thought(self, player_id: str, thought: Thought, timestamp: datetime.datetime) -> None:
+        with self.lock, self.conn:
+            seq = self.count_thoughts(player_id)
+            self.conn.execute(INSERT_THOUGHT, (
+                player_id, seq, thought.id, thought.content, thought.category,
+                _time(thought.timestamp), _dumps(thought.context) if thought.context is not None else None
+            ))
+            self.conn.execute(TOUCH_PLAYER, (_time(timestamp), player_id))
+
+    # Battles
+    def count_battles(self, player_id: str) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM battles WHERE player_id = ?", (player_id,)).fetchone()[0]
+
+    def get_battles(self, player_id: str, opponent_id: Optional[str] = None) -> List[Battle]:
+        with self.lock:
+            if opponent_id is None:
+                rows = self.conn.execute(SELECT_BATTLES + " WHERE player_id = ? ORDER BY seq", (player_id,)).fetchall()
+            else:
+                rows = self.conn.execute(SELECT_BATTLES + " WHERE player_id = ? AND opponent_id = ? ORDER BY seq", (player_id, opponent_id)).fetchall()
+            return self._battles(player_id, rows)
+
+    def page_battles(
+        self,
+        player_id: str,
+        limit: int,
+        opponent_id: Optional[str] = None,
+        after: Optional[TimeKey] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        descending: bool = False,
+        offset: int = 0
+    ) -> Tuple[List[Battle], int, Optional[TimeKey]]:
+        with self.lock:
+            rows, total, more = self._page(
+                "battles", SELECT_BATTLES, "start_time", "opponent_id", player_id, limit, opponent_id, after, since, until, descending, offset
+            )
+            battles = self._battles(player_id, rows)
+            return battles, total, (battles[-1].start_time, rows[-1][0]) if more else None
+
+    def get_battle(self, player_id: str, battle_id: str) -> Optional[Tuple[int, Battle]]:
+        with self.lock:
+            row = self.conn.execute(SELECT_BATTLES + " WHERE player_id = ? AND id = ? ORDER BY seq LIMIT 1", (player_id, battle_id)).fetchone()
+            return (row[0], self._battles(player_id, [row])[0]) if row is not None else None
+
+    def add_battle(self, player_id: str, battle: Battle, timestamp: datetime.datetime) -> None:
+        with self.lock, self.conn:
+            seq = self.count_battles(player_id)
+            self.conn.execute(INSERT_BATTLE, self._battle_params(player_id, seq, battle))
+            self.conn.executemany(INSERT_TURN, self._turn_params(player_id, seq, battle))
+            self.conn.execute(TOUCH_PLAYER, (_time(timestamp), player_id))
+
+    def end_battle(self, player_id: str, battle_id: str, result: str, end_time: datetime.datetime) -> int:
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT seq FROM battles WHERE player_id = ? AND id = ? ORDER BY seq LIMIT 1", (player_id, battle_id)).fetchone()
+            self.conn.execute(
+                "UPDATE battles SET result = ?, end_time = ? WHERE player_id = ? AND seq = ?",
+                (result, _time(end_time), player_id, row[0])
+            )
+            self.conn.execute(TOUCH_PLAYER, (_time(end_time), player_id))
+            return row[0]
+
+    def add_turns(self, player_id: str, battle_id: str, turns: List[TurnEvent], timestamp: datetime.datetime) -> int:
+        with self.lock, self.conn:
+            seq = self.conn.execute("SELECT seq FROM battles WHERE player_id = ? AND id = ? ORDER BY seq LIMIT 1", (player_id, battle_id)).fetchone()[0]
+            # The next position comes from the end of the battle's key range;
+            # the turns already stored are not read
+            start = self.conn.execute("SELECT COALESCE(MAX(idx) + 1, 0) FROM battle_turns WHERE player_id = ? AND battle_seq = ?", (player_id, seq)).fetchone()[0]
+            self.conn.executemany(INSERT_TURN, [
+                (player_id, seq, start + i, _dumps(turn.dict(exclude_none=True)))
+                for i, turn in enumerate(turns)
+            ])
+            self.conn.execute(TOUCH_PLAYER, (_time(timestamp), player_id))
+            return seq
+
+    # Matchups
+    def get_matchups(self, player_id: str) -> Dict[str, MatchupRecord]:
+        with self.lock:
+            rows = self.conn.execute(SELECT_MATCHUPS + " WHERE player_id = ?", (player_id,)).fetchall()
+            return {row[0]: self._matchup(row) for row in rows}
+
+    def get_matchup(self, player_id: str, opponent_id: str) -> Optional[MatchupRecord]:
+        with self.lock:
+            row = self.conn.execute(SELECT_MATCHUPS + " WHERE player_id = ? AND opponent_id = ?", (player_id, opponent_id)).fetchone()
+            return self._matchup(row) if row is not None else None
+
+    def put_matchup(self, player_id: str, matchup: MatchupRecord, timestamp: datetime.datetime) -> None:
+        with self.lock, self.conn:
+            self.conn.execute(UPSERT_MATCHUP, self._matchup_params(player_id, matchup))
+            self.conn.execute(TOUCH_PLAYER, (_time(timestamp), player_id))
+
+    # Team snapshots
+    def get_team_snapshots(self, player_id: str) -> Dict[str, List[Pokemon]]:
+        with self.lock:
+            rows = self.conn.execute("SELECT id, team FROM team_snapshots WHERE player_id = ?", (player_id,)).fetchall()
+            return {snapshot_id: [Pokemon(**pokemon) for pokemon in json.loads(team)] for snapshot_id, team in rows}
+
+    def get_team_snapshot(self, player_id: str, snapshot_id: str) -> Optional[List[Pokemon]]:
+        with self.lock:
+            row = self.conn.execute("SELECT team FROM team_snapshots WHERE player_id = ? AND id = ?", (player_id, snapshot_id)).fetchone()
+            return [Pokemon(**pokemon) for pokemon in json.loads(row[0])] if row is not None else None
+
+    def put_team_snapshot(self, player_id: str, snapshot_id: str, team: List[Pokemon], timestamp: datetime.datetime) -> None:
+        with self.lock, self.conn:
+            self.conn.execute(INSERT_TEAM_SNAPSHOT, (player_id, snapshot_id, _dumps([pokemon.dict() for pokemon in team])))
+            self.conn.execute(TOUCH_PLAYER, (_time(timestamp), player_id))
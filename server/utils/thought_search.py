@@ -0,0 +1,197 @@
+import os
+import re
+import math
+import time
+import bisect
+import heapq
+from array import array
+from typing import List, Dict, Tuple, Iterable
+
+from server.models.player import Thought
+from server.utils.player_repository import PlayerRepository, repository
+
+TOKEN_PATTERN = re.compile(r"\w+")
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+# Hours after which a thought's recency boost is halved
+SEARCH_HALF_LIFE = float(os.environ.get("PST_SEARCH_HALF_LIFE", "168")) * 3600
+
+# BM25 term frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+# A search hit: score, player ID and position in the player's thought history
+SearchHit = Tuple[float, str, int]
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase words"""
+    return TOKEN_PATTERN.findall(text.casefold())
+
+def parse_query(query: str) -> List[List[str]]:
+    """Split a query into phrases, each a list of words that must appear in order.
+
+    Quoted text is one phrase; every other word is its own phrase (or a
+    short one, for words like "dragon-type" that split into several).
+    """
+    phrases = []
+    for quoted, word in QUERY_PATTERN.findall(query):
+        tokens = tokenize(quoted or word)
+        if tokens:
+            phrases.append(tokens)
+    return phrases
+
+class Postings:
+    """Occurrences of one word: the position of each thought it is in and
+    its word offset there, in history order, and how many thoughts have it"""
+
+    __slots__ = ("docs", "offsets", "count")
+
+    def __init__(self):
+        self.docs = array("I")
+        self.offsets = array("I")
+        self.count = 0
+
+class ThoughtIndex:
+    """Inverted index over the content of one player's thoughts.
+
+    Thoughts are added in history order, so every posting list stays
+    sorted by position and a thought's occurrences of a word are found by
+    binary search. A query walks the posting list of its rarest word and
+    looks each of those thoughts up in the other lists, so its cost
+    follows the number of candidate thoughts, not the history's length.
+    """
+
+    def __init__(self):
+        self.terms: Dict[str, Postings] = {}
+        self.lengths = array("I")
+        self.times = array("d")
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, thought: Thought) -> None:
+        """Index the next thought of the history"""
+        position = len(self.lengths)
+        tokens = tokenize(thought.content)
+        self.lengths.append(len(tokens))
+        self.times.append(thought.timestamp.timestamp())
+        self.total_length += len(tokens)
+
+        seen = set()
+        for offset, token in enumerate(tokens):
+            postings = self.terms.get(token)
+            if postings is None:
+                postings = self.terms[token] = Postings()
+            postings.docs.append(position)
+            postings.offsets.append(offset)
+            if token not in seen:
+                seen.add(token)
+                postings.count += 1
+
+    def matches(self, phrases: List[List[str]]) -> List[Tuple[int, Dict[str, int]]]:
+        """Find the thoughts containing every phrase, with each word's frequency in them"""
+        terms = {token for phrase in phrases for token in phrase}
+        postings = {term: self.terms.get(term) for term in terms}
+        if not terms or None in postings.values():
+            return []
+
+        rarest = min(terms, key=lambda term: len(postings[term].docs))
+        found = []
+        previous = -1
+        for position in postings[rarest].docs:
+            if position == previous:
+                continue
+            previous = position
+
+            ranges = {}
+            for term in terms:
+                docs = postings[term].docs
+                lo = bisect.bisect_left(docs, position)
+                hi = bisect.bisect_right(docs, position, lo)
+                if lo == hi:
+                    break
+                ranges[term] = (lo, hi)
+            else:
+                if all(self._has_phrase(postings, ranges, phrase) for phrase in phrases if len(phrase) > 1):
+                    found.append((position, {term: hi - lo for term, (lo, hi) in ranges.items()}))
+        return found
+
+    @staticmethod
+    def _has_phrase(postings: Dict[str, Postings], ranges: Dict[str, Tuple[int, int]], phrase: List[str]) -> bool:
+        offsets = [set(postings[term].offsets[slice(*ranges[term])]) for term in phrase]
+        return any(all(start + i in offsets[i] for i in range(1, len(phrase))) for start in offsets[0])
+
+class ThoughtSearch:
+    """Full-text search over the thoughts of each player and of all players.
+
+    A player's index is built from its history on the first search that
+    covers it, then kept up to date by ``thought_added``, so searching
+    does not read the history again. Hits are ranked by BM25 relevance
+    (with word statistics over the players searched), boosted by up to
+    ``recency`` times for new thoughts, a boost that halves every
+    ``SEARCH_HALF_LIFE``. Indexes are derived state: they are not saved,
+    and are dropped whenever players are replaced.
+    """
+
+    def __init__(self, repository: PlayerRepository):
+        self.repository = repository
+        self.players: Dict[str, ThoughtIndex] = {}
+
+    def reset(self) -> None:
+        """Drop the index of every player"""
+        self.players = {}
+
+    def forget(self, player_id: str) -> None:
+        """Drop the index of a player"""
+        self.players.pop(player_id, None)
+
+    def get(self, player_id: str) -> ThoughtIndex:
+        """Get a player's index, building it from its history if needed"""
+        index = self.players.get(player_id)
+        if index is None:
+            index = ThoughtIndex()
+            for thought in self.repository.get_thoughts(player_id):
+                index.add(thought)
+            self.players[player_id] = index
+        return index
+
+    def thought_added(self, player_id: str, thought: Thought) -> None:
+        index = self.players.get(player_id)
+        if index is not None:
+            index.add(thought)
+
+    def search(
+        self,
+        player_ids: Iterable[str],
+        phrases: List[List[str]],
+        limit: int,
+        recency: float = 1.0
+    ) -> Tuple[List[SearchHit], int]:
+        """Get the best ``limit`` hits of a query over some players, and the number of hits"""
+        indexes = {player_id: self.get(player_id) for player_id in player_ids}
+        documents = sum(len(index) for index in indexes.values())
+        if not documents:
+            return [], 0
+        average_length = sum(index.total_length for index in indexes.values()) / documents or 1
+
+        idf = {}
+        for term in {token for phrase in phrases for token in phrase}:
+            count = sum(index.terms[term].count for index in indexes.values() if term in index.terms)
+            idf[term] = math.log(1 + (documents - count + 0.5) / (count + 0.5))
+
+        now = time.time()
+        hits = []
+        for player_id, index in indexes.items():
+            for position, frequencies in index.matches(phrases):
+                norm = K1 * (1 - B + B * index.lengths[position] / average_length)
+                relevance = sum(idf[term] * frequency * (K1 + 1) / (frequency + norm) for term, frequency in frequencies.items())
+                age = max(now - index.times[position], 0)
+                hits.append((relevance * (1 + recency * 0.5 ** (age / SEARCH_HALF_LIFE)), player_id, position))
+
+        # Ties go to the newest thought
+        best = heapq.nlargest(limit, hits, key=lambda hit: (hit[0], indexes[hit[1]].times[hit[2]]))
+        return best, len(hits)
+
+# Shared search over the API's repository
+thought_search = ThoughtSearch(repository)
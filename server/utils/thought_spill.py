@@ -0,0 +1,262 @@
+import os
+import json
+import heapq
+import uuid
+import bisect
+import datetime
+import itertools
+from collections.abc import Sequence
+from typing import List, Dict, Optional, Tuple, Iterator, Iterable, Union
+
+from server.models.player import Player, Thought
+from server.utils.file_io import json_default
+from server.utils.lazy_player import PIN_DIR
+from server.utils.time_index import TimeKey, TimeIndex
+
+# Most recent thoughts per player the in-memory repository keeps in memory;
+# older ones are spilled to disk (0 keeps every thought in memory)
+THOUGHT_RETENTION = int(os.environ.get("PST_THOUGHT_RETENTION", "1000"))
+
+# Thoughts spilled, indexed and read back together
+SPILL_BLOCK = 256
+
+class ThoughtHistory(Sequence):
+    """A thought history whose older thoughts live in an append-only file.
+
+    The most recent thoughts (at least ``retention`` of them) stay in
+    memory; whenever ``SPILL_BLOCK`` more have piled up, the oldest block
+    is appended to the spill file. Only a small entry per spilled block
+    is kept (its file offset, its time range and its count per category),
+    so the memory a history takes stays flat however long it grows.
+
+    It reads like the list it replaces: indexing and iterating decode
+    spilled blocks from the file as needed. ``page`` pages the whole
+    history by time, skipping the spilled blocks outside the time range
+    or without the category, so recent pages never touch the file.
+    """
+
+    def __init__(self, retention: int, root: str = PIN_DIR):
+        self.retention = retention
+        self.path = os.path.join(root, f"thoughts_{uuid.uuid4().hex}", "thoughts.jsonl")
+        self.recent: List[Thought] = []
+        self.index = TimeIndex()
+        self.spilled = 0
+        self.size = 0
+        # Per spilled block: file offset, earliest and latest timestamp, count per category
+        self.offsets: List[int] = []
+        self.lows: List[datetime.datetime] = []
+        self.highs: List[datetime.datetime] = []
+        self.categories: List[Dict[str, int]] = []
+        self.earliest: Optional[datetime.datetime] = None
+        self.latest: Optional[datetime.datetime] = None
+        # Whether spilled timestamps never go back, so blocks are in time order
+        self.ordered = True
+        self.cached: Tuple[int, List[Thought]] = (-1, [])
+
+    @classmethod
+    def from_thoughts(cls, thoughts: Iterable[Thought], retention: int, root: str = PIN_DIR) -> "ThoughtHistory":
+        """Build a history from a list of thoughts, spilling all but the most recent"""
+        history = cls(retention, root)
+        for thought in thoughts:
+            history.append(thought)
+        return history
+
+    def append(self, thought: Thought) -> None:
+        self.index.add(thought.timestamp, len(self), thought.category)
+        self.recent.append(thought)
+        if len(self.recent) >= self.retention + SPILL_BLOCK:
+            self._spill()
+
+    def _spill(self) -> None:
+        block = self.recent[:SPILL_BLOCK]
+        data = b"".join(json.dumps(thought.dict(), default=json_default).encode() + b"\n" for thought in block)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+        timestamps = [thought.timestamp for thought in block]
+        if self.highs and timestamps[0] < self.highs[-1] or timestamps != sorted(timestamps):
+            self.ordered = False
+        categories: Dict[str, int] = {}
+        for thought in block:
+            categories[thought.category] = categories.get(thought.category, 0) + 1
+        self.offsets.append(self.size)
+        self.lows.append(min(timestamps))
+        self.highs.append(max(timestamps))
+        self.categories.append(categories)
+        self.earliest = min(self.lows[-1], self.earliest or self.lows[-1])
+        self.latest = max(self.highs[-1], self.latest or self.highs[-1])
+
+        self.size += len(data)
+        self.spilled += SPILL_BLOCK
+        del self.recent[:SPILL_BLOCK]
+        self.index.drop_before(self.spilled)
+
+    def _block(self, number: int) -> List[Thought]:
+        # Decode a spilled block, keeping the last one read for sequential reads
+        if self.cached[0] != number:
+            end = self.offsets[number + 1] if number + 1 < len(self.offsets) else self.size
+            with open(self.path, "rb") as f:
+                f.seek(self.offsets[number])
+                data = f.read(end - self.offsets[number])
+            self.cached = (number, [Thought(**json.loads(line)) for line in data.splitlines()])
+        return self.cached[1]
+
+    def __len__(self) -> int:
+        return self.spilled + len(self.recent)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Thought, List[Thought]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("thought index out of range")
+        if index >= self.spilled:
+            return self.recent[index - self.spilled]
+        return self._block(index // SPILL_BLOCK)[index % SPILL_BLOCK]
+
+    def __iter__(self) -> Iterator[Thought]:
+        return iter(self.freeze())
+
+    def __repr__(self) -> str:
+        return f"ThoughtHistory({len(self)} thoughts, {self.spilled} spilled to {self.path})"
+
+    def freeze(self) -> "FrozenThoughts":
+        """Get the thoughts so far, unchanged by later appends and spills"""
+        return FrozenThoughts(self.path, self.spilled, list(self.recent))
+
+    def _spilled_blocks(
+        self,
+        category: Optional[str],
+        since: Optional[datetime.datetime],
+        until: Optional[datetime.datetime]
+    ) -> Iterator[Tuple[int, bool]]:
+        # Spilled blocks that may hold thoughts in the range, each with
+        # whether all of its thoughts are in the time range
+        start, end = 0, len(self.offsets)
+        if self.ordered:
+            if since is not None:
+                start = bisect.bisect_left(self.highs, since)
+            if until is not None:
+                end = bisect.bisect_left(self.lows, until)
+        for number in range(start, end):
+            if category is not None and not self.categories[number].get(category):
+                continue
+            if since is not None and self.highs[number] < since or until is not None and self.lows[number] >= until:
+                continue
+            inside = (since is None or self.lows[number] >= since) and (until is None or self.highs[number] < until)
+            yield number, inside
+
+    def _spilled_items(
+        self,
+        category: Optional[str],
+        after: Optional[TimeKey],
+        since: Optional[datetime.datetime],
+        until: Optional[datetime.datetime],
+        descending: bool
+    ) -> Iterator[Tuple[TimeKey, Thought]]:
+        # Spilled thoughts in the range past ``after``, in page order
+        if after is not None:
+            if descending:
+                bound = after[0] + datetime.timedelta(microseconds=1)
+                until = bound if until is None else min(until, bound)
+            else:
+                since = after[0] if since is None else max(since, after[0])
+
+        def items(number: int) -> Iterator[Tuple[TimeKey, Thought]]:
+            first = number * SPILL_BLOCK
+            for i, thought in enumerate(self._block(number)):
+                key = (thought.timestamp, first + i)
+                if category is not None and thought.category != category:
+                    continue
+                if since is not None and key[0] < since or until is not None and key[0] >= until:
+                    continue
+                if after is not None and (key >= after if descending else key <= after):
+                    continue
+                yield key, thought
+
+        blocks = [number for number, _ in self._spilled_blocks(category, since, until)]
+        if not self.ordered:
+            # Blocks overlap in time: sort everything in the range
+            found = sorted(itertools.chain.from_iterable(items(number) for number in blocks), key=lambda item: item[0], reverse=descending)
+            yield from found
+            return
+        for number in reversed(blocks) if descending else blocks:
+            block = list(items(number))
+            yield from reversed(block) if descending else block
+
+    def _count_spilled(self, category: Optional[str], since: Optional[datetime.datetime], until: Optional[datetime.datetime]) -> int:
+        total = 0
+        for number, inside in self._spilled_blocks(category, since, until):
+            if inside:
+                total += self.categories[number].get(category, 0) if category is not None else SPILL_BLOCK
+            else:
+                total += sum(
+                    1 for thought in self._block(number)
+                    if (category is None or thought.category == category)
+                    and (since is None or thought.timestamp >= since)
+                    and (until is None or thought.timestamp < until)
+                )
+        return total
+
+    def page(
+        self,
+        limit: int,
+        category: Optional[str] = None,
+        after: Optional[TimeKey] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        descending: bool = False,
+        offset: int = 0
+    ) -> Tuple[List[Thought], int, Optional[TimeKey]]:
+        """Get a page of the history by timestamp (see ``page_keys``)"""
+        keys, total, _ = self.index.page(
+            offset + limit + 1, category, after=after, since=since, until=until, descending=descending
+        )
+        recent = [(key, self.recent[key[1] - self.spilled]) for key in keys]
+        total += self._count_spilled(category, since, until)
+
+        # The file is not read when the recent thoughts fill the page and
+        # every spilled one sorts past them
+        spilled = self._spilled_items(category, after, since, until, descending)
+        if self.spilled and len(keys) > offset + limit:
+            if keys[-1][0] >= self.latest if descending else keys[-1][0] < self.earliest:
+                spilled = iter(())
+        merged = heapq.merge(recent, spilled, key=lambda item: item[0], reverse=descending)
+        found = list(itertools.islice(merged, offset, offset + limit + 1))
+        page = found[:limit]
+        return [thought for _, thought in page], total, page[-1][0] if len(found) > limit else None
+
+class FrozenThoughts:
+    """The thoughts of a ``ThoughtHistory`` at one point in time.
+
+    The spill file is only ever appended to, so its first ``spilled``
+    lines stay the same however the history grows. Iterating reads them
+    back, then yields the copy of the thoughts that were in memory.
+    """
+
+    __slots__ = ("path", "spilled", "recent")
+
+    def __init__(self, path: str, spilled: int, recent: List[Thought]):
+        self.path = path
+        self.spilled = spilled
+        self.recent = recent
+
+    def __len__(self) -> int:
+        return self.spilled + len(self.recent)
+
+    def __iter__(self) -> Iterator[Thought]:
+        if self.spilled:
+            with open(self.path, "rb") as f:
+                for _, line in zip(range(self.spilled), f):
+                    yield Thought(**json.loads(line))
+        yield from self.recent
+
+def spill_paths(players: Iterable[Player]) -> List[str]:
+    """Get the spill files of the players' loaded thought histories"""
+    return [
+        player.__dict__["thought_history"].path
+        for player in players
+        if isinstance(player.__dict__.get("thought_history"), ThoughtHistory)
+    ]
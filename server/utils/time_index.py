@@ -0,0 +1,97 @@
+import base64
+import bisect
+import datetime
+from typing import List, Dict, Optional, Tuple
+
+# Position of an item in time order: its timestamp, then its index in the history
+TimeKey = Tuple[datetime.datetime, int]
+
+def encode_cursor(key: TimeKey) -> str:
+    """Encode a time key as an opaque pagination cursor"""
+    timestamp, position = key
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{position}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> TimeKey:
+    """Decode a pagination cursor, raising ValueError if it is not valid"""
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, position = data.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(timestamp), int(position)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def page_keys(
+    keys: List[TimeKey],
+    limit: int,
+    after: Optional[TimeKey] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    descending: bool = False,
+    offset: int = 0
+) -> Tuple[List[TimeKey], int, Optional[TimeKey]]:
+    """Get a page of sorted time keys.
+
+    Keys from ``since`` (inclusive) to ``until`` (exclusive) are paged in
+    time order, or newest first if ``descending``, starting past the key
+    ``after`` and then skipping ``offset`` keys. Returns the page, the
+    number of keys in the time range, and the key to continue after (None
+    on the last page). Only binary searches and the page itself are
+    touched, so the cost does not grow with the length of the history.
+    """
+    lo = bisect.bisect_left(keys, (since,)) if since is not None else 0
+    hi = bisect.bisect_left(keys, (until,)) if until is not None else len(keys)
+    total = max(hi - lo, 0)
+    if descending:
+        if after is not None:
+            hi = min(hi, bisect.bisect_left(keys, after))
+        hi -= offset
+        start = max(lo, hi - limit)
+        page = keys[start:hi][::-1] if hi > lo else []
+        more = start > lo
+    else:
+        if after is not None:
+            lo = max(lo, bisect.bisect_right(keys, after))
+        lo += offset
+        end = min(hi, lo + limit)
+        page = keys[lo:end] if hi > lo else []
+        more = end < hi
+    return page, total, page[-1] if page and more else None
+
+class TimeIndex:
+    """Time keys of a history, sorted, overall and per group.
+
+    Groups are a secondary key of each item (a thought's category, a
+    battle's opponent) so a filtered page is read from its own sorted
+    list. Histories are appended in time order, so adding a key is almost
+    always an append; an older timestamp is inserted in place.
+    """
+
+    __slots__ = ("keys", "groups")
+
+    def __init__(self):
+        self.keys: List[TimeKey] = []
+        self.groups: Dict[str, List[TimeKey]] = {}
+
+    def add(self, timestamp: datetime.datetime, position: int, group: str) -> None:
+        """Add the key of an item"""
+        key = (timestamp, position)
+        for keys in (self.keys, self.groups.setdefault(group, [])):
+            if not keys or keys[-1] <= key:
+                keys.append(key)
+            else:
+                bisect.insort(keys, key)
+
+    def page(self, limit: int, group: Optional[str] = None, **options) -> Tuple[List[TimeKey], int, Optional[TimeKey]]:
+        """Get a page of keys, optionally only those of one group (see ``page_keys``)"""
+        keys = self.keys if group is None else self.groups.get(group, [])
+        return page_keys(keys, limit, **options)
+
+    def drop_before(self, position: int) -> None:
+        """Drop the keys of the items before ``position``"""
+        self.keys = [key for key in self.keys if key[1] >= position]
+        for group, keys in list(self.groups.items()):
+            keys = [key for key in keys if key[1] >= position]
+            if keys:
+                self.groups[group] = keys
+            else:
+                del self.groups[group]
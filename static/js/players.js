@@ -5,6 +5,9 @@ let currentPlayerId = null;
 let currentPage = 1;
 const perPage = 10;
 
+// Player summaries, in creation order, kept up to date by the change stream
+const players = new Map();
+
 // DOM Elements
 const playersTableBody = document.getElementById('playersTableBody');
 const pagination = document.getElementById('pagination');
@@ -14,8 +17,8 @@ const teamContainer = document.getElementById('teamContainer');
 
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', async () => {
-    // Load players
-    await loadPlayers();
+    // Load players and follow their changes
+    followChanges();
     
     // Set up event listeners
     if (addPokemonBtn) {
@@ -30,18 +33,113 @@ document.addEventListener('DOMContentLoaded', async () => {
     addPokemonInput();
 });
 
-// Load players from API
-async function loadPlayers() {
-    try {
-        const result = await apiRequest(`/players/?page=${currentPage}&per_page=${perPage}`);
-        
-        if (result.success) {
-            renderPlayers(result.data);
-            renderPagination(result);
+// Follow the players' changes: a snapshot first, then the changes as they happen.
+// The browser reconnects on its own, resuming from the last change it received.
+function followChanges() {
+    const stream = new EventSource(`${API_BASE_URL}/players/changes/stream`);
+    
+    stream.addEventListener('snapshot', (event) => {
+        const data = JSON.parse(event.data);
+        players.clear();
+        data.players.forEach(player => players.set(player.id, player));
+        loadPlayers();
+        refreshPlayerDetails(null);
+    });
+    
+    stream.addEventListener('changes', (event) => {
+        const data = JSON.parse(event.data);
+        data.changes.forEach(applyChange);
+        loadPlayers();
+        refreshPlayerDetails(data.changes);
+    });
+}
+
+// Apply a change to the local player summaries
+function applyChange(change) {
+    const data = change.data;
+    
+    if (change.op === 'create_player') {
+        const { thought_history, battle_history, matchup_records, team_snapshots, ...summary } = data;
+        players.set(change.player_id, { ...summary, thought_count: 0, battle_count: 0 });
+        return;
+    }
+    if (change.op === 'delete_player') {
+        players.delete(change.player_id);
+        return;
+    }
+    
+    const player = players.get(change.player_id);
+    if (!player) {
+        return;
+    }
+    
+    player.last_updated = change.timestamp;
+    switch (change.op) {
+        case 'update_player':
+            player.name = data.name;
+            player.location = data.location;
+            break;
+        case 'add_pokemon':
+            player.team.push(data.pokemon);
+            break;
+        case 'remove_pokemon':
+            player.team.splice(data.index, 1);
+            break;
+        case 'add_thought':
+            player.thought_count += 1;
+            break;
+        case 'start_battle':
+            player.battle_count += 1;
+            break;
+    }
+}
+
+// Update the open player's details after changes to it (or after a snapshot)
+function refreshPlayerDetails(changes) {
+    const modal = document.getElementById('playerDetailsModal');
+    if (!currentPlayerId || !modal.classList.contains('show')) {
+        return;
+    }
+    
+    const touched = new Set();
+    (changes || [{ player_id: currentPlayerId, collections: ['profile', 'team', 'thoughts', 'battles', 'matchups'] }])
+        .filter(change => change.player_id === currentPlayerId)
+        .forEach(change => change.collections.forEach(collection => touched.add(collection)));
+    if (touched.size === 0) {
+        return;
+    }
+    
+    const player = players.get(currentPlayerId);
+    if (player) {
+        document.getElementById('playerDetailsTitle').textContent = `Player: ${player.name}`;
+        if (touched.has('team')) {
+            loadTeamTab(player);
+        }
+        if (touched.has('profile')) {
+            loadLocationTab(player);
         }
-    } catch (error) {
-        console.error('Error loading players:', error);
     }
+    
+    // Histories are not kept locally: reload the open tab if its history changed
+    const activeTab = modal.querySelector('.nav-link.active');
+    const target = activeTab ? activeTab.getAttribute('data-bs-target').substring(1) : null;
+    if (target === 'thoughts' && touched.has('thoughts')) {
+        loadThoughtsTab(currentPlayerId);
+    } else if (target === 'battles' && touched.has('battles')) {
+        loadBattlesTab(currentPlayerId);
+    } else if (target === 'matchups' && touched.has('matchups')) {
+        loadMatchupsTab(currentPlayerId);
+    }
+}
+
+// Render the current page of players
+function loadPlayers() {
+    const all = Array.from(players.values());
+    const totalPages = Math.max(1, Math.ceil(all.length / perPage));
+    currentPage = Math.min(currentPage, totalPages);
+    
+    renderPlayers(all.slice((currentPage - 1) * perPage, currentPage * perPage));
+    renderPagination({ page: currentPage, total_pages: totalPages });
 }
 
 // Render players table
@@ -385,7 +483,7 @@ async function createPlayer() {
         if (result.success) {
             showAlert(`Player ${playerName} created successfully`, 'success');
             
-            // Close modal and reload players
+            // Close modal; the new player arrives through the change stream
             const modal = bootstrap.Modal.getInstance(document.getElementById('createPlayerModal'));
             modal.hide();
             
@@ -393,9 +491,6 @@ async function createPlayer() {
             document.getElementById('createPlayerForm').reset();
             teamContainer.innerHTML = '';
             addPokemonInput();
-            
-            // Reload players
-            await loadPlayers();
         }
     } catch (error) {
         console.error('Error creating player:', error);
@@ -406,7 +501,10 @@ async function createPlayer() {
 async function viewPlayer(playerId) {
     try {
         currentPlayerId = playerId;
-        const result = await apiRequest(`/players/${playerId}`);
+        // The summary kept by the change stream has everything shown here
+        const result = players.has(playerId)
+            ? { success: true, data: players.get(playerId) }
+            : await apiRequest(`/players/${playerId}?fields=name,team,location`);
         
         if (result.success) {
             const player = result.data;
@@ -568,7 +666,7 @@ async function loadThoughtsTab(playerId) {
         const thoughtsContent = document.getElementById('thoughtsContent');
         thoughtsContent.innerHTML = '<div class="spinner-container"><div class="spinner-border" role="status"></div></div>';
         
-        const result = await apiRequest(`/players/${playerId}/thoughts`);
+        const result = await apiRequest(`/players/${playerId}/thoughts?order=desc`);
         
         if (result.success) {
             const thoughts = result.data.thoughts;
@@ -604,7 +702,7 @@ async function loadBattlesTab(playerId) {
         const battlesContent = document.getElementById('battlesContent');
         battlesContent.innerHTML = '<div class="spinner-container"><div class="spinner-border" role="status"></div></div>';
         
-        const result = await apiRequest(`/players/${playerId}/battles`);
+        const result = await apiRequest(`/players/${playerId}/battles?order=desc`);
         
         if (result.success) {
             const battles = result.data.battles;
@@ -845,7 +943,7 @@ function showAddBattleModal(playerId) {
 // View battle details
 async function viewBattleDetails(playerId, battleId) {
     try {
-        const result = await apiRequest(`/players/${playerId}/battles/${battleId}`);
+        const result = await apiRequest(`/players/${playerId}/battles/${battleId}?expand_teams=true`);
         
         if (result.success) {
             const battle = result.data;
@@ -949,31 +1047,10 @@ async function viewBattleDetails(playerId, battleId) {
                     </div>
                 </div>
                 
-                ${battle.turns.length > 0 ? `
-                    <h6 class="mt-4">Battle Log</h6>
-                    <div class="battle-log p-3 bg-light" style="max-height: 300px; overflow-y: auto;">
-                        ${battle.turns.map(turn => `
-                            <div class="mb-2">
-                                <strong>Turn ${turn.turn_number}:</strong>
-                                <div>
-                                    <span class="text-primary">You:</span> 
-                                    ${formatBattleAction(turn.player_action)}
-                                </div>
-                                ${turn.opponent_action ? `
-                                    <div>
-                                        <span class="text-danger">Opponent:</span> 
-                                        ${formatBattleAction(turn.opponent_action)}
-                                    </div>
-                                ` : ''}
-                                ${turn.effects.length > 0 ? `
-                                    <div class="small text-muted">
-                                        ${turn.effects.join('<br>')}
-                                    </div>
-                                ` : ''}
-                            </div>
-                        `).join('')}
-                    </div>
-                ` : ''}
+                <h6 class="mt-4">Battle Log</h6>
+                <div class="battle-log p-3 bg-light" id="battleLog" style="max-height: 300px; overflow-y: auto;">
+                    <p class="text-center text-muted mb-0" id="battleLogEmpty">No turns recorded</p>
+                </div>
             `;
             
             // Add battle result buttons if battle is in progress
@@ -1009,6 +1086,9 @@ async function viewBattleDetails(playerId, battleId) {
                 });
             }
             
+            // Stream the battle log: stored turns are replayed, then new ones arrive as they are recorded
+            streamBattleLog(playerId, battleId);
+            
             // Show modal
             const modal = new bootstrap.Modal(document.getElementById('battleDetailsModal'));
             modal.show();
@@ -1018,22 +1098,48 @@ async function viewBattleDetails(playerId, battleId) {
     }
 }
 
-// Format battle action for display
-function formatBattleAction(action) {
-    if (!action) return 'No action';
-    
-    switch (action.action_type) {
-        case 'move':
-            return `Used move ${action.move_index + 1} with Pokemon ${action.pokemon_index + 1}${action.target_index !== null ? ` targeting position ${action.target_index + 1}` : ''}`;
+// Format a turn event for display
+function formatTurnEvent(turn) {
+    switch (turn.action) {
         case 'switch':
-            return `Switched to Pokemon ${action.pokemon_index + 1}`;
+            return `${turn.actor} was switched out for ${turn.switch_in}`;
         case 'item':
-            return `Used item ${action.item_name} on Pokemon ${action.pokemon_index + 1}`;
-        case 'run':
-            return 'Attempted to run';
+            return `${turn.actor} used ${turn.item}`;
         default:
-            return `Unknown action: ${action.action_type}`;
+            return `${turn.actor} used ${turn.move}${turn.target ? ` on ${turn.target}` : ''}` +
+                (turn.damage != null ? ` (${turn.damage} damage${turn.hp_after != null ? `, ${turn.hp_after} HP left` : ''})` : '');
+    }
+}
+
+// Follow a battle's turns over server-sent events until it ends or the modal closes
+let battleLogStream = null;
+
+function streamBattleLog(playerId, battleId) {
+    if (battleLogStream) {
+        battleLogStream.close();
     }
+    
+    const stream = new EventSource(`${API_BASE_URL}/players/${playerId}/battles/${battleId}/stream`);
+    battleLogStream = stream;
+    
+    stream.addEventListener('turn', event => {
+        const { turn } = JSON.parse(event.data);
+        const battleLog = document.getElementById('battleLog');
+        const empty = document.getElementById('battleLogEmpty');
+        if (empty) empty.remove();
+        
+        const entry = document.createElement('div');
+        entry.className = 'mb-2';
+        entry.innerHTML = `<strong>Turn ${turn.turn}:</strong> ${formatTurnEvent(turn)}`;
+        battleLog.appendChild(entry);
+        battleLog.scrollTop = battleLog.scrollHeight;
+    });
+    
+    // Without a close the browser would reconnect and replay the battle again
+    stream.addEventListener('end', () => stream.close());
+    stream.addEventListener('closed', () => stream.close());
+    
+    document.getElementById('battleDetailsModal').addEventListener('hidden.bs.modal', () => stream.close(), { once: true });
 }
 
 // Delete player
@@ -1047,7 +1153,6 @@ async function deletePlayer(playerId) {
         
         if (result.success) {
             showAlert('Player deleted successfully', 'success');
-            await loadPlayers();
         }
     } catch (error) {
         console.error('Error deleting player:', error);
@@ -9,6 +9,9 @@ from typing import Dict, List, Any
 # Set the base URL for the API
 BASE_URL = "http://localhost:8000/api"
 
+# Write-ahead log directory of a server running from this checkout
+WAL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server", "data", "wal")
+
 class PokemonPlayerStateTrackerTest(unittest.TestCase):
     """Test cases for the Pokemon Player State Tracker API"""
     
@@ -351,6 +354,902 @@ class PokemonPlayerStateTrackerTest(unittest.TestCase):
         self.assertTrue(data["success"])
         backup_id = data["data"]["backup_id"]
         self.created_resources["saves"].append(backup_id)
+    
+    def test_save_jobs(self):
+        """Test background save jobs"""
+        # Create player
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        def wait_for(job_id):
+            for _ in range(50):
+                response = requests.get(f"{BASE_URL}/saves/jobs/{job_id}")
+                self.assertEqual(response.status_code, 200)
+                job = response.json()["data"]
+                if job["status"] in ("completed", "failed"):
+                    return job
+                time.sleep(0.1)
+            self.fail(f"Save job {job_id} did not finish")
+        
+        # Submit a create job
+        response = requests.post(f"{BASE_URL}/saves/jobs/", json={"action": "create", **self.test_save})
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertTrue(data["success"])
+        
+        job = wait_for(data["data"]["id"])
+        self.assertEqual(job["status"], "completed")
+        save_id = job["result"]["id"]
+        self.created_resources["saves"].append(save_id)
+        
+        # Submit an update job
+        response = requests.post(f"{BASE_URL}/saves/jobs/", json={"action": "update", "save_id": save_id})
+        self.assertEqual(response.status_code, 202)
+        job = wait_for(response.json()["data"]["id"])
+        self.assertEqual(job["status"], "completed")
+        
+        # Jobs for missing saves fail
+        response = requests.post(f"{BASE_URL}/saves/jobs/", json={"action": "load", "save_id": "missing_save"})
+        self.assertEqual(response.status_code, 202)
+        job = wait_for(response.json()["data"]["id"])
+        self.assertEqual(job["status"], "failed")
+        self.assertIsNotNone(job["error"])
+        
+        # Invalid actions are rejected
+        response = requests.post(f"{BASE_URL}/saves/jobs/", json={"action": "format_disk"})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_lazy_load(self):
+        """Test loading a save with lazily read histories"""
+        # Create player with a thought
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        thought = {"content": "Remember to heal before the gym", "category": "general"}
+        response = requests.post(f"{BASE_URL}/players/{player_id}/thoughts", json=thought)
+        self.assertEqual(response.status_code, 200)
+        
+        # Create save
+        response = requests.post(f"{BASE_URL}/saves/", json=self.test_save)
+        self.assertEqual(response.status_code, 200)
+        save_id = response.json()["data"]["id"]
+        self.created_resources["saves"].append(save_id)
+        
+        # Load it lazily
+        response = requests.post(f"{BASE_URL}/saves/{save_id}/load", params={"lazy": True})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["success"])
+        
+        # Histories are read on first access
+        response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data["data"]["thoughts"]), 1)
+        self.assertEqual(data["data"]["thoughts"][0]["content"], thought["content"])
+    
+    def test_backup_restore(self):
+        """Test backup verification, restore and deletion"""
+        # Create player and save
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        response = requests.post(f"{BASE_URL}/saves/", json=self.test_save)
+        self.assertEqual(response.status_code, 200)
+        save_id = response.json()["data"]["id"]
+        self.created_resources["saves"].append(save_id)
+        
+        # Create backup
+        response = requests.post(f"{BASE_URL}/saves/{save_id}/backup")
+        self.assertEqual(response.status_code, 200)
+        backup_id = response.json()["data"]["backup_id"]
+        
+        # List and verify backups
+        response = requests.get(f"{BASE_URL}/saves/backups/", params={"save_id": save_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(backup_id, [backup["id"] for backup in response.json()["data"]["backups"]])
+        
+        response = requests.get(f"{BASE_URL}/saves/backups/{backup_id}/verify")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["data"]["ok"])
+        
+        # Restore as a new save
+        response = requests.post(f"{BASE_URL}/saves/backups/{backup_id}/restore")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data["success"])
+        self.assertEqual(data["data"]["id"], backup_id)
+        self.created_resources["saves"].append(backup_id)
+        
+        response = requests.get(f"{BASE_URL}/saves/{backup_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["name"], self.test_save["name"])
+        
+        # Delete backup and collect its chunks
+        response = requests.delete(f"{BASE_URL}/saves/backups/{backup_id}")
+        self.assertEqual(response.status_code, 200)
+        response = requests.post(f"{BASE_URL}/saves/backups/gc")
+        self.assertEqual(response.status_code, 200)
+        
+        response = requests.get(f"{BASE_URL}/saves/backups/{backup_id}/verify")
+        self.assertEqual(response.status_code, 404)
+    
+    def test_autosave(self):
+        """Test background autosave into an existing save"""
+        # Create save to autosave into
+        response = requests.post(f"{BASE_URL}/saves/", json=self.test_save)
+        self.assertEqual(response.status_code, 200)
+        save_id = response.json()["data"]["id"]
+        self.created_resources["saves"].append(save_id)
+        
+        response = requests.put(f"{BASE_URL}/saves/autosave", json={"interval": 0.2, "save_id": save_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["data"]["enabled"])
+        
+        try:
+            # Make a burst of changes
+            response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+            self.assertEqual(response.status_code, 200)
+            player_id = response.json()["data"]["player_id"]
+            self.created_resources["players"].append(player_id)
+            
+            for i in range(5):
+                response = requests.post(f"{BASE_URL}/players/{player_id}/thoughts", json={"content": f"Thought {i}"})
+                self.assertEqual(response.status_code, 200)
+            
+            # Wait for the autosave to write them
+            for _ in range(50):
+                status = requests.get(f"{BASE_URL}/saves/autosave").json()["data"]
+                if status["pending"] == 0 and status["writes"] > 0:
+                    break
+                time.sleep(0.1)
+            self.assertEqual(status["pending"], 0)
+            self.assertIsNone(status["last_error"])
+            
+            response = requests.get(f"{BASE_URL}/saves/{save_id}")
+            self.assertEqual(response.status_code, 200)
+            saved = {player["id"]: player for player in response.json()["data"]["players"]}
+            self.assertEqual(len(saved[player_id]["thought_history"]), 5)
+            
+            # Missing saves are rejected
+            response = requests.put(f"{BASE_URL}/saves/autosave", json={"interval": 0.2, "save_id": "missing_save"})
+            self.assertEqual(response.status_code, 404)
+        finally:
+            requests.put(f"{BASE_URL}/saves/autosave", json={"interval": 0})
+    
+    def test_export_import(self):
+        """Test streaming a save out as NDJSON and back in"""
+        # Create player with a thought and a battle
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        response = requests.post(f"{BASE_URL}/players/{player_id}/thoughts", json={"content": "Export me"})
+        self.assertEqual(response.status_code, 200)
+        response = requests.post(f"{BASE_URL}/players/{player_id}/battles", json={"opponent_id": "cheren", "opponent_name": "Cheren"})
+        self.assertEqual(response.status_code, 200)
+        
+        # Create save
+        response = requests.post(f"{BASE_URL}/saves/", json=self.test_save)
+        self.assertEqual(response.status_code, 200)
+        save_id = response.json()["data"]["id"]
+        self.created_resources["saves"].append(save_id)
+        
+        # Export save
+        response = requests.get(f"{BASE_URL}/saves/{save_id}/export")
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(lines[0]["type"], "save")
+        types = [line["type"] for line in lines]
+        self.assertIn("player", types)
+        self.assertIn("thought", types)
+        self.assertIn("battle", types)
+        
+        # Import it as a new save
+        response = requests.post(f"{BASE_URL}/saves/import", data=response.content, params={"name": "Imported Save"})
+        self.assertEqual(response.status_code, 200)
+        imported_id = response.json()["data"]["id"]
+        self.created_resources["saves"].append(imported_id)
+        
+        original = requests.get(f"{BASE_URL}/saves/{save_id}").json()["data"]
+        imported = requests.get(f"{BASE_URL}/saves/{imported_id}").json()["data"]
+        self.assertEqual(imported["name"], "Imported Save")
+        self.assertEqual(imported["players"], original["players"])
+        
+        # Malformed streams are rejected
+        response = requests.post(f"{BASE_URL}/saves/import", data=b'{"type": "player", "data": {}}\n')
+        self.assertEqual(response.status_code, 400)
+        response = requests.post(f"{BASE_URL}/saves/import", data=json.dumps(lines[0]).encode() + b'\n[1]\n')
+        self.assertEqual(response.status_code, 400)
+        
+        # Player IDs name directories, so they must be plain names
+        escaping = [dict(line, data=dict(line["data"], id="../../escaped")) if line["type"] == "player" else line for line in lines[:2]]
+        response = requests.post(f"{BASE_URL}/saves/import", data="\n".join(json.dumps(line) for line in escaping).encode())
+        self.assertEqual(response.status_code, 400)
+    
+    def test_battle_lookup(self):
+        """Test looking up battles by ID and by opponent"""
+        # Create player
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        # Start battles against two opponents
+        battle_ids = []
+        for opponent_id in ["cheren", "bianca", "cheren"]:
+            response = requests.post(f"{BASE_URL}/players/{player_id}/battles", json={"opponent_id": opponent_id, "opponent_name": opponent_id.title()})
+            self.assertEqual(response.status_code, 200)
+            battle_ids.append(response.json()["data"]["battle_id"])
+        
+        # End one and look it up
+        response = requests.put(f"{BASE_URL}/players/{player_id}/battles/{battle_ids[2]}", params={"result": "win"})
+        self.assertEqual(response.status_code, 200)
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/battles/{battle_ids[2]}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["result"], "win")
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/battles/battle_missing")
+        self.assertEqual(response.status_code, 404)
+        
+        # Filter by opponent
+        response = requests.get(f"{BASE_URL}/players/{player_id}/battles", params={"opponent_id": "cheren"})
+        self.assertEqual(response.status_code, 200)
+        battles = response.json()["data"]["battles"]
+        self.assertEqual([battle["id"] for battle in battles], [battle_ids[0], battle_ids[2]])
+    
+    def test_battle_turns(self):
+        """Test appending turns to a battle and reading them back"""
+        # Create player and start a battle
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        response = requests.post(f"{BASE_URL}/players/{player_id}/battles", json={"opponent_id": "cheren", "opponent_name": "Cheren"})
+        self.assertEqual(response.status_code, 200)
+        battle_id = response.json()["data"]["battle_id"]
+        turns_url = f"{BASE_URL}/players/{player_id}/battles/{battle_id}/turns"
+        
+        # Append one turn, then a batch
+        response = requests.post(turns_url, json={"turn": 1, "actor": "Oshawott", "move": "Tackle", "target": "Snivy", "damage": 7, "hp_after": 38})
+        self.assertEqual(response.status_code, 200)
+        
+        response = requests.post(f"{turns_url}/batch", json=[
+            {"turn": 1, "actor": "Snivy", "move": "Vine Whip", "target": "Oshawott", "damage": 9, "hp_after": 46},
+            {"turn": 2, "actor": "Snivy", "action": "switch", "switch_in": "Patrat"},
+            {"turn": 3, "actor": "Oshawott", "action": "item", "item": "Potion", "hp_after": 55}
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["total"], 4)
+        
+        # A turn before the last one is rejected
+        response = requests.post(turns_url, json={"turn": 2, "actor": "Patrat", "move": "Tackle"})
+        self.assertEqual(response.status_code, 400)
+        
+        # Turns come back in order, also as part of the battle
+        response = requests.get(turns_url, params={"offset": 1, "limit": 2})
+        self.assertEqual(response.status_code, 200)
+        turns = response.json()["data"]["turns"]
+        self.assertEqual([turn["actor"] for turn in turns], ["Snivy", "Snivy"])
+        self.assertEqual(turns[1], {"turn": 2, "actor": "Snivy", "action": "switch", "switch_in": "Patrat"})
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/battles/{battle_id}")
+        self.assertEqual([turn["turn"] for turn in response.json()["data"]["turns"]], [1, 1, 2, 3])
+        
+        # Ended battles take no more turns
+        response = requests.put(f"{BASE_URL}/players/{player_id}/battles/{battle_id}", params={"result": "win"})
+        self.assertEqual(response.status_code, 200)
+        response = requests.post(turns_url, json={"turn": 4, "actor": "Oshawott", "move": "Tackle"})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_ended_battle_details(self):
+        """Test that an ended battle's turns can still be read"""
+        # Create player and play a battle
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        response = requests.post(f"{BASE_URL}/players/{player_id}/battles", json={"opponent_id": "cheren", "opponent_name": "Cheren"})
+        battle_id = response.json()["data"]["battle_id"]
+        turns = [{"turn": turn, "actor": "Oshawott", "move": "Tackle", "damage": 5, "hp_after": 40 - 5 * turn} for turn in range(1, 6)]
+        response = requests.post(f"{BASE_URL}/players/{player_id}/battles/{battle_id}/turns/batch", json=turns)
+        self.assertEqual(response.status_code, 200)
+        
+        # End it; the details, turns included, are still returned
+        response = requests.put(f"{BASE_URL}/players/{player_id}/battles/{battle_id}", params={"result": "loss"})
+        self.assertEqual(response.status_code, 200)
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/battles/{battle_id}")
+        self.assertEqual(response.status_code, 200)
+        battle = response.json()["data"]
+        self.assertEqual(battle["result"], "loss")
+        self.assertEqual([turn["hp_after"] for turn in battle["turns"]], [35, 30, 25, 20, 15])
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/battles/{battle_id}/turns", params={"offset": 4})
+        self.assertEqual(response.json()["data"]["turns"], [{"turn": 5, "actor": "Oshawott", "action": "move", "move": "Tackle", "damage": 5, "hp_after": 15}])
+    
+    def test_matchup_stats(self):
+        """Test the rolling statistics kept with matchup records"""
+        # Create player
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        # Play four battles against the same opponent
+        for result in ["win", "win", "loss", "win"]:
+            response = requests.post(f"{BASE_URL}/players/{player_id}/battles", json={"opponent_id": "cheren", "opponent_name": "Cheren"})
+            battle_id = response.json()["data"]["battle_id"]
+            response = requests.put(f"{BASE_URL}/players/{player_id}/battles/{battle_id}", params={"result": result})
+            self.assertEqual(response.status_code, 200)
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/matchups")
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()["data"]["stats"]["cheren"]
+        self.assertEqual(stats["recent"]["battles"], 4)
+        self.assertEqual(stats["recent"]["win_rate"], 0.75)
+        self.assertEqual(stats["streak"], {"result": "win", "length": 1})
+        self.assertEqual(stats["best_win_streak"], 2)
+        self.assertEqual(stats["last_24h"]["wins"], 3)
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/matchups/cheren")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["matchup"]["recent_results"], "wwlw")
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/matchups/bianca")
+        self.assertEqual(response.status_code, 404)
+    
+    def test_team_snapshots(self):
+        """Test that battles share a snapshot of an unchanged team"""
+        # Create player
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        # Two battles with the same team refer to one snapshot
+        battle_ids = []
+        for opponent_id in ["cheren", "bianca"]:
+            response = requests.post(f"{BASE_URL}/players/{player_id}/battles", json={"opponent_id": opponent_id, "opponent_name": opponent_id.title()})
+            self.assertEqual(response.status_code, 200)
+            battle_ids.append(response.json()["data"]["battle_id"])
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/battles")
+        battles = response.json()["data"]["battles"]
+        self.assertEqual(battles[0]["player_team_id"], battles[1]["player_team_id"])
+        self.assertEqual(battles[0]["player_team"], [])
+        snapshot_id = battles[0]["player_team_id"]
+        
+        # The team is filled in on request
+        response = requests.get(f"{BASE_URL}/players/{player_id}/battles/{battle_ids[0]}", params={"expand_teams": True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([pokemon["name"] for pokemon in response.json()["data"]["player_team"]], ["Oshawott"])
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/teams/{snapshot_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]["team"]), 1)
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/teams/team_missing")
+        self.assertEqual(response.status_code, 404)
+        
+        # A changed team gets a new snapshot
+        response = requests.post(f"{BASE_URL}/players/{player_id}/team", json=self.test_player["team"][0])
+        self.assertEqual(response.status_code, 200)
+        response = requests.post(f"{BASE_URL}/players/{player_id}/battles", json={"opponent_id": "hugh", "opponent_name": "Hugh"})
+        self.assertEqual(response.status_code, 200)
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/teams")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]["teams"]), 2)
+    
+    def test_history_pagination(self):
+        """Test paging through thoughts newest first with a cursor"""
+        # Create player and add thoughts in two categories
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        for i in range(7):
+            thought = {"content": f"Thought {i}", "category": "battle" if i % 2 else "strategy"}
+            response = requests.post(f"{BASE_URL}/players/{player_id}/thoughts", json=thought)
+            self.assertEqual(response.status_code, 200)
+        
+        # Follow the cursor until the last page
+        contents = []
+        params = {"limit": 3, "order": "desc"}
+        while True:
+            response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts", params=params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()["data"]
+            self.assertEqual(data["pagination"]["total"], 7)
+            contents += [thought["content"] for thought in data["thoughts"]]
+            if data["pagination"]["next_cursor"] is None:
+                break
+            params["cursor"] = data["pagination"]["next_cursor"]
+        self.assertEqual(contents, [f"Thought {i}" for i in reversed(range(7))])
+        
+        # Filter by category and time range
+        response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts", params={"category": "battle"})
+        self.assertEqual([thought["content"] for thought in response.json()["data"]["thoughts"]], ["Thought 1", "Thought 3", "Thought 5"])
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts", params={"until": "2000-01-01T00:00:00"})
+        self.assertEqual(response.json()["data"]["thoughts"], [])
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts", params={"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_species_analytics(self):
+        """Test per-species counters over a player's battles"""
+        # Create player and play one battle
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        # Read the counters first so they are kept up to date from here on
+        response = requests.get(f"{BASE_URL}/players/{player_id}/analytics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["species"], {})
+        
+        response = requests.post(f"{BASE_URL}/players/{player_id}/battles", json={"opponent_id": "cheren", "opponent_name": "Cheren"})
+        battle_id = response.json()["data"]["battle_id"]
+        turns = [
+            {"turn": 1, "actor": "Snivy", "move": "Tackle", "target": "Oshawott", "damage": 8, "hp_after": 47},
+            {"turn": 1, "actor": "Oshawott", "move": "Water Gun", "target": "Snivy", "damage": 20, "hp_after": 25},
+            {"turn": 2, "actor": "Oshawott", "move": "Water Gun", "target": "Snivy", "damage": 25, "hp_after": 0}
+        ]
+        response = requests.post(f"{BASE_URL}/players/{player_id}/battles/{battle_id}/turns/batch", json=turns)
+        self.assertEqual(response.status_code, 200)
+        response = requests.put(f"{BASE_URL}/players/{player_id}/battles/{battle_id}", params={"result": "win"})
+        self.assertEqual(response.status_code, 200)
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/analytics/Oshawott")
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()["data"]
+        self.assertEqual(stats["appearances"], 1)
+        self.assertEqual(stats["wins"], 1)
+        self.assertEqual(stats["kos"], 1)
+        self.assertEqual(stats["faints"], 0)
+        self.assertEqual(stats["damage_dealt"], 45)
+        self.assertEqual(stats["damage_taken"], 8)
+        
+        # A rebuild from the history gives the same counters
+        response = requests.post(f"{BASE_URL}/players/{player_id}/analytics/rebuild")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["species"]["Oshawott"], {key: value for key, value in stats.items() if key != "species"})
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/analytics/Snivy")
+        self.assertEqual(response.status_code, 404)
+    
+    def test_battle_stream(self):
+        """Test streaming a battle's turns as server-sent events"""
+        # Create player and start a battle
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        response = requests.post(f"{BASE_URL}/players/{player_id}/battles", json={"opponent_id": "cheren", "opponent_name": "Cheren"})
+        battle_id = response.json()["data"]["battle_id"]
+        battle_url = f"{BASE_URL}/players/{player_id}/battles/{battle_id}"
+        requests.post(f"{battle_url}/turns", json={"turn": 1, "actor": "Oshawott", "move": "Tackle", "target": "Snivy"})
+        
+        # A viewer gets the stored turn, then the ones recorded while it watches
+        with requests.get(f"{battle_url}/stream", stream=True, timeout=10) as stream:
+            self.assertEqual(stream.status_code, 200)
+            self.assertTrue(stream.headers["content-type"].startswith("text/event-stream"))
+            requests.post(f"{battle_url}/turns", json={"turn": 2, "actor": "Oshawott", "move": "Water Gun", "target": "Snivy"})
+            requests.put(battle_url, params={"result": "win"})
+            lines = [line.decode() for line in stream.iter_lines() if line]
+        
+        events = [line[len("event: "):] for line in lines if line.startswith("event: ")]
+        self.assertEqual(events, ["turn", "turn", "end"])
+        turns = [json.loads(line[len("data: "):]) for line in lines if line.startswith("data: ")][:2]
+        self.assertEqual([turn["turn"]["move"] for turn in turns], ["Tackle", "Water Gun"])
+        
+        # An ended battle is replayed from a given turn
+        with requests.get(f"{battle_url}/stream", params={"from_turn": 2}, stream=True, timeout=10) as stream:
+            lines = [line.decode() for line in stream.iter_lines() if line]
+        self.assertEqual([line for line in lines if line.startswith("id: ")], ["id: 1"])
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/battles/battle_missing/stream")
+        self.assertEqual(response.status_code, 404)
+    
+    def test_long_thought_history(self):
+        """Test that older thoughts spilled out of memory are still paged"""
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        # Add more thoughts than the default retention keeps in memory
+        with requests.Session() as session:
+            for i in range(1300):
+                response = session.post(f"{BASE_URL}/players/{player_id}/thoughts", json={"content": f"Thought {i}"})
+                self.assertEqual(response.status_code, 200)
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts", params={"limit": 3})
+        data = response.json()["data"]
+        self.assertEqual(data["pagination"]["total"], 1300)
+        self.assertEqual([thought["content"] for thought in data["thoughts"]], ["Thought 0", "Thought 1", "Thought 2"])
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts", params={"limit": 3, "cursor": data["pagination"]["next_cursor"]})
+        self.assertEqual([thought["content"] for thought in response.json()["data"]["thoughts"]], ["Thought 3", "Thought 4", "Thought 5"])
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts", params={"limit": 2, "order": "desc"})
+        self.assertEqual([thought["content"] for thought in response.json()["data"]["thoughts"]], ["Thought 1299", "Thought 1298"])
+        
+        # The full player still has the whole history
+        response = requests.get(f"{BASE_URL}/players/{player_id}")
+        thoughts = response.json()["data"]["thought_history"]
+        self.assertEqual(len(thoughts), 1300)
+        self.assertEqual(thoughts[0]["content"], "Thought 0")
+    
+    def test_thought_search(self):
+        """Test searching thoughts by words and phrases"""
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        contents = [
+            "Drayden leads with Haxorus, so bring an Ice type",
+            "The route to Opelucid is blocked",
+            "Ice type moves cover Drayden's dragon team",
+            "Drayden again: Haxorus hits hard, Haxorus is fast"
+        ]
+        for content in contents:
+            response = requests.post(f"{BASE_URL}/players/{player_id}/thoughts", json={"content": content})
+            self.assertEqual(response.status_code, 200)
+        
+        # Every word must match; the thought naming Haxorus twice ranks first
+        response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts/search", params={"q": "drayden haxorus"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(data["total"], 2)
+        self.assertEqual([result["thought"]["content"] for result in data["results"]], [contents[3], contents[0]])
+        
+        # Quoted words must appear together, in order
+        response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts/search", params={"q": '"ice type" dragon'})
+        self.assertEqual([result["thought"]["content"] for result in response.json()["data"]["results"]], [contents[2]])
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts/search", params={"q": '"type ice"'})
+        self.assertEqual(response.json()["data"]["total"], 0)
+        
+        # Search across every player
+        response = requests.get(f"{BASE_URL}/players/thoughts/search", params={"q": "opelucid"})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["data"]["results"]
+        self.assertIn(player_id, [result["player_id"] for result in results])
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/thoughts/search", params={"q": "!!"})
+        self.assertEqual(response.status_code, 400)
+        
+        response = requests.get(f"{BASE_URL}/players/player_missing/thoughts/search", params={"q": "drayden"})
+        self.assertEqual(response.status_code, 404)
+    
+    def test_batch_ingestion(self):
+        """Test applying thoughts, battles and moves in one batch"""
+        player_ids = []
+        for _ in range(2):
+            response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+            self.assertEqual(response.status_code, 200)
+            player_ids.append(response.json()["data"]["player_id"])
+            self.created_resources["players"].append(player_ids[-1])
+        first, second = player_ids
+        
+        items = [
+            {"type": "thought", "player_id": first, "content": "Batched thought"},
+            {"type": "battle_start", "player_id": second, "opponent_id": "iris", "opponent_name": "Iris"},
+            {"type": "battle_end", "player_id": second, "battle_id": "battle_1", "result": "win"},
+            {"type": "location", "player_id": first, "location": {"location_tuple": ["Unova", "Opelucid City"]}},
+            {"type": "battle_end", "player_id": second, "battle_id": "battle_9", "result": "win"},
+            {"type": "thought", "player_id": first},
+            {"type": "thought", "player_id": "player_missing", "content": "Nobody"}
+        ]
+        response = requests.post(f"{BASE_URL}/players/batch", json={"items": items})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(data["applied"], 4)
+        self.assertEqual([result["success"] for result in data["results"]], [True, True, True, True, False, False, False])
+        self.assertEqual([result.get("status") for result in data["results"][4:]], [404, 422, 404])
+        self.assertEqual(data["results"][1]["data"], {"battle_id": "battle_1"})
+        
+        # Every applied item took effect
+        response = requests.get(f"{BASE_URL}/players/{first}")
+        player = response.json()["data"]
+        self.assertEqual(player["thought_history"][-1]["content"], "Batched thought")
+        self.assertEqual(player["location"]["location_tuple"], ["Unova", "Opelucid City"])
+        
+        response = requests.get(f"{BASE_URL}/players/{second}/battles/battle_1")
+        self.assertEqual(response.json()["data"]["result"], "win")
+        response = requests.get(f"{BASE_URL}/players/{second}/matchups/iris")
+        self.assertEqual(response.json()["data"]["matchup"]["wins"], 1)
+        
+        # A player's own batch fills in its ID
+        response = requests.post(f"{BASE_URL}/players/{second}/batch", json={"items": [
+            {"type": "thought", "content": "Mine"},
+            {"type": "thought", "player_id": first, "content": "Not mine"}
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["data"]["results"]
+        self.assertEqual(results[0]["data"], {"thought_id": "thought_1"})
+        self.assertEqual(results[1]["status"], 400)
+    
+    def test_player_fields(self):
+        """Test choosing the fields of returned players"""
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        requests.post(f"{BASE_URL}/players/{player_id}/thoughts", json={"content": "Counting", "category": "general"})
+        requests.post(f"{BASE_URL}/players/{player_id}/battles", json={"opponent_id": "cheren", "opponent_name": "Cheren"})
+        
+        # The list returns summaries, with counts instead of histories
+        response = requests.get(f"{BASE_URL}/players/", params={"per_page": 100})
+        summary = next(player for player in response.json()["data"] if player["id"] == player_id)
+        self.assertNotIn("thought_history", summary)
+        self.assertNotIn("battle_history", summary)
+        self.assertEqual(summary["thought_count"], 1)
+        self.assertEqual(summary["battle_count"], 1)
+        self.assertEqual(summary["name"], self.test_player["name"])
+        
+        # Only the fields asked for, and the ID
+        response = requests.get(f"{BASE_URL}/players/{player_id}", params={"fields": "name,location"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()["data"]), {"id", "name", "location"})
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}", params={"exclude": "thought_history,battle_history"})
+        data = response.json()["data"]
+        self.assertNotIn("thought_history", data)
+        self.assertIn("team", data)
+        
+        response = requests.get(f"{BASE_URL}/players/", params={"fields": "*", "exclude": "battle_history", "per_page": 100})
+        player = next(player for player in response.json()["data"] if player["id"] == player_id)
+        self.assertEqual([thought["content"] for thought in player["thought_history"]], ["Counting"])
+        self.assertNotIn("battle_history", player)
+        
+        # The full player by default
+        response = requests.get(f"{BASE_URL}/players/{player_id}")
+        self.assertEqual(len(response.json()["data"]["battle_history"]), 1)
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}", params={"fields": "name,secrets"})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_conditional_requests(self):
+        """Test ETags, If-None-Match and If-Match"""
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}")
+        etag = response.headers["ETag"]
+        team_etag = requests.get(f"{BASE_URL}/players/{player_id}/team").headers["ETag"]
+        
+        # Unchanged: 304 without a body
+        response = requests.get(f"{BASE_URL}/players/{player_id}", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+        
+        # Other fields make another body, with its own tag
+        response = requests.get(f"{BASE_URL}/players/{player_id}", params={"fields": "name"}, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        name_etag = response.headers["ETag"]
+        self.assertNotEqual(name_etag, etag)
+        response = requests.get(f"{BASE_URL}/players/{player_id}", params={"fields": "name"}, headers={"If-None-Match": name_etag})
+        self.assertEqual(response.status_code, 304)
+        response = requests.get(f"{BASE_URL}/players/", params={"per_page": 5}, headers={"If-None-Match": requests.get(f"{BASE_URL}/players/").headers["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        
+        # A thought changes the player and its thoughts, but not its team
+        response = requests.post(f"{BASE_URL}/players/{player_id}/thoughts", json={"content": "Versioned", "category": "general"})
+        self.assertIn("ETag", response.headers)
+        response = requests.get(f"{BASE_URL}/players/{player_id}", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        response = requests.get(f"{BASE_URL}/players/{player_id}/team", headers={"If-None-Match": team_etag})
+        self.assertEqual(response.status_code, 304)
+        
+        # Writes with a stale If-Match are refused
+        update = {"name": "Versioned Player", "location": {"location_tuple": ["Striaton City"]}}
+        response = requests.put(f"{BASE_URL}/players/{player_id}", json=update, headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 412)
+        
+        # A tag read with fields names the same version
+        etag = requests.get(f"{BASE_URL}/players/{player_id}", params={"fields": "name"}).headers["ETag"]
+        response = requests.put(f"{BASE_URL}/players/{player_id}", json=update, headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["name"], "Versioned Player")
+        self.assertNotEqual(response.headers["ETag"], etag)
+        
+        # A collection's ETag also works for writes to it
+        response = requests.post(f"{BASE_URL}/players/{player_id}/team", json=self.test_player["team"][0], headers={"If-Match": team_etag})
+        self.assertEqual(response.status_code, 200)
+        response = requests.post(f"{BASE_URL}/players/{player_id}/team", json=self.test_player["team"][0], headers={"If-Match": team_etag})
+        self.assertEqual(response.status_code, 412)
+    
+    def test_change_feed(self):
+        """Test catching up on changes since a cursor"""
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        # Without a cursor, a snapshot of the player and the cursor to follow
+        response = requests.get(f"{BASE_URL}/players/{player_id}/changes", params={"fields": "name,thought_history"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(data["snapshot"], [{"id": player_id, "name": self.test_player["name"], "thought_history": []}])
+        cursor = data["cursor"]
+        
+        requests.post(f"{BASE_URL}/players/{player_id}/thoughts", json={"content": "Synced", "category": "general"})
+        requests.put(f"{BASE_URL}/players/{player_id}", json={"name": "Synced Player", "location": {"location_tuple": ["Nacrene City"]}})
+        
+        # Then only what changed since
+        response = requests.get(f"{BASE_URL}/players/{player_id}/changes", params={"cursor": cursor})
+        data = response.json()["data"]
+        self.assertIsNone(data["snapshot"])
+        self.assertEqual([change["op"] for change in data["changes"]], ["add_thought", "update_player"])
+        self.assertEqual(data["changes"][0]["data"]["thought"]["content"], "Synced")
+        self.assertEqual(data["changes"][0]["collections"], ["thoughts"])
+        self.assertEqual(data["changes"][1]["data"]["name"], "Synced Player")
+        self.assertFalse(data["more"])
+        
+        # Pages of changes, across every player
+        response = requests.get(f"{BASE_URL}/players/changes", params={"cursor": cursor, "limit": 1})
+        data = response.json()["data"]
+        self.assertEqual(len(data["changes"]), 1)
+        self.assertTrue(data["more"])
+        response = requests.get(f"{BASE_URL}/players/changes", params={"cursor": data["cursor"]})
+        self.assertEqual([change["op"] for change in response.json()["data"]["changes"]], ["update_player"])
+        
+        response = requests.get(f"{BASE_URL}/players/{player_id}/changes", params={"cursor": response.json()["data"]["cursor"]})
+        self.assertEqual(response.json()["data"]["changes"], [])
+        
+        # An unknown cursor falls back to a snapshot
+        response = requests.get(f"{BASE_URL}/players/{player_id}/changes", params={"cursor": "stale.1"})
+        data = response.json()["data"]
+        self.assertEqual(data["snapshot"][0]["name"], "Synced Player")
+    
+    def test_change_stream(self):
+        """Test following a player's changes as server-sent events"""
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        def next_event(lines):
+            event = {}
+            for line in lines:
+                if not line:
+                    if event:
+                        return event
+                elif line.startswith(b"event: "):
+                    event["event"] = line[len(b"event: "):].decode()
+                elif line.startswith(b"data: "):
+                    event["data"] = json.loads(line[len(b"data: "):])
+        
+        # A snapshot of the player, then its changes to the followed collections only
+        url = f"{BASE_URL}/players/{player_id}/changes/stream"
+        with requests.get(url, params={"collections": "profile,thoughts"}, stream=True, timeout=10) as stream:
+            self.assertEqual(stream.status_code, 200)
+            lines = stream.iter_lines()
+            event = next_event(lines)
+            self.assertEqual(event["event"], "snapshot")
+            self.assertEqual(event["data"]["players"][0]["name"], self.test_player["name"])
+            self.assertNotIn("thought_history", event["data"]["players"][0])
+            
+            requests.post(f"{BASE_URL}/players/{player_id}/team", json=self.test_player["team"][0])
+            for name in ["First Name", "Second Name"]:
+                requests.put(f"{BASE_URL}/players/{player_id}", json={"name": name, "location": {"location_tuple": ["Castelia City"]}})
+            requests.post(f"{BASE_URL}/players/{player_id}/thoughts", json={"content": "Pushed", "category": "general"})
+            
+            # Coalesced: the last update of the burst only
+            changes = []
+            while len(changes) < 2:
+                event = next_event(lines)
+                self.assertEqual(event["event"], "changes")
+                changes += event["data"]["changes"]
+        
+        self.assertEqual([change["op"] for change in changes], ["update_player", "add_thought"])
+        self.assertEqual(changes[0]["data"]["name"], "Second Name")
+        
+        response = requests.get(url, params={"collections": "pokedex"})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_end_battle_twice(self):
+        """Test that a battle can only be ended once"""
+        # Create player
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        
+        # Play and end a battle
+        response = requests.post(f"{BASE_URL}/players/{player_id}/battles", json={"opponent_id": "cheren", "opponent_name": "Cheren"})
+        battle_id = response.json()["data"]["battle_id"]
+        response = requests.put(f"{BASE_URL}/players/{player_id}/battles/{battle_id}", params={"result": "win"})
+        self.assertEqual(response.status_code, 200)
+        
+        # Ending it again, on its own or in a batch, is a conflict
+        response = requests.put(f"{BASE_URL}/players/{player_id}/battles/{battle_id}", params={"result": "loss"})
+        self.assertEqual(response.status_code, 409)
+        response = requests.post(f"{BASE_URL}/players/{player_id}/batch", json={"items": [
+            {"type": "battle_end", "battle_id": battle_id, "result": "win"}
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["results"][0]["status"], 409)
+        
+        # The battle and its matchup only count the first result
+        response = requests.get(f"{BASE_URL}/players/{player_id}/battles/{battle_id}")
+        self.assertEqual(response.json()["data"]["result"], "win")
+        response = requests.get(f"{BASE_URL}/players/{player_id}/matchups/cheren")
+        matchup = response.json()["data"]["matchup"]
+        self.assertEqual((matchup["wins"], matchup["losses"]), (1, 0))
+        self.assertEqual(matchup["recent_results"], "w")
+    
+    def test_load_leaves_no_checkpoint_files(self):
+        """Test that loading a save leaves no temporary checkpoint behind"""
+        def checkpoint_files():
+            if not os.path.isdir(WAL_DIR):
+                return set()
+            return {name for name in os.listdir(WAL_DIR) if name.startswith("checkpoint.") and name.endswith(".tmp")}
+        
+        response = requests.post(f"{BASE_URL}/players/", json=self.test_player)
+        self.assertEqual(response.status_code, 200)
+        self.created_resources["players"].append(response.json()["data"]["player_id"])
+        
+        response = requests.post(f"{BASE_URL}/saves/", json=self.test_save)
+        self.assertEqual(response.status_code, 200)
+        save_id = response.json()["data"]["id"]
+        self.created_resources["saves"].append(save_id)
+        
+        # Durable backends keep no checkpoint; the others install the one the load prepares
+        before = checkpoint_files()
+        for lazy in (False, True):
+            response = requests.post(f"{BASE_URL}/saves/{save_id}/load", params={"lazy": lazy})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(checkpoint_files() - before, set())
+    
+    def test_player_ids_not_reused(self):
+        """Test that a player created after a delete gets a new ID"""
+        player_ids = []
+        for name in ("First Trainer", "Second Trainer"):
+            response = requests.post(f"{BASE_URL}/players/", json={**self.test_player, "name": name})
+            self.assertEqual(response.status_code, 200)
+            player_ids.append(response.json()["data"]["player_id"])
+            self.created_resources["players"].append(player_ids[-1])
+        
+        response = requests.delete(f"{BASE_URL}/players/{player_ids[0]}")
+        self.assertEqual(response.status_code, 200)
+        self.created_resources["players"].remove(player_ids[0])
+        
+        # The new player gets an ID of its own and leaves the others alone
+        response = requests.post(f"{BASE_URL}/players/", json={**self.test_player, "name": "Third Trainer"})
+        self.assertEqual(response.status_code, 200)
+        player_id = response.json()["data"]["player_id"]
+        self.created_resources["players"].append(player_id)
+        self.assertNotIn(player_id, player_ids)
+        
+        response = requests.get(f"{BASE_URL}/players/{player_ids[1]}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["name"], "Second Trainer")
+        response = requests.get(f"{BASE_URL}/players/{player_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["name"], "Third Trainer")
 
 if __name__ == "__main__":
     # Wait for server to start
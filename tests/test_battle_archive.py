@@ -0,0 +1,62 @@
+import unittest
+import os
+import sys
+import datetime
+import tempfile
+from unittest import mock
+
+# Make the server package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.models.player import Battle
+from server.utils.battle_archive import BattleArchive, ArchivedTurns
+
+class BattleArchiveTest(unittest.TestCase):
+    """Test cases for archived battle turns, without a running server"""
+    
+    def setUp(self):
+        """Set up an archive in a temporary directory"""
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.archive = BattleArchive(root=self.root.name)
+        self.turns = [{"turn": n, "actor": "player", "move": "Tackle", "damage": 5 * n} for n in range(1, 6)]
+    
+    def make_battle(self, battle_id: str, result=None) -> Battle:
+        return Battle(
+            id=battle_id, opponent_id="npc_1", opponent_name="Rival Hugh",
+            start_time=datetime.datetime(2026, 1, 1, 12, 0), result=result, turns=self.turns
+        )
+    
+    def test_archive(self):
+        """Test that only ended battles are archived, and read back as they were"""
+        ended = self.make_battle("battle_1", "win")
+        ongoing = self.make_battle("battle_2")
+        self.archive.archive([ended, ongoing])
+        
+        self.assertIsInstance(ended.turns, ArchivedTurns)
+        self.assertNotIsInstance(ongoing.turns, ArchivedTurns)
+        self.assertTrue(os.path.exists(self.archive.path))
+        
+        self.assertEqual(len(ended.turns), 5)
+        self.assertEqual(ended.turns.last_turn, 5)
+        self.assertEqual(ended.turns.to_list(), self.turns)
+        self.assertEqual(ended.turns[1:3], self.turns[1:3])
+        self.assertEqual(ended.turns.row(-1), self.turns[-1])
+        with self.assertRaises(ValueError):
+            ended.turns.append({"turn": 6, "actor": "player"})
+    
+    def test_reads_decode_once(self):
+        """Test that reading an archived battle turn by turn decodes it once"""
+        battle = self.make_battle("battle_1", "win")
+        self.archive.archive([battle])
+        
+        with mock.patch.object(ArchivedTurns, "load", autospec=True, side_effect=ArchivedTurns.load) as load:
+            rows = [battle.turns.row(i) for i in range(len(battle.turns))]
+            self.assertEqual(battle.turns.last_turn, 5)
+            self.assertEqual(list(battle.turns), rows)
+        self.assertEqual(rows, self.turns)
+        self.assertEqual(load.call_count, 1)
+
+if __name__ == "__main__":
+    # Run tests
+    unittest.main()
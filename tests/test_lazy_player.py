@@ -0,0 +1,69 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+
+# Make the server package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.models.player import Thought, MapLocation
+from server.utils.lazy_player import LazyPlayer
+from server.utils.save_codec import get_codec
+
+class LazyPlayerTest(unittest.TestCase):
+    """Test cases for lazily loaded players, without a running server"""
+    
+    def setUp(self):
+        """Set up a player whose thoughts are still in a segment"""
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        path = os.path.join(self.root.name, "thoughts.jsonl")
+        thoughts = [Thought(id=f"thought_{n}", content=f"Thought {n}") for n in range(50)]
+        size = get_codec("json").append_records(path, [[n, thought.dict()] for n, thought in enumerate(thoughts)])
+        
+        location = MapLocation(location_tuple=["Aspertia City", "Trainer School"])
+        self.player = LazyPlayer.from_segments(
+            {"id": "player_lazy", "name": "Lazy Trainer", "location": location},
+            {"thought_history": {"path": path, "size": size, "format": "json"}}
+        )
+    
+    def test_load_on_access(self):
+        """Test that a history is read on first access and not before"""
+        self.assertIsNotNone(self.player.pending_segment("thought_history"))
+        self.assertEqual([thought.id for thought in self.player.thought_history], [f"thought_{n}" for n in range(50)])
+        self.assertIsNone(self.player.pending_segment("thought_history"))
+    
+    def test_concurrent_load(self):
+        """Test that readers on several threads all get the one loaded history"""
+        barrier = threading.Barrier(8)
+        histories = []
+        errors = []
+        
+        def read():
+            barrier.wait()
+            try:
+                histories.append(self.player.thought_history)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(len(histories), 8)
+        self.assertTrue(all(history is histories[0] for history in histories))
+        self.assertEqual(len(histories[0]), 50)
+    
+    def test_missing_segment(self):
+        """Test that a history with no segment is a missing attribute"""
+        del self.player._segments["thought_history"]
+        self.assertFalse(hasattr(self.player, "thought_history"))
+        self.assertIsNone(getattr(self.player, "thought_history", None))
+
+if __name__ == "__main__":
+    # Run tests
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import os
+import sys
+import datetime
+import tempfile
+
+# Make the server package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.utils.mutation_log import MutationLog
+
+class MutationLogTest(unittest.TestCase):
+    """Test cases for the mutation log, without a running server"""
+    
+    def setUp(self):
+        """Set up a log in a temporary directory"""
+        self.wal_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.wal_dir.cleanup)
+        self.now = datetime.datetime(2026, 1, 1, 12, 0)
+    
+    def open_log(self) -> MutationLog:
+        log = MutationLog(self.wal_dir.name, checkpoint_interval=3, fsync=False)
+        self.addCleanup(log.close)
+        return log
+    
+    def restart(self):
+        """Open the log as a restarted server does: checkpoint, then the log tail"""
+        log = self.open_log()
+        players = log.load_checkpoint()
+        replayed = []
+        log.replay_records(lambda record: replayed.append(record["payload"]["n"]))
+        return log, players, replayed
+    
+    def test_replay_after_restart(self):
+        """Test that a restart replays every logged mutation in order"""
+        log = self.open_log()
+        for n in range(2):
+            log.append("add_thought", "player_1", {"n": n}, self.now)
+        log.close()
+        
+        log, players, replayed = self.restart()
+        self.assertEqual(players, [])
+        self.assertEqual(replayed, [0, 1])
+        
+        # Sequence numbers carry on from the replayed records
+        self.assertEqual(log.append("add_thought", "player_1", {"n": 2}, self.now), 3)
+        log.close()
+        self.assertEqual(self.restart()[2], [0, 1, 2])
+    
+    def test_checkpoint(self):
+        """Test that a checkpoint replaces the records it covers"""
+        log = self.open_log()
+        for n in range(3):
+            log.append("add_thought", "player_1", {"n": n}, self.now)
+        self.assertTrue(log.needs_checkpoint())
+        
+        log.checkpoint([{"id": "player_1", "thoughts": 3}])
+        self.assertFalse(log.needs_checkpoint())
+        self.assertEqual(os.path.getsize(log.log_path), 0)
+        
+        log.append("add_thought", "player_1", {"n": 3}, self.now)
+        log.close()
+        
+        # Only the mutations after the checkpoint are replayed
+        log, players, replayed = self.restart()
+        self.assertEqual(players, [{"id": "player_1", "thoughts": 3}])
+        self.assertEqual(replayed, [3])
+        self.assertEqual(log.append("add_thought", "player_1", {"n": 4}, self.now), 5)
+    
+    def test_torn_tail(self):
+        """Test that a record cut short by a crash is dropped"""
+        log = self.open_log()
+        for n in range(2):
+            log.append("add_thought", "player_1", {"n": n}, self.now)
+        log.close()
+        
+        with open(log.log_path, "a") as f:
+            f.write('{"seq": 3, "op": "add_thought"')
+        
+        log, _, replayed = self.restart()
+        self.assertEqual(replayed, [0, 1])
+        
+        # The next record starts on a clean line
+        log.append("add_thought", "player_1", {"n": 2}, self.now)
+        log.close()
+        self.assertEqual(self.restart()[2], [0, 1, 2])
+    
+    def test_background_checkpoint(self):
+        """Test a checkpoint written while mutations continue"""
+        log = self.open_log()
+        for n in range(3):
+            log.append("add_thought", "player_1", {"n": n}, self.now)
+        
+        seq = log.begin_checkpoint()
+        self.assertEqual(seq, 3)
+        self.assertIsNone(log.begin_checkpoint())
+        self.assertTrue(os.path.exists(log.rotated_path))
+        log.append("add_thought", "player_1", {"n": 3}, self.now)
+        tmp_path = log.prepare_checkpoint([{"id": "player_1", "thoughts": 3}])
+        
+        # A crash before the checkpoint is installed replays both logs, in order
+        self.assertEqual(self.restart()[1:], ([], [0, 1, 2, 3]))
+        
+        # Once it is installed only the mutations after it are replayed
+        self.assertTrue(log.commit_checkpoint(tmp_path, seq))
+        self.assertFalse(os.path.exists(log.rotated_path))
+        log.append("add_thought", "player_1", {"n": 4}, self.now)
+        log.close()
+        self.assertEqual(self.restart()[1:], ([{"id": "player_1", "thoughts": 3}], [3, 4]))
+    
+    def test_failed_checkpoint(self):
+        """Test that the records of a failed checkpoint are kept for the next one"""
+        log = self.open_log()
+        for n in range(2):
+            log.append("add_thought", "player_1", {"n": n}, self.now)
+        log.abort_checkpoint(log.begin_checkpoint())
+        log.append("add_thought", "player_1", {"n": 2}, self.now)
+        
+        seq = log.begin_checkpoint()
+        log.append("add_thought", "player_1", {"n": 3}, self.now)
+        log.close()
+        self.assertEqual(self.restart()[2], [0, 1, 2, 3])
+        
+        # A checkpoint of the whole state supersedes the one being written
+        tmp_path = log.prepare_checkpoint([{"id": "player_1", "thoughts": 3}])
+        log.checkpoint([{"id": "player_1", "thoughts": 4}])
+        self.assertFalse(log.commit_checkpoint(tmp_path, seq))
+        self.assertFalse(os.path.exists(tmp_path))
+        log.close()
+        self.assertEqual(self.restart()[1:], ([{"id": "player_1", "thoughts": 4}], []))
+
+if __name__ == "__main__":
+    # Run tests
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import os
+import sys
+import datetime
+import tempfile
+
+# Make the server package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.models.player import Player, Thought, Battle, MatchupRecord, MapLocation
+from server.models.pokemon import Pokemon, PokemonBaseStats
+from server.models.turn import TurnEvent
+from server.utils.player_repository import create_repository
+
+class InMemoryPlayerRepositoryTest(unittest.TestCase):
+    """Test cases for a player repository backend, without a running server"""
+    
+    backend = "memory"
+    
+    def setUp(self):
+        """Set up an empty repository"""
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.data_dir.cleanup)
+        self.path = os.path.join(self.data_dir.name, "players.db")
+        self.repository = self.open_repository()
+        
+        self.start = datetime.datetime(2026, 1, 1, 12, 0)
+        self.location = MapLocation(location_tuple=["Aspertia City", "Trainer School"])
+    
+    def open_repository(self):
+        repository = create_repository(self.backend, self.path)
+        if hasattr(repository, "close"):
+            self.addCleanup(repository.close)
+        return repository
+    
+    def at(self, minutes: int) -> datetime.datetime:
+        return self.start + datetime.timedelta(minutes=minutes)
+    
+    def make_pokemon(self, pokemon_id: int, name: str) -> Pokemon:
+        return Pokemon(
+            id=pokemon_id, name=name, level=5, types=["Normal"], nature="Hardy",
+            base_stats=PokemonBaseStats(hp=45, attack=55, defense=39, special_attack=35, special_defense=39, speed=42),
+            current_hp=20, max_hp=20
+        )
+    
+    def create_player(self, player_id: str, name: str) -> None:
+        self.repository.create_player(Player(
+            id=player_id, name=name, location=self.location,
+            team=[self.make_pokemon(1, "Oshawott")], created_at=self.start, last_updated=self.start
+        ))
+    
+    def play(self) -> None:
+        """Make the same changes the player API makes, with fixed timestamps"""
+        self.create_player("player_1", "Test Trainer")
+        self.create_player("player_2", "Deleted Trainer")
+        self.repository.update_player("player_1", {"name": "Renamed Trainer", "items": ["Potion"], "badges": {"Basic"}}, self.at(1))
+        
+        self.repository.add_pokemon("player_1", self.make_pokemon(2, "Patrat"), self.at(2))
+        self.repository.add_pokemon("player_1", self.make_pokemon(3, "Purrloin"), self.at(3))
+        self.repository.replace_pokemon("player_1", 1, self.make_pokemon(4, "Watchog"), self.at(4))
+        self.assertEqual(self.repository.remove_pokemon("player_1", 2, self.at(5)).name, "Purrloin")
+        
+        for n in range(3):
+            self.repository.add_thought("player_1", Thought(id=f"thought_{n}", content=f"Thought {n}", timestamp=self.at(10 + n)), self.at(10 + n))
+        
+        for n, opponent_id in enumerate(["npc_1", "npc_2", "npc_1"]):
+            battle = Battle(id=f"battle_{n}", opponent_id=opponent_id, opponent_name=f"Trainer {opponent_id}", start_time=self.at(20 + n))
+            self.repository.add_battle("player_1", battle, self.at(20 + n))
+        for turn in range(1, 3):
+            self.repository.add_turns("player_1", "battle_1", [TurnEvent(turn=turn, actor="player", move="Tackle", damage=5 * turn)], self.at(23))
+        self.assertEqual(self.repository.end_battle("player_1", "battle_2", "win", self.at(25)), 2)
+        self.repository.put_matchup("player_1", MatchupRecord(opponent_id="npc_1", opponent_name="Trainer npc_1", wins=1, last_battle=self.at(25)), self.at(25))
+        
+        self.assertTrue(self.repository.delete_player("player_2"))
+        self.assertFalse(self.repository.delete_player("player_2"))
+    
+    def check(self) -> None:
+        """Check the players ``play`` left behind"""
+        repository = self.repository
+        self.assertEqual(repository.count_players(), 1)
+        self.assertEqual([player.id for player in repository.list_players(0, 10)], ["player_1"])
+        self.assertEqual(repository.get_player_name("player_1"), "Renamed Trainer")
+        self.assertIsNone(repository.get_player("player_2"))
+        
+        player = repository.get_player("player_1")
+        self.assertEqual(player.items, ["Potion"])
+        self.assertEqual(player.badges, {"Basic"})
+        self.assertEqual(player.last_updated, self.at(25))
+        self.assertEqual([pokemon.name for pokemon in repository.get_team("player_1")], ["Oshawott", "Watchog"])
+        
+        self.assertEqual(repository.count_thoughts("player_1"), 3)
+        self.assertEqual([thought.id for thought in repository.get_thoughts("player_1")], ["thought_0", "thought_1", "thought_2"])
+        
+        self.assertEqual(repository.count_battles("player_1"), 3)
+        self.assertEqual([battle.id for battle in repository.get_battles("player_1", "npc_1")], ["battle_0", "battle_2"])
+        index, battle = repository.get_battle("player_1", "battle_2")
+        self.assertEqual((index, battle.result, battle.end_time), (2, "win", self.at(25)))
+        self.assertIsNone(repository.get_battle("player_1", "battle_9"))
+        self.assertEqual([(t["turn"], t["damage"]) for t in repository.get_battle("player_1", "battle_1")[1].turns.to_list()], [(1, 5), (2, 10)])
+        self.assertEqual([len(battle.turns) for battle in repository.get_battles("player_1")], [0, 2, 0])
+        
+        self.assertEqual(repository.get_matchup("player_1", "npc_1").wins, 1)
+        self.assertEqual(list(repository.get_matchups("player_1")), ["npc_1"])
+    
+    def test_mutations(self):
+        """Test that mutations read back as they were made"""
+        self.play()
+        self.check()
+    
+    def test_replace_all(self):
+        """Test replacing every player at once"""
+        self.play()
+        self.repository.replace_all([Player(id="player_3", name="Loaded Trainer", location=self.location)])
+        self.assertEqual([player.id for player in self.repository.all_players()], ["player_3"])
+        self.assertEqual(self.repository.count_thoughts("player_3"), 0)
+    
+    def test_same_as_memory(self):
+        """Test that the backend stores players exactly as the in-memory one does"""
+        self.play()
+        stored = self.repository.get_player("player_1").dict()
+        
+        self.repository = create_repository("memory")
+        self.play()
+        self.assertEqual(stored, self.repository.get_player("player_1").dict())
+
+class SqlitePlayerRepositoryTest(InMemoryPlayerRepositoryTest):
+    """Test cases for the SQLite backend"""
+    
+    backend = "sqlite"
+    
+    def test_reopen(self):
+        """Test that the database keeps every change across a restart"""
+        self.play()
+        self.repository.close()
+        self.repository = self.open_repository()
+        self.check()
+    
+    def test_turn_rows(self):
+        """Test that each turn is one row, removed along with its battle"""
+        def count_turns():
+            return self.repository.conn.execute("SELECT COUNT(*) FROM battle_turns").fetchone()[0]
+        
+        self.play()
+        self.assertEqual(count_turns(), 2)
+        self.repository.replace_all([])
+        self.assertEqual(count_turns(), 0)
+
+if __name__ == "__main__":
+    # Run tests
+    unittest.main()
@@ -0,0 +1,215 @@
+import unittest
+import os
+import sys
+import json
+import datetime
+import tempfile
+from typing import Dict, Tuple
+
+# Make the server package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.models.player import Player, Thought, Battle, MatchupRecord, MapLocation
+from server.models.pokemon import Pokemon, PokemonBaseStats
+from server.models.save import SaveFileCreate
+from server.utils.change_tracker import change_tracker
+from server.utils.save_manager import SaveManager, SAVE_DIR
+from server.utils.save_index import MANIFEST_NAME
+
+class SaveManagerTest(unittest.TestCase):
+    """Test cases for the save manager, without a running server"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.location = MapLocation(location_tuple=["Aspertia City", "Trainer School"])
+        self.test_save = SaveFileCreate(name="Test Save")
+        
+        # Store created saves for cleanup
+        self.created_saves = []
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        for save_id in self.created_saves:
+            SaveManager.delete_save(save_id)
+    
+    def create_player(self, player_id: str, name: str) -> Player:
+        # Marked the way the player API marks a new player
+        player = Player(id=player_id, name=name, location=self.location)
+        change_tracker.mark_all(player_id)
+        return player
+    
+    def create_save(self, players) -> str:
+        save_id = SaveManager.create_save(self.test_save, players).id
+        self.created_saves.append(save_id)
+        return save_id
+    
+    def stat_segments(self, save_id: str, player_id: str) -> Dict[str, Tuple[int, int, int]]:
+        player_dir = SaveManager.get_player_dir(save_id, player_id)
+        stats = {}
+        for filename in os.listdir(player_dir):
+            st = os.stat(os.path.join(player_dir, filename))
+            stats[filename] = (st.st_ino, st.st_mtime_ns, st.st_size)
+        return stats
+    
+    def test_incremental_update(self):
+        """Test that updating a save only writes the segments that changed"""
+        changed = self.create_player("save_test_changed", "Changed Trainer")
+        untouched = self.create_player("save_test_untouched", "Untouched Trainer")
+        changed.thought_history.append(Thought(id="thought_1", content="Heal before the gym"))
+        change_tracker.mark(changed.id, "thoughts")
+        
+        save_id = self.create_save([changed, untouched])
+        changed_before = self.stat_segments(save_id, changed.id)
+        untouched_before = self.stat_segments(save_id, untouched.id)
+        
+        # Add a thought to one player, marked as the player API marks it
+        changed.thought_history.append(Thought(id="thought_2", content="Buy more Pokeballs"))
+        change_tracker.mark(changed.id, "thoughts")
+        change_tracker.mark(changed.id, "profile")
+        self.assertIsNotNone(SaveManager.update_save(save_id, [changed, untouched]))
+        
+        # The other player's segments were not touched at all
+        self.assertEqual(self.stat_segments(save_id, untouched.id), untouched_before)
+        
+        # The thought was appended; the collections that did not change were kept
+        changed_after = self.stat_segments(save_id, changed.id)
+        for filename in ("team.json", "matchups.json", "battles.jsonl"):
+            self.assertEqual(changed_after[filename], changed_before[filename])
+        self.assertGreater(changed_after["thoughts.jsonl"][2], changed_before["thoughts.jsonl"][2])
+        
+        # Both thoughts load back
+        loaded = {player.id: player for player in SaveManager.load_save(save_id)}
+        self.assertEqual([thought.id for thought in loaded[changed.id].thought_history], ["thought_1", "thought_2"])
+        self.assertEqual(loaded[untouched.id].name, "Untouched Trainer")
+    
+    def test_incremental_after_restart(self):
+        """Test that a save written before a restart is not rewritten after it"""
+        player = self.create_player("save_test_restarted", "Restarted Trainer")
+        player.thought_history.append(Thought(id="thought_1", content="Heal before the gym"))
+        change_tracker.mark(player.id, "thoughts")
+        save_id = self.create_save([player])
+        before = self.stat_segments(save_id, player.id)
+        
+        # A clean shutdown keeps the tracker; the next run starts a new session and takes it back
+        tracker_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tracker_dir.cleanup)
+        path = os.path.join(tracker_dir.name, "tracker.json")
+        change_tracker.save(path, ["memory", 1])
+        change_tracker.reset()
+        self.assertTrue(change_tracker.restore(path, ["memory", 1]))
+        self.assertFalse(os.path.exists(path))
+        
+        self.assertIsNotNone(SaveManager.update_save(save_id, [player]))
+        self.assertEqual(self.stat_segments(save_id, player.id), before)
+        
+        # Later changes still append to the segments written before the restart
+        player.thought_history.append(Thought(id="thought_2", content="Buy more Pokeballs"))
+        change_tracker.mark(player.id, "thoughts")
+        self.assertIsNotNone(SaveManager.update_save(save_id, [player]))
+        after = self.stat_segments(save_id, player.id)
+        self.assertEqual(after["team.json"], before["team.json"])
+        self.assertEqual(after["thoughts.jsonl"][0], before["thoughts.jsonl"][0])
+        self.assertGreater(after["thoughts.jsonl"][2], before["thoughts.jsonl"][2])
+        
+        # A tracker saved for other players is not taken back
+        session = change_tracker.session
+        change_tracker.save(path, ["memory", 1])
+        change_tracker.reset()
+        self.assertFalse(change_tracker.restore(path, ["memory", 2]))
+        self.assertNotEqual(change_tracker.session, session)
+        self.assertFalse(os.path.exists(path))
+    
+    def test_incremental_after_load(self):
+        """Test that a loaded save is not rewritten by its next update"""
+        player = self.create_player("save_test_loaded", "Loaded Trainer")
+        player.thought_history.append(Thought(id="thought_1", content="Heal before the gym"))
+        change_tracker.mark(player.id, "thoughts")
+        save_id = self.create_save([player])
+        before = self.stat_segments(save_id, player.id)
+        
+        # Loading replaces every player and starts a new tracker session
+        loaded = SaveManager.load_save(save_id)
+        change_tracker.reset()
+        SaveManager.adopt_save(save_id, change_tracker.session)
+        
+        self.assertIsNotNone(SaveManager.update_save(save_id, loaded))
+        after = self.stat_segments(save_id, player.id)
+        for filename in ("profile.json", "team.json", "thoughts.jsonl", "battles.jsonl"):
+            self.assertEqual(after[filename], before[filename])
+    
+    def test_save_listing(self):
+        """Test that save listings follow creates, updates and deletes"""
+        def list_saves():
+            return {save.id: save for save in SaveManager.get_all_saves()}
+        
+        def read_manifest():
+            with open(os.path.join(SAVE_DIR, MANIFEST_NAME)) as f:
+                return json.load(f)
+        
+        player = self.create_player("save_test_listed", "Listed Trainer")
+        kept_id = self.create_save([player])
+        deleted_id = self.create_save([player])
+        
+        saves = list_saves()
+        self.assertIn(kept_id, saves)
+        self.assertIn(deleted_id, saves)
+        
+        # An update shows up in the listing
+        change_tracker.mark(player.id, "profile")
+        updated = SaveManager.update_save(kept_id, [player])
+        self.assertGreater(updated.last_updated, saves[kept_id].last_updated)
+        self.assertEqual(list_saves()[kept_id].last_updated, SaveManager.get_save(kept_id).last_updated)
+        
+        # A deleted save leaves the listing and the manifest
+        self.assertTrue(SaveManager.delete_save(deleted_id))
+        self.created_saves.remove(deleted_id)
+        self.assertNotIn(deleted_id, list_saves())
+        self.assertNotIn(deleted_id, read_manifest())
+        self.assertIn(kept_id, read_manifest())
+        
+        # A lost manifest is rebuilt on the next listing
+        os.remove(os.path.join(SAVE_DIR, MANIFEST_NAME))
+        saves = list_saves()
+        self.assertIn(kept_id, saves)
+        self.assertNotIn(deleted_id, saves)
+        self.assertIn(kept_id, read_manifest())
+    
+    def test_compact_round_trip(self):
+        """Test saving and loading in the compact format"""
+        start = datetime.datetime(2026, 1, 1, 12, 0)
+        pokemon = Pokemon(
+            id=1, name="Oshawott", level=5, types=["Water"], nature="Modest",
+            base_stats=PokemonBaseStats(hp=55, attack=55, defense=45, special_attack=63, special_defense=45, speed=45),
+            current_hp=20, max_hp=20
+        )
+        player = self.create_player("save_test_compact", "Compact Trainer")
+        player.team.append(pokemon)
+        player.thought_history.append(Thought(id="thought_1", content="Lead with Oshawott", category="battle", timestamp=start))
+        player.battle_history.append(Battle(
+            id="battle_1", opponent_id="npc_1", opponent_name="Rival Hugh", player_team=[pokemon],
+            start_time=start, end_time=start + datetime.timedelta(minutes=5), result="win"
+        ))
+        player.matchup_records["npc_1"] = MatchupRecord(opponent_id="npc_1", opponent_name="Rival Hugh", wins=1, last_battle=start)
+        
+        save_id = SaveManager.create_save(SaveFileCreate(name="Compact Save", format="compact"), [player]).id
+        self.created_saves.append(save_id)
+        self.assertEqual(SaveManager.get_save(save_id).format, "compact")
+        
+        player_dir = SaveManager.get_player_dir(save_id, player.id)
+        segments = [filename for filename in os.listdir(player_dir) if filename != "state.json"]
+        self.assertTrue(segments)
+        self.assertTrue(all(filename.endswith(".bin") for filename in segments))
+        
+        loaded = SaveManager.load_save(save_id)
+        self.assertEqual([p.dict() for p in loaded], [player.dict()])
+        
+        # Updates append to the compact segments and load back the same way
+        player.thought_history.append(Thought(id="thought_2", content="Buy more Pokeballs", timestamp=start))
+        change_tracker.mark(player.id, "thoughts")
+        self.assertIsNotNone(SaveManager.update_save(save_id, [player]))
+        loaded = SaveManager.load_save(save_id)
+        self.assertEqual([p.dict() for p in loaded], [player.dict()])
+
+if __name__ == "__main__":
+    # Run tests
+    unittest.main()
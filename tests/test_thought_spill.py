@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import datetime
+import tempfile
+
+# Make the server package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.models.player import Thought
+from server.utils.thought_spill import ThoughtHistory, SPILL_BLOCK
+
+class ThoughtHistoryTest(unittest.TestCase):
+    """Test cases for spilled thought histories, without a running server"""
+    
+    def setUp(self):
+        """Set up a history spilling to a temporary directory"""
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.history = ThoughtHistory(retention=4, root=self.root.name)
+        self.start = datetime.datetime(2026, 1, 1, 12, 0)
+    
+    def add_thoughts(self, first: int, last: int) -> None:
+        for n in range(first, last):
+            self.history.append(Thought(
+                id=f"thought_{n}",
+                content=f"Thought {n}",
+                category="battle" if n % 3 == 0 else "general",
+                timestamp=self.start + datetime.timedelta(seconds=n)
+            ))
+    
+    def test_spill(self):
+        """Test that older thoughts move to disk and still read back in order"""
+        count = 2 * SPILL_BLOCK + 10
+        self.add_thoughts(0, count)
+        
+        # Whole blocks are spilled, and at least the retention stays in memory
+        self.assertEqual(self.history.spilled, 2 * SPILL_BLOCK)
+        self.assertEqual(len(self.history.recent), 10)
+        self.assertTrue(os.path.exists(self.history.path))
+        
+        self.assertEqual(len(self.history), count)
+        self.assertEqual([thought.id for thought in self.history], [f"thought_{n}" for n in range(count)])
+        self.assertEqual(self.history[3].id, "thought_3")
+        self.assertEqual(self.history[SPILL_BLOCK + 1].id, f"thought_{SPILL_BLOCK + 1}")
+        self.assertEqual(self.history[-1].id, f"thought_{count - 1}")
+        self.assertEqual([thought.id for thought in self.history[SPILL_BLOCK - 1:SPILL_BLOCK + 1]], [f"thought_{SPILL_BLOCK - 1}", f"thought_{SPILL_BLOCK}"])
+    
+    def test_page(self):
+        """Test paging across spilled and in-memory thoughts"""
+        count = SPILL_BLOCK + 20
+        self.add_thoughts(0, count)
+        battle = [f"thought_{n}" for n in range(count) if n % 3 == 0]
+        
+        # Newest first, continuing from the cursor into the spilled block
+        thoughts, total, after = self.history.page(10, category="battle", descending=True)
+        self.assertEqual(total, len(battle))
+        self.assertEqual([thought.id for thought in thoughts], battle[::-1][:10])
+        thoughts, _, _ = self.history.page(len(battle), category="battle", after=after, descending=True)
+        self.assertEqual([thought.id for thought in thoughts], battle[::-1][10:])
+        
+        # A time range inside the spilled block
+        since = self.start + datetime.timedelta(seconds=10)
+        until = self.start + datetime.timedelta(seconds=20)
+        thoughts, total, after = self.history.page(100, since=since, until=until)
+        self.assertEqual(total, 10)
+        self.assertEqual([thought.id for thought in thoughts], [f"thought_{n}" for n in range(10, 20)])
+        self.assertIsNone(after)
+    
+    def test_freeze(self):
+        """Test that a frozen history ignores later thoughts and spills"""
+        self.add_thoughts(0, SPILL_BLOCK)
+        frozen = self.history.freeze()
+        
+        # Enough new thoughts to spill the frozen ones to disk
+        self.add_thoughts(SPILL_BLOCK, 2 * SPILL_BLOCK + 4)
+        self.assertEqual(self.history.spilled, 2 * SPILL_BLOCK)
+        
+        self.assertEqual(len(frozen), SPILL_BLOCK)
+        self.assertEqual([thought.id for thought in frozen], [f"thought_{n}" for n in range(SPILL_BLOCK)])
+        self.assertEqual(len(list(self.history)), 2 * SPILL_BLOCK + 4)
+
+if __name__ == "__main__":
+    # Run tests
+    unittest.main()